@@ -0,0 +1,168 @@
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# synthetic benchmark datasets
+# ---------------------------------------------------------
+# inventory : `skus` products shaped like data.csv. Names / types /
+#             locations are drawn from the real catalog (when there is
+#             one) with a model suffix, so search selectivity stays
+#             realistic at any size.
+# sales     : `lines` sale lines over `days` days ending today, in time
+#             order, 1-3 lines per sale, written in chunks so memory
+#             does not grow with the line count.
+#
+# A dataset directory carries bench.json with the parameters that built
+# it; `build` reuses the directory when they match.
+# =========================================================
+
+INVENTORY_COLUMNS = [
+    "No_", "name", "piece_per_cost", "number", "cost", "sell_price_lower",
+    "sell_price_avg", "profit", "description", "remark", "localtion", "type", "Brand",
+]
+SALES_COLUMNS = [
+    "sale_id", "ts", "customer_id", "product_no", "product_name",
+    "product_type", "qty", "unit_price", "total_line",
+]
+REAL_INVENTORY = os.path.join(os.path.dirname(__file__), "..", "data", "data.csv")
+
+_FALLBACK_TYPES = ["AMP", "MICROPHONE", "USB MP3", "SPEAKER", "CABLE", "Drop_wire", "ADAPTER"]
+
+
+def _templates(rng: np.random.Generator) -> pd.DataFrame:
+    """name / type / localtion tuples to draw synthetic products from."""
+    if os.path.exists(REAL_INVENTORY):
+        real = pd.read_csv(REAL_INVENTORY, usecols=["name", "type", "localtion"])
+        real = real.dropna(subset=["name"])
+        if len(real):
+            return real.reset_index(drop=True)
+    types = rng.choice(_FALLBACK_TYPES, 200)
+    return pd.DataFrame({
+        "name": [f"{t} ITEM {i}" for i, t in enumerate(types)],
+        "type": types,
+        "localtion": rng.choice(["A1", "A4", "B2", "F"], 200),
+    })
+
+
+def make_inventory(skus: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    tpl = _templates(rng)
+    pick = tpl.iloc[rng.integers(0, len(tpl), skus)].reset_index(drop=True)
+
+    cost = np.round(rng.lognormal(6.0, 1.0, skus), -1) + 10
+    lower = np.round(cost * rng.uniform(1.1, 1.6, skus), -1)
+    avg = np.round(lower * rng.uniform(1.0, 1.2, skus), -1)
+    return pd.DataFrame({
+        "No_": np.arange(1, skus + 1),
+        "name": pick["name"].astype(str) + " M" + pd.Series(np.arange(1, skus + 1)).astype(str),
+        "piece_per_cost": 1.0,
+        # plenty of stock so checkout benchmarks never run dry
+        "number": rng.integers(1_000_000, 2_000_000, skus).astype(float),
+        "cost": cost,
+        "sell_price_lower": lower,
+        "sell_price_avg": avg,
+        "profit": avg - cost,
+        "description": None,
+        "remark": None,
+        "localtion": pick["localtion"],
+        "type": pick["type"],
+        "Brand": None,
+    }, columns=INVENTORY_COLUMNS)
+
+
+def write_sales(
+    path: str,
+    inventory: pd.DataFrame,
+    lines: int,
+    days: int = 365,
+    seed: int = 0,
+    chunk_lines: int = 500_000,
+) -> None:
+    """Write `lines` sale lines to `path` in time order, one chunk at a time."""
+    rng = np.random.default_rng(seed + 1)
+    nos = inventory["No_"].to_numpy()
+    names = inventory["name"].to_numpy(dtype=object)
+    types = inventory["type"].fillna("null").to_numpy(dtype=object)
+    prices = inventory["sell_price_avg"].to_numpy()
+    # a few products sell much more than the rest
+    weights = rng.pareto(1.2, len(nos)) + 1
+    weights /= weights.sum()
+
+    end = pd.Timestamp.now(tz="UTC").normalize() + pd.Timedelta(days=1)
+    start = end - pd.Timedelta(days=days)
+    span = (end - start).value
+    chunks = max(1, -(-lines // chunk_lines))
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(",".join(SALES_COLUMNS) + "\n")
+        written = 0
+        for k in range(chunks):
+            n = min(chunk_lines, lines - written)
+            # each chunk covers its own slice of the period, so the file stays ordered
+            lo = start.value + span * k // chunks
+            hi = start.value + span * (k + 1) // chunks
+
+            sizes = rng.integers(1, 4, n)                 # lines per sale
+            sizes = sizes[np.cumsum(sizes) <= n]
+            if sizes.sum() < n:
+                sizes = np.append(sizes, n - sizes.sum())
+            sale_ts = np.sort(rng.integers(lo, hi, len(sizes)))
+            bits = rng.integers(0, 2**63, (len(sizes), 2), dtype=np.int64)
+            sale_ids = [str(uuid.UUID(int=(int(a) << 64) | int(b), version=4)) for a, b in bits]
+            customers = np.array(["walkin-1", "walkin-2", "walkin-3", "VIP-01"])[rng.integers(0, 4, len(sizes))]
+
+            prod = rng.choice(len(nos), n, p=weights)
+            qty = rng.integers(1, 4, n)
+            ts = np.repeat(sale_ts, sizes).astype("M8[ns]")
+
+            part = pd.DataFrame({
+                "sale_id": np.repeat(sale_ids, sizes),
+                "ts": pd.Series(np.datetime_as_string(ts, unit="us")) + "+00:00",
+                "customer_id": np.repeat(customers, sizes),
+                "product_no": nos[prod],
+                "product_name": names[prod],
+                "product_type": types[prod],
+                "qty": qty,
+                "unit_price": prices[prod],
+                "total_line": prices[prod] * qty,
+            })
+            part.to_csv(f, header=False, index=False)
+            written += n
+
+
+def build(root: str, skus: int, lines: int, days: int = 365, seed: int = 0) -> tuple[str, str]:
+    """Make (or reuse) a dataset directory. Returns (inventory csv, sales csv)."""
+    params = {"skus": skus, "lines": lines, "days": days, "seed": seed}
+    inv_path = os.path.join(root, "data.csv")
+    sales_path = os.path.join(root, "sales.csv")
+    meta_path = os.path.join(root, "bench.json")
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) == params and os.path.exists(inv_path) and os.path.exists(sales_path):
+                return inv_path, sales_path
+    except (FileNotFoundError, ValueError):
+        pass
+
+    os.makedirs(root, exist_ok=True)
+    # derived files from an earlier dataset would not match the new one
+    for name in os.listdir(root):
+        if name.startswith(("data.csv.", "sales.csv.")):
+            full = os.path.join(root, name)
+            if os.path.isdir(full):
+                for sub in os.listdir(full):
+                    os.remove(os.path.join(full, sub))
+                os.rmdir(full)
+            else:
+                os.remove(full)
+
+    inventory = make_inventory(skus, seed)
+    inventory.to_csv(inv_path, index=False)
+    write_sales(sales_path, inventory, lines, days, seed)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return inv_path, sales_path
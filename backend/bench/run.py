@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from bench import datasets
+
+# =========================================================
+# endpoint benchmarks
+# ---------------------------------------------------------
+# Builds a synthetic dataset, points the backend at a scratch copy of it
+# and drives every route of app.main.create_app() in-process through
+# httpx's ASGI transport (no sockets, but the real async routes, read
+# pool and writer). Per case: warm-up requests, then `--requests` timed
+# ones with up to `--concurrency` in flight.
+#
+#   python -m bench.run --skus 10000 --lines 1000000 --out after.json
+#   python -m bench.run ... --baseline before.json --max-regression 0.2
+#
+# With --baseline the run exits 1 if any case's latency (--metric, p50
+# by default) grew by more than --max-regression (and --min-delta-ms).
+# Needs httpx (the test client FastAPI uses).
+# =========================================================
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(__file__), ".data")
+
+
+class RssSampler:
+    """Peak resident set size while active, sampled from /proc every few ms."""
+    def __init__(self, interval_sec: float = 0.005):
+        self.interval_sec = interval_sec
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # no /proc: lifetime peak is the best we have
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval_sec)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+# =========================================================
+# cases
+# =========================================================
+def make_cases(skus: int, latest: str, rnd: random.Random) -> list[tuple]:
+    """(name, request builder) per benchmark; a builder returns (method, path, httpx kwargs)."""
+    start = (date.fromisoformat(latest) - timedelta(days=30)).isoformat()
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    def product():
+        return rnd.randint(1, skus)
+
+    def get(path, params=None):
+        return lambda: ("GET", path, {"params": params or {}})
+
+    # create makes products skus+1, skus+2, ...; delete removes them in turn
+    created = itertools.count(skus + 1)
+
+    def import_body():
+        rows = [{"No_": product(), "number": rnd.randint(1_000, 100_000)} for _ in range(100)]
+        return "".join(json.dumps(r) + "\n" for r in rows).encode("utf-8")
+
+    return [
+        ("search_all", get("/inventory/search")),
+        ("search_name", get("/inventory/search", {"q": "amp"})),
+        ("search_name_type", get("/inventory/search", {"q": "a", "type": "mic"})),
+        ("search_page", get("/inventory/search", {"fields": "No_,name,number", "sort": "-number", "limit": 50})),
+        ("analytics_inventory_summary", get("/analytics/inventory-summary")),
+        ("analytics_sales_summary", get("/analytics/sales-summary")),
+        ("analytics_timeseries_day", get("/analytics/timeseries", {"period": "day"})),
+        ("analytics_timeseries_month", get("/analytics/timeseries", {"period": "month"})),
+        ("analytics_top_products", get("/analytics/top-products", {"period": "month"})),
+        ("analytics_dashboard", get("/analytics/dashboard")),
+        ("analytics_latest_date", get("/analytics/sales-latest-date")),
+        ("analytics_sales_detail_30d", get("/analytics/sales-detail", {"start": start, "end": latest})),
+        ("analytics_sales_export_30d_csv", get("/analytics/sales-export", {"start": start, "end": latest})),
+        ("analytics_sales_export_30d_ndjson", get("/analytics/sales-export", {"start": start, "end": latest, "format": "ndjson"})),
+        ("analytics_sales_detail_export_30d", get("/analytics/sales-detail-export", {"start": start, "end": latest})),
+        ("analytics_reorder", get("/analytics/reorder", {"as_of": latest})),
+        ("analytics_reorder_amp_top50", get("/analytics/reorder", {"as_of": latest, "type": "amp", "limit": 50})),
+        ("add_stock", lambda: ("POST", f"/inventory/{product()}/add-stock", {"params": {"qty": 1}})),
+        ("return_broken", lambda: ("POST", f"/inventory/{product()}/return-broken", {"params": {"qty": 1}})),
+        ("update_product", lambda: ("PATCH", f"/inventory/{product()}", {"json": {
+            "sell_price_avg": float(rnd.randint(100, 5_000)), "remark": "bench"}})),
+        ("create_product", lambda: ("POST", "/inventory", {"json": {
+            "name": f"BENCH ITEM {rnd.randint(0, 10**6)}", "number": 10, "cost": 100.0, "type": "AMP"}})),
+        ("delete_product", lambda: ("POST", "/inventory/delete", {"json": [next(created)]})),
+        ("import_ndjson_100", lambda: ("POST", "/inventory/import", {
+            "content": import_body(), "headers": {"Content-Type": "application/x-ndjson"}})),
+        ("bulk_adjust", lambda: ("POST", "/inventory/bulk-adjust", {
+            "json": [{"product_no": product(), "delta": 1} for _ in range(20)]})),
+        ("checkout", lambda: ("POST", "/cart/checkout", {"json": {
+            "customer_id": "bench",
+            "items": [{"product_no": product(), "qty": 1, "unit_price": 100.0} for _ in range(rnd.randint(1, 3))],
+        }})),
+        # the stock ledger the writes above started
+        ("stock_history_today", get("/inventory/stock-history", {"as_of": today})),
+        ("stock_movements_today", lambda: ("GET", f"/inventory/{product()}/movements", {"params": {"start": today, "end": today}})),
+        # the same reads again, now that the writes above invalidated caches
+        ("analytics_dashboard_after_writes", get("/analytics/dashboard")),
+        ("search_name_after_writes", get("/inventory/search", {"q": "amp"})),
+    ]
+
+
+async def run_case(client, make_request, requests: int, warmup: int, concurrency: int) -> dict:
+    for _ in range(warmup):
+        method, path, kw = make_request()
+        await client.request(method, path, **kw)
+
+    latencies: list[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        method, path, kw = make_request()
+        async with sem:
+            t = time.perf_counter()
+            r = await client.request(method, path, **kw)
+            latencies.append((time.perf_counter() - t) * 1000)
+        if r.status_code >= 400:
+            errors += 1
+
+    with RssSampler() as rss:
+        t0 = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "rss_peak_mb": rss.peak / 2**20,
+    }
+
+
+async def run_all(args, skus: int, only: set[str]) -> dict:
+    import httpx
+    from src.app.main import create_app
+
+    app = create_app()
+    rnd = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        latest = (await client.get("/analytics/sales-latest-date")).json().get("latest_date")
+        latest = latest or datetime.now(timezone.utc).date().isoformat()
+        results = {}
+        for name, make_request in make_cases(skus, latest, rnd):
+            if only and name not in only:
+                continue
+            results[name] = await run_case(client, make_request, args.requests, args.warmup, args.concurrency)
+            r = results[name]
+            print(
+                f"{name:34s} p50 {r['p50_ms']:9.2f}  p95 {r['p95_ms']:9.2f}  p99 {r['p99_ms']:9.2f} ms"
+                f"  {r['throughput_rps']:9.1f} req/s  rss {r['rss_peak_mb']:7.1f} MB"
+                + (f"  errors {r['errors']}" if r["errors"] else "")
+            )
+    return results
+
+
+# =========================================================
+# baseline comparison
+# =========================================================
+def regressions(results: dict, baseline: dict, metric: str, max_regression: float, min_delta_ms: float) -> list[str]:
+    found = []
+    for name, r in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or metric not in base:
+            continue
+        limit = base[metric] * (1 + max_regression)
+        if r[metric] > limit and r[metric] - base[metric] > min_delta_ms:
+            found.append(f"{name}: {metric} {base[metric]:.2f} -> {r[metric]:.2f} ms (limit {limit:.2f})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API route on a synthetic dataset")
+    parser.add_argument("--skus", type=int, default=1_000, help="products in the inventory (1k-100k)")
+    parser.add_argument("--lines", type=int, default=10_000, help="sale lines in sales.csv (10k-10M)")
+    parser.add_argument("--days", type=int, default=365, help="days of sales history")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="where datasets are built and cached")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per case")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per case")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight per case")
+    parser.add_argument("--only", default="", help="comma-separated case names to run")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON to compare against")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    dataset = os.path.join(args.root, f"skus{args.skus}_lines{args.lines}_days{args.days}_seed{args.seed}")
+    t = time.perf_counter()
+    inv_path, sales_path = datasets.build(dataset, args.skus, args.lines, args.days, args.seed)
+    print(f"dataset {dataset} ready in {time.perf_counter() - t:.1f}s")
+
+    # benchmarks write (checkouts, stock): work on a scratch copy
+    work = os.path.join(args.root, "work")
+    shutil.rmtree(work, ignore_errors=True)
+    os.makedirs(work)
+    shutil.copy(inv_path, os.path.join(work, "data.csv"))
+    shutil.copy(sales_path, os.path.join(work, "sales.csv"))
+    # settings are read at import time
+    os.environ.update(
+        DATA_DIR=work,
+        INVENTORY_CSV=os.path.join(work, "data.csv"),
+        SALES_CSV=os.path.join(work, "sales.csv"),
+    )
+
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    started = datetime.now(timezone.utc).isoformat()
+    results = asyncio.run(run_all(args, args.skus, only))
+
+    report = {
+        "meta": {
+            "started": started,
+            "skus": args.skus,
+            "lines": args.lines,
+            "days": args.days,
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "env": {k: v for k, v in os.environ.items() if k.startswith(("INVENTORY_", "SALES_", "READ_"))},
+        },
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results -> {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.metric, args.max_regression, args.min_delta_ms)
+        if found:
+            print("REGRESSIONS:")
+            for line in found:
+                print("  " + line)
+            sys.exit(1)
+        print(f"no regressions vs {args.baseline} ({args.metric}, +{args.max_regression:.0%})")
+
+
+if __name__ == "__main__":
+    main()
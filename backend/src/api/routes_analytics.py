@@ -1,41 +1,142 @@
-from fastapi import APIRouter, Query
-from src.services.analytics_service import AnalyticsService
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from src.core.concurrency import run_read, stream_read
+from src.core.lazy import Lazy
+from src.core.config import settings
+from src.core.response_cache import ResponseCache
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
-svc = AnalyticsService()
+svc = Lazy("src.services.analytics_service:AnalyticsService")
+
+# JSON bodies of the endpoints below, keyed on (method, arguments) and
+# the (inventory, sales) versions; the exports stream and aren't cached
+responses = ResponseCache("analytics_response", settings.ANALYTICS_CACHE_BYTES)
+
+
+def _body(fn, args: tuple) -> bytes:
+    """The encoded response of fn(*args), from the cache or computed and stored."""
+    key = (fn.__name__, *args)
+    versions = svc.versions()
+    body = responses.get(key, versions)
+    if body is None:
+        # encoded exactly as FastAPI would have returned the value
+        body = JSONResponse(jsonable_encoder(fn(*args))).body
+        # a write that landed meanwhile may or may not be in the result
+        if svc.versions() == versions:
+            responses.put(key, versions, body)
+    return body
+
+async def _cached(fn, *args) -> Response:
+    return Response(await run_read(_body, fn, args), media_type="application/json")
 
 @router.get("/inventory-summary")
-def inventory_summary():
-    return svc.inventory_summary()
+async def inventory_summary():
+    return await _cached(svc.inventory_summary)
 
 @router.get("/sales-summary")
-def sales_summary():
-    return svc.sales_daily()
+async def sales_summary():
+    return await _cached(svc.sales_daily)
 
 @router.get("/timeseries")
-def timeseries(period: str = "day"):
-    return svc.sales_timeseries(period)
+async def timeseries(period: str = "day"):
+    return await _cached(svc.sales_timeseries, period)
 
 @router.get("/top-products")
-def top_products(period: str = "month"):
-    return svc.top_products(period)
+async def top_products(period: str = "month"):
+    return await _cached(svc.top_products, period)
+
+@router.get("/dashboard")
+async def dashboard(period: str = "day", top_period: str = "month"):
+    """
+    Inventory summary, sales summary, timeseries and top products in one
+    response, all computed from the same memoized frames
+    """
+    return await _cached(svc.dashboard, period, top_period)
 
 @router.get("/sales-latest-date")
-def get_latest_sales_date():
+async def get_latest_sales_date():
     """
     Returns most recent sale date from sales.csv
     Used to auto-select default dashboard period
     """
-    return svc.get_latest_sales_date()
+    return await _cached(svc.get_latest_sales_date)
 
 
 @router.get("/sales-detail")
-def get_sales_detail(
+async def get_sales_detail(
     start: str = Query(..., description="YYYY-MM-DD"),
-    end: str = Query(..., description="YYYY-MM-DD")
+    end: str = Query(..., description="YYYY-MM-DD"),
+    format: str = Query("records", description="records | columns")
 ):
     """
     Returns aggregated sales rows for a date range
     Grouped by product
+    format=columns returns one array per field instead of a list of rows
+    """
+    try:
+        return await _cached(svc.get_sales_detail, start, end, format == "columns")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/reorder")
+async def reorder(
+    type: str | None = None,
+    location: str | None = None,
+    lead_days: int = Query(settings.REORDER_LEAD_DAYS, ge=0),
+    cover_days: int = Query(settings.REORDER_COVER_DAYS, ge=0),
+    as_of: str | None = Query(None, description="YYYY-MM-DD (default: today, UTC)"),
+    limit: int | None = Query(None, ge=1),
+):
+    """
+    Products ranked by stockout risk: 7/30/90-day sales velocity, days
+    of cover and a suggested reorder quantity, filterable by type and
+    location
+    """
+    # the default moves at midnight without any write: key on the date itself
+    as_of = as_of or datetime.now(timezone.utc).date().isoformat()
+    try:
+        return await _cached(svc.reorder, type, location, lead_days, cover_days, as_of, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _export(fn, name: str, start: str, end: str, format: str) -> StreamingResponse:
+    from src.services.sales_export import MEDIA_TYPES
+
+    # dates and format are checked before the first byte goes out
+    try:
+        chunks = await run_read(fn, start, end, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_read(chunks),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}_{start[:10]}_{end[:10]}.{format}"'},
+    )
+
+@router.get("/sales-export")
+async def export_sales(
+    start: str = Query(..., description="YYYY-MM-DD"),
+    end: str = Query(..., description="YYYY-MM-DD"),
+    format: str = Query("csv", description="csv | ndjson")
+):
+    """
+    Raw sale lines for a date range (sales.csv columns), streamed in
+    chunks: memory stays bounded however long the range
+    """
+    return await _export(svc.export_sales, "sales", start, end, format)
+
+@router.get("/sales-detail-export")
+async def export_sales_detail(
+    start: str = Query(..., description="YYYY-MM-DD"),
+    end: str = Query(..., description="YYYY-MM-DD"),
+    format: str = Query("csv", description="csv | ndjson")
+):
+    """
+    The /sales-detail rows for a date range as a CSV or NDJSON download
     """
-    return svc.get_sales_detail(start, end)
+    return await _export(svc.export_sales_detail, "sales_detail", start, end, format)
@@ -1,11 +1,18 @@
+import asyncio
+import logging
 from fastapi import APIRouter
-from src.services.cart_service import CartService
+from src.core.concurrency import run_write
+from src.core.lazy import Lazy
 from src.domain.schemas import CheckoutRequest
 
+log = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/cart", tags=["cart"])
-svc = CartService()
+svc = Lazy("src.services.cart_service:CartService")
 
 @router.post("/checkout")
-def checkout(body: CheckoutRequest):
-    print('========cehckout============')
-    return svc.checkout(body.customer_id, [it.model_dump() for it in body.items])
+async def checkout(body: CheckoutRequest):
+    log.debug("checkout", extra={"customer_id": body.customer_id, "lines": len(body.items)})
+    # stock is taken on the writer; the sale itself is acknowledged by the group commit
+    pending = await run_write(svc.submit_checkout, body.customer_id, [it.model_dump() for it in body.items])
+    return await asyncio.wrap_future(pending)
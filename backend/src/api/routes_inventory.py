@@ -1,41 +1,133 @@
-from fastapi import APIRouter, HTTPException
-from src.services.inventory_service import InventoryService
-from src.domain.schemas import ProductUpdate, ProductCreate
+import logging
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from src.core.concurrency import run_read, run_write
+from src.core.lazy import Lazy
+from src.services.inventory_import import VALIDATE_BATCH, batches, read_rows, format_of
+from src.domain.schemas import ProductUpdate, ProductCreate, StockAdjustment
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
-svc = InventoryService()
+svc = Lazy("src.services.inventory_service:InventoryService")
 
 @router.get("/search")
-def search(q: str | None = None, type: str | None = None):
-    print('//////// search //////////')
-    return svc.search(q, type)
+async def search(
+    request: Request,
+    response: Response,
+    q: str | None = None,
+    type: str | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1),
+):
+    """
+    fields=No_,name,number  only these columns
+    sort=type,-number       server-side sort ("-" = descending)
+    offset / limit          pagination; X-Total-Count has the match count
+    Responds 304 when If-None-Match still matches the ETag.
+    """
+    log.debug("search", extra={"q": q, "type": type, "sort": sort, "offset": offset, "limit": limit})
+    etag = await run_read(svc.search_etag, q, type, fields, sort, offset, limit)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    try:
+        rows, total = await run_read(svc.search_page, q, type, fields, sort, offset, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(headers)
+    response.headers["X-Total-Count"] = str(total)
+    return rows
 
 @router.patch("/{product_no}")
-def update(product_no: int, body: ProductUpdate):
-    print('//////// update //////////')
-    return svc.update(product_no, body.model_dump())
+async def update(product_no: int, body: ProductUpdate):
+    log.debug("update product", extra={"product_no": product_no})
+    return await run_write(svc.update, product_no, body.model_dump())
 
 @router.post("")
-def create(body: ProductCreate):
-    print('//////// create //////////')
-    return svc.create(body.model_dump())
+async def create(body: ProductCreate):
+    log.debug("create product", extra={"product_name": body.name})
+    return await run_write(svc.create, body.model_dump())
     
 @router.post("/{product_no}/add-stock")
-def add_stock(product_no: int, qty: int):
-    print('//////// add stock //////////')
-    return svc.add_stock(product_no, qty)
+async def add_stock(product_no: int, qty: int):
+    log.debug("add stock", extra={"product_no": product_no, "qty": qty})
+    return await run_write(svc.add_stock, product_no, qty)
 
 @router.post("/delete")
-def delete_products(ids: list[int]):
+async def delete_products(ids: list[int]):
     """
     Bulk delete products by No_
     Body example: [1,2,3]
     """
-    print('//////// delete //////////')
-    deleted = svc.delete_many(ids)
+    log.debug("delete products", extra={"ids": len(ids)})
+    deleted = await run_write(svc.delete_many, ids)
     return {"deleted": deleted}
 
+@router.post("/bulk-adjust")
+async def bulk_adjust(body: list[StockAdjustment]):
+    """
+    Apply many stock changes atomically (all or none)
+    Body example: [{"product_no": 4, "delta": 12}, {"product_no": 9, "delta": -1}]
+    """
+    log.debug("bulk adjust", extra={"adjustments": len(body)})
+    try:
+        return await run_write(svc.bulk_adjust, [a.model_dump() for a in body])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/import")
+async def import_products(request: Request, format: str | None = None, all_or_nothing: bool = False):
+    """
+    Create / update products from a CSV, NDJSON or JSON body (format= or
+    Content-Type). Rows with an existing No_ update that product with the
+    given fields; other rows must be full products and are created.
+    Valid rows are written in one transaction; errors are per row.
+    """
+    log.debug("import products", extra={"format": format, "content_type": request.headers.get("content-type")})
+    entries, errors = [], []
+    try:
+        rows = read_rows(request.stream(), format or format_of(request.headers.get("content-type", "")))
+        # validated as the body arrives: the raw rows aren't kept
+        async for batch in batches(rows, VALIDATE_BATCH):
+            valid, invalid = await run_read(svc.validate_import, batch)
+            entries += valid
+            errors += invalid
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_write(svc.apply_import, entries, errors, all_or_nothing)
+
 @router.post("/{product_no}/return-broken")
-def return_broken(product_no: int, qty: int):
-    print("//// RETURN BROKEN ////")
-    return svc.decrement_stock(product_no, qty)
+async def return_broken(product_no: int, qty: int):
+    log.debug("return broken", extra={"product_no": product_no, "qty": qty})
+    return await run_write(svc.decrement_stock, product_no, qty)
+
+@router.get("/stock-history")
+async def stock_history(as_of: str = Query(..., description="YYYY-MM-DD")):
+    """
+    Every product's stock at the end of a day (UTC), rebuilt from the
+    nearest stock checkpoint and the movements after it
+    """
+    try:
+        return await run_read(svc.stock_as_of, as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{product_no}/movements")
+async def stock_movements(
+    product_no: int,
+    start: str = Query(..., description="YYYY-MM-DD"),
+    end: str = Query(..., description="YYYY-MM-DD"),
+):
+    """
+    Stock movements of one product between two dates (inclusive): delta,
+    stock after, reason (checkout, add_stock, return_broken, update, ...),
+    with the stock before and after the range
+    """
+    try:
+        return await run_read(svc.stock_movements, product_no, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
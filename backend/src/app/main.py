@@ -1,12 +1,34 @@
-from fastapi import FastAPI
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from src.app import warmup
+from src.core.concurrency import run_read
+from src.core.config import settings
 from src.core.cors import apply_cors
+from src.core.log import setup_logging
+from src.core.metrics import REGISTRY, MetricsMiddleware
 from src.api.routes_inventory import router as inventory_router
 from src.api.routes_cart import router as cart_router
 from src.api.routes_analytics import router as analytics_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # in the background: /health and /ready answer while the data loads
+    if settings.WARMUP:
+        app.state.warmup = asyncio.create_task(run_read(warmup.warm_up))
+    else:
+        warmup.skip()
+    yield
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Stock Shop", version="0.1.0")
+    setup_logging()
+    app = FastAPI(title="Stock Shop", version="0.1.0", lifespan=lifespan)
     apply_cors(app)
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(inventory_router)
     app.include_router(cart_router)
@@ -14,8 +36,42 @@ def create_app() -> FastAPI:
 
     @app.get("/health")
     def health():
+        """Liveness: the process is serving"""
         return {"ok": True}
 
+    @app.get("/ready")
+    def ready():
+        """Readiness: 503 until every startup warm-up step has succeeded"""
+        status = warmup.retry_failed()
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    @app.get("/metrics")
+    def metrics():
+        """Prometheus text format"""
+        return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     return app
 
 app = create_app()
+
+
+def main():
+    """
+    Serve the API, with WEB_WORKERS processes when > 1. Workers share
+    nothing but the data directory: writes are serialized by file locks
+    and announced through the generation counters, so every worker's
+    caches stay current.
+    """
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the Stock Shop API")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS)
+    args = parser.parse_args()
+    # workers import the app themselves, so it is passed by name
+    uvicorn.run("src.app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+# =========================================================
+# warm-up
+# ---------------------------------------------------------
+# Started by the app's lifespan, on the read pool, while the server
+# already answers /health and /ready. Goes through what the first real
+# requests would otherwise pay for, on the same service objects the
+# routes use:
+#
+#   inventory     parse data.csv (+ journal) into the resident table
+#   search_index  build the inventory search index
+#   sales         load / catch up the rollups and the date index
+#   analytics     dashboard, sales detail (last 30 days), reorder
+#
+# /ready turns 200 once every step has run and none has failed. A step
+# that fails is logged and reported by /ready, which stays 503 and runs
+# the failed steps again (at most every RETRY_SEC) until they succeed.
+# =========================================================
+
+RETRY_SEC = 5.0
+
+
+class Readiness:
+    def __init__(self):
+        self.done = False           # every step has run once
+        self.step: Optional[str] = None
+        self.seconds: dict[str, float] = {}
+        self.failed: dict[str, str] = {}
+        self.retried = 0.0          # time.monotonic() of the last retry
+        self.lock = threading.Lock()
+        self.retrying = threading.Lock()
+
+    def status(self) -> dict:
+        with self.lock:
+            ready = self.done and not self.failed
+            out = {"ready": ready, "steps": dict(self.seconds)}
+            if not self.done:
+                out["step"] = self.step
+            if self.failed:
+                out["failed"] = dict(self.failed)
+            return out
+
+
+READINESS = Readiness()
+
+
+def _steps() -> list[tuple[str, Callable]]:
+    from src.api import routes_analytics, routes_cart, routes_inventory
+
+    inventory, analytics = routes_inventory.svc, routes_analytics.svc
+
+    def sales():
+        analytics.sales.rollups()
+        return analytics.get_latest_sales_date()
+
+    def sales_detail():
+        latest = analytics.get_latest_sales_date()["latest_date"]
+        if latest:
+            end = date.fromisoformat(latest)
+            analytics.get_sales_detail((end - timedelta(days=30)).isoformat(), end.isoformat())
+
+    return [
+        ("inventory", lambda: inventory.search_page(None, None, limit=1)),
+        ("search_index", lambda: inventory.search_page("a", None, limit=1)),
+        ("cart", routes_cart.svc.get),
+        ("sales", sales),
+        ("dashboard", analytics.dashboard),
+        ("sales_detail", sales_detail),
+        ("reorder", lambda: analytics.reorder(limit=1)),
+    ]
+
+
+def _run(name: str, fn: Callable) -> None:
+    with READINESS.lock:
+        READINESS.step = name
+    t = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        log.exception("warm-up step failed", extra={"step": name})
+        with READINESS.lock:
+            READINESS.failed[name] = f"{type(e).__name__}: {e}"
+    else:
+        with READINESS.lock:
+            READINESS.failed.pop(name, None)
+    with READINESS.lock:
+        READINESS.seconds[name] = round(time.perf_counter() - t, 3)
+
+
+def warm_up() -> dict:
+    """Run every step once; returns the READINESS status."""
+    start = time.perf_counter()
+    for name, fn in _steps():
+        _run(name, fn)
+    with READINESS.lock:
+        READINESS.done = True
+        READINESS.step = None
+    log.info("warm-up done", extra={"seconds": round(time.perf_counter() - start, 3)})
+    return READINESS.status()
+
+
+def retry_failed() -> dict:
+    """
+    Run the failed steps again, if the last retry was RETRY_SEC ago and
+    no other caller is at it; returns the READINESS status.
+    """
+    with READINESS.lock:
+        due = READINESS.done and READINESS.failed and time.monotonic() - READINESS.retried >= RETRY_SEC
+    if due and READINESS.retrying.acquire(blocking=False):
+        try:
+            READINESS.retried = time.monotonic()
+            steps = dict(_steps())
+            for name in list(READINESS.failed):
+                _run(name, steps[name])
+            with READINESS.lock:
+                READINESS.step = None
+            if not READINESS.failed:
+                log.info("warm-up retried, ready")
+        finally:
+            READINESS.retrying.release()
+    return READINESS.status()
+
+
+def skip() -> None:
+    """Ready without warming (WARMUP=false)."""
+    with READINESS.lock:
+        READINESS.done = True
@@ -0,0 +1,66 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Iterator
+
+from src.core.config import settings
+
+# =========================================================
+# request execution
+# ---------------------------------------------------------
+# Routes are async; the pandas work they do is not. It runs off the
+# event loop in one of two places:
+#
+#   read pool : bounded thread pool (READ_WORKERS, ~CPU count) for
+#               read-only work: search, analytics, exports.
+#   writer    : ONE thread that runs every inventory / sales mutation
+#               of this process in arrival order. Mutations never race
+#               each other here, so in-process lock waits go away; the
+#               file locks they still take only matter across processes
+#               and are uncontended otherwise.
+#
+# Both hand the result (or exception) back through a future. Queued
+# mutations still run at interpreter exit (executor threads are joined).
+# =========================================================
+
+_read_pool = ThreadPoolExecutor(max_workers=settings.READ_WORKERS, thread_name_prefix="read")
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer")
+
+
+async def run_read(fn, *args, **kwargs):
+    """Run read-only `fn` on the read pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_read_pool, partial(fn, *args, **kwargs))
+
+
+async def stream_read(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Pull each chunk of blocking iterator `chunks` on the read pool, for
+    a StreamingResponse; the iterator is closed if the client goes away.
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(_read_pool, next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                pass            # still running a chunk; closed when collected
+
+
+def submit_write(fn, *args, **kwargs) -> Future:
+    """Queue mutation `fn` behind every mutation submitted before it."""
+    return _writer.submit(fn, *args, **kwargs)
+
+
+async def run_write(fn, *args, **kwargs):
+    """Run mutation `fn` on the writer thread and await its result."""
+    return await asyncio.wrap_future(submit_write(fn, *args, **kwargs))
+
@@ -1,9 +1,87 @@
 from pydantic import BaseModel
 import os
 
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 class Settings(BaseModel):
     DATA_DIR: str = os.getenv("DATA_DIR", "/app/data")
     INVENTORY_CSV: str = os.getenv("INVENTORY_CSV", "/app/data/data.csv")
     SALES_CSV: str = os.getenv("SALES_CSV", "/app/data/sales.csv")
 
+    # "csv" (data.csv + sales.csv, the default) or "sqlite": one database
+    # file in WAL mode; fill it from the CSVs with
+    #   python -m src.repos.sqlite_db migrate
+    STORAGE: str = os.getenv("STORAGE", "csv")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", os.path.join(os.getenv("DATA_DIR", "/app/data"), "shop.db"))
+    # how long a write waits for another process's write transaction
+    SQLITE_BUSY_TIMEOUT_SEC: float = float(os.getenv("SQLITE_BUSY_TIMEOUT_SEC", "10"))
+
+    # keep data.csv parsed in memory; writes go through to disk
+    INVENTORY_RESIDENT: bool = _env_bool("INVENTORY_RESIDENT", "true")
+    # mutations are appended to data.csv.journal; fold it back into the
+    # CSV snapshot once it grows past this many bytes
+    INVENTORY_JOURNAL_MAX_BYTES: int = int(os.getenv("INVENTORY_JOURNAL_MAX_BYTES", str(256 * 1024)))
+
+    # every stock change is appended to a movement ledger (data.csv.ledger,
+    # or a table with SQLite); the whole stock is checkpointed every this
+    # many movements, so a point-in-time query replays at most that many
+    STOCK_CHECKPOINT_EVERY: int = int(os.getenv("STOCK_CHECKPOINT_EVERY", "1000"))
+
+    # sales rollups are checkpointed to sales.csv.rollups.json once this
+    # many bytes of new sales have been folded in since the last save
+    SALES_ROLLUP_FLUSH_BYTES: int = int(os.getenv("SALES_ROLLUP_FLUSH_BYTES", str(64 * 1024)))
+
+    # where analytics reads raw sale lines from: "csv", or "columnar" for the
+    # memory-mapped copy in sales.csv.columns/ (kept in sync from the CSV)
+    SALES_STORE: str = os.getenv("SALES_STORE", "csv")
+
+    # checkouts are appended to sales.csv in group commits: a batch closes
+    # after this many ms or this many sales, then is written with one fsync
+    SALES_COMMIT_WINDOW_MS: float = float(os.getenv("SALES_COMMIT_WINDOW_MS", "2"))
+    SALES_COMMIT_MAX_BATCH: int = int(os.getenv("SALES_COMMIT_MAX_BATCH", "64"))
+
+    # /analytics/reorder defaults: days a supplier takes to deliver, and
+    # how many days of sales an order should cover once it arrives
+    REORDER_LEAD_DAYS: int = int(os.getenv("REORDER_LEAD_DAYS", "7"))
+    REORDER_COVER_DAYS: int = int(os.getenv("REORDER_COVER_DAYS", "30"))
+
+    # finished /analytics/* JSON bodies kept in memory, keyed on the
+    # parameters and the inventory / sales versions (0 turns it off)
+    ANALYTICS_CACHE_BYTES: int = int(os.getenv("ANALYTICS_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+    # sale lines parsed and sent per chunk by the streaming exports; an
+    # export holds about one chunk in memory whatever its date range
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+
+    # threads for read-only request work (search, analytics); mutations
+    # always run one at a time on a single writer thread
+    # (default: the cores, split between the WEB_WORKERS processes)
+    READ_WORKERS: int = int(os.getenv(
+        "READ_WORKERS", str(max(2, (os.cpu_count() or 4) // max(1, int(os.getenv("WEB_WORKERS", "1")))))
+    ))
+
+    # uvicorn worker processes (`uvicorn ... --workers` in the Docker
+    # image, or `python -m src.app.main` for local runs).
+    # Workers share the data directory; every mutation bumps a counter in
+    # "<file>.gen" (mmap'd by all of them) so caches in the other workers
+    # are revalidated before their next read
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", "1"))
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    # caches whose generation hasn't moved still re-stat their files this
+    # often, to notice edits made outside the app
+    COHERENCE_RECHECK_SEC: float = float(os.getenv("COHERENCE_RECHECK_SEC", "1"))
+
+    # load the data and run the analytics once at startup, before /ready
+    # turns 200 (see src/app/warmup.py)
+    WARMUP: bool = _env_bool("WARMUP", "true")
+
+    # "debug" shows one line per request and mutation
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info")
+    # "json" (one object per line) or "text"
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+
 settings = Settings()
@@ -0,0 +1,33 @@
+import importlib
+import threading
+
+# =========================================================
+# lazy objects
+# ---------------------------------------------------------
+# Route modules name their service as "module:Class" instead of
+# importing it. The module (and pandas, behind every repo) is imported
+# and the service created on first use, so importing the app stays
+# cheap and the server is listening at once; the lifespan warm-up
+# (src/app/warmup.py) makes that first use happen before traffic does.
+# =========================================================
+
+
+class Lazy:
+    def __init__(self, target: str):
+        self._target = target
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        obj = self._obj
+        if obj is None:
+            with self._lock:
+                if self._obj is None:
+                    module, name = self._target.split(":")
+                    self._obj = getattr(importlib.import_module(module), name)()
+                obj = self._obj
+        return obj
+
+    def __getattr__(self, name: str):
+        # only reached for attributes Lazy itself doesn't have
+        return getattr(self.get(), name)
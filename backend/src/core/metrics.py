@@ -0,0 +1,185 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# =========================================================
+# metrics
+# ---------------------------------------------------------
+# In-process counters and histograms, rendered at /metrics in the
+# Prometheus text format. Recording is a dict lookup and a few adds
+# under a per-metric lock, so it stays on in production.
+#
+#   http_*   : every request, labelled by route template (not raw path)
+#   repo_*   : CSV / journal / columnar reads and writes: time, rows, bytes
+#   lock_*   : file lock wait and hold times
+#   cache_*  : hits and misses of the in-memory tables, indexes and memos
+#
+# Values are per process; with several workers each reports its own.
+# =========================================================
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, v in items:
+            out.append(f"{self.name}{_labels(self.labels, labels)} {v:g}")
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values: dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            v = self.values.get(labels)
+            if v is None:
+                v = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            v[0][i] += 1
+            v[1] += value
+            v[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self.values.items())
+        for labels, (counts, total, n) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket = _labels(self.labels, labels, 'le="' + le + '"')
+                out.append(f"{self.name}_bucket{bucket} {running}")
+            out.append(f"{self.name}_sum{_labels(self.labels, labels)} {total:g}")
+            out.append(f"{self.name}_count{_labels(self.labels, labels)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        m = Counter(name, help, labels)
+        self.metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labels, buckets)
+        self.metrics.append(m)
+        return m
+
+    def render(self) -> str:
+        lines = []
+        for m in self.metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "Requests served", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "Request latency", ("method", "route"))
+
+REPO_READ_SECONDS = REGISTRY.histogram("repo_read_seconds", "Time reading and parsing a data file", ("source",))
+REPO_READ_ROWS = REGISTRY.counter("repo_read_rows_total", "Rows parsed from data files", ("source",))
+REPO_READ_BYTES = REGISTRY.counter("repo_read_bytes_total", "Bytes read from data files", ("source",))
+REPO_WRITE_SECONDS = REGISTRY.histogram("repo_write_seconds", "Time writing (and syncing) a data file", ("target",))
+REPO_WRITE_BYTES = REGISTRY.counter("repo_write_bytes_total", "Bytes written to data files", ("target",))
+SALES_COMMIT_BATCH = REGISTRY.histogram("sales_commit_batch_size", "Checkouts per sales group commit", (), SIZE_BUCKETS)
+
+LOCK_WAIT = REGISTRY.histogram("lock_wait_seconds", "Time waiting for a file lock", ("lock", "mode"))
+LOCK_HOLD = REGISTRY.histogram("lock_hold_seconds", "Time a file lock was held", ("lock", "mode"))
+LOCK_TIMEOUTS = REGISTRY.counter("lock_timeouts_total", "File lock waits that timed out", ("lock", "mode"))
+
+CACHE = REGISTRY.counter("cache_requests_total", "In-memory cache lookups", ("cache", "result"))
+CACHE_EVICTIONS = REGISTRY.counter("cache_evictions_total", "Entries evicted from a size-capped cache", ("cache",))
+
+
+def observe_read(source: str, seconds: float, rows: int = 0, nbytes: int = 0) -> None:
+    REPO_READ_SECONDS.observe(seconds, source)
+    if rows:
+        REPO_READ_ROWS.inc(source, amount=rows)
+    if nbytes:
+        REPO_READ_BYTES.inc(source, amount=nbytes)
+
+
+def observe_write(target: str, seconds: float, nbytes: int = 0) -> None:
+    REPO_WRITE_SECONDS.observe(seconds, target)
+    if nbytes:
+        REPO_WRITE_BYTES.inc(target, amount=nbytes)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE.inc(cache, "hit" if hit else "miss")
+
+
+class MetricsMiddleware:
+    """ASGI middleware: count and time every HTTP request by route template."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            # unmatched paths share one label so 404 scans can't blow up cardinality
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, path)
+            HTTP_REQUESTS.inc(method, path, str(status[0]))
@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.core import metrics
+
+# =========================================================
+# response cache
+# ---------------------------------------------------------
+# Finished response bodies (the encoded JSON bytes), keyed on what
+# produced them plus the version of every source they were computed
+# from. A hit is sent as it is: no pandas, no encoding.
+#
+# Entries are never invalidated one by one: a write moves a version, so
+# the next lookup misses and the old entries become unreachable. The
+# first entry stored under new versions drops every entry of older
+# ones; the rest is least-recently-used, evicted once the bodies held
+# pass `max_bytes`.
+# =========================================================
+
+
+class ResponseCache:
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self.size = 0
+        self.versions = None
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple, versions: tuple) -> Optional[bytes]:
+        with self.lock:
+            body = self.entries.get((key, versions))
+            if body is not None:
+                self.entries.move_to_end((key, versions))
+        metrics.cache_lookup(self.name, body is not None)
+        return body
+
+    def put(self, key: tuple, versions: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if versions != self.versions:
+                self._drop(lambda k: k[1] != versions)
+                self.versions = versions
+            old = self.entries.pop((key, versions), None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[(key, versions)] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                metrics.CACHE_EVICTIONS.inc(self.name)
+
+    def _drop(self, stale) -> None:
+        for k in [k for k in self.entries if stale(k)]:
+            self.size -= len(self.entries.pop(k))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.versions = None
@@ -15,6 +15,7 @@ class Product(BaseModel):
     remark: Optional[str] = ""
     localtion: Optional[str] = ""
     type: Optional[str] = ""
+    Brand: Optional[str] = ""
 
 class ProductUpdate(BaseModel):
     number: Optional[int] = None
@@ -58,3 +59,23 @@ class ProductCreate(BaseModel):
     remark: Optional[str] = ""
     localtion: Optional[str] = ""  # keep column spelling
     type: Optional[str] = ""
+
+class StockAdjustment(BaseModel):
+    product_no: int
+    delta: int
+
+class ProductUpsert(BaseModel):
+    """One row of a bulk import; every field optional, only given ones are set"""
+    No_: Optional[int] = None
+    name: Optional[str] = None
+    piece_per_cost: Optional[int] = None
+    number: Optional[int] = None
+    cost: Optional[float] = None
+    sell_price_lower: Optional[float] = None
+    sell_price_avg: Optional[float] = None
+    profit: Optional[float] = None
+    description: Optional[str] = None
+    remark: Optional[str] = None
+    localtion: Optional[str] = None
+    type: Optional[str] = None
+    Brand: Optional[str] = None
@@ -0,0 +1,349 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import time
+from datetime import date, timedelta
+from typing import Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.core import metrics
+from src.core.config import settings
+from src.repos.csv_sales_repo import CsvSalesRepo, LOCK_FILE as SALES_LOCK_FILE, _product_totals
+from src.repos.csv_schema import SALES, SALES_COLUMNS
+from src.repos.locks import file_lock
+
+# =========================================================
+# columnar sales store
+# ---------------------------------------------------------
+# "<sales.csv>.columns/" holds one flat little-endian file per column:
+#
+#   ts.i8 product_no.i8 qty.i8      epoch-ns / ints (missing -> -1)
+#   unit_price.f8 total_line.f8     floats
+#   sale_id.s36                     fixed-width ascii
+#   customer_id.i4 product_name.i4  dictionary codes (-1 = missing),
+#   product_type.i4                 values in <col>.dict.json
+#   meta.json                       {"rows", "source_size"}
+#
+# Files are only ever appended to and meta.json is replaced last, so
+# `rows` is the commit point: readers memory-map exactly that prefix.
+# sales.csv stays the source of truth; `source_size` is how many of its
+# bytes are imported, and the tail is imported on the next read.
+#
+# Checkouts stamp `ts` at commit time, so ts.i8 is normally sorted and a
+# date range is two binary searches on it (else one vectorized compare).
+# =========================================================
+
+LOCK_FILE = os.path.join(settings.DATA_DIR, "locks", "sales_columnar.lock")
+
+COLUMNS = SALES_COLUMNS
+FIXED = {
+    "ts": "<i8",
+    "product_no": "<i8",
+    "qty": "<i8",
+    "unit_price": "<f8",
+    "total_line": "<f8",
+    "sale_id": "S36",
+}
+DICT_ENCODED = ["customer_id", "product_name", "product_type"]
+PRODUCT_COLUMNS = ["product_no", "qty", "unit_price"]
+
+# which mapped rows to read: a slice is a view, positions copy what they pick
+Rows = Union[slice, np.ndarray]
+
+
+def _file(col: str) -> str:
+    if col in DICT_ENCODED:
+        return col + ".i4"
+    return col + "." + FIXED[col].lstrip("<").lower()
+
+
+class ColumnarSalesStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.meta_path = os.path.join(root, "meta.json")
+
+    def meta(self) -> dict:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"rows": 0, "source_size": 0}
+
+    def _write_meta(self, meta: dict) -> None:
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def _dict(self, col: str) -> list:
+        try:
+            with open(os.path.join(self.root, col + ".dict.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def reset(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        for name in os.listdir(self.root):
+            os.remove(os.path.join(self.root, name))
+
+    # =========================================================
+    # write
+    # =========================================================
+    def append_frame(self, df: pd.DataFrame, source_size: int) -> None:
+        """Encode sale lines (sales.csv columns) and append them. Caller holds LOCK_FILE."""
+        os.makedirs(self.root, exist_ok=True)
+        meta = self.meta()
+        rows = meta["rows"]
+
+        # truncate anything a crashed append left past the committed rows
+        for col in COLUMNS:
+            path = os.path.join(self.root, _file(col))
+            width = np.dtype(FIXED.get(col, "<i4")).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != rows * width:
+                os.truncate(path, rows * width)
+
+        start = time.perf_counter()
+        written = 0
+        if len(df):
+            ts = pd.to_datetime(df["ts"], utc=True, errors="coerce", format="ISO8601")
+            arrays = {
+                "ts": ts.dt.as_unit("ns").astype("int64").where(ts.notna(), -1).to_numpy("<i8"),
+                "sale_id": df["sale_id"].astype(str).to_numpy("S36"),
+            }
+            for col in ["product_no", "qty"]:
+                arrays[col] = pd.to_numeric(df[col], errors="coerce").fillna(-1).to_numpy("<i8")
+            for col in ["unit_price", "total_line"]:
+                arrays[col] = pd.to_numeric(df[col], errors="coerce").to_numpy("<f8")
+
+            for col in DICT_ENCODED:
+                values = df[col].astype("string") if col in df else pd.Series(pd.NA, index=df.index, dtype="string")
+                known = self._dict(col)
+                seen = set(known)
+                new = [v for v in values.dropna().unique() if v not in seen]
+                categories = known + [str(v) for v in new]
+                arrays[col] = pd.Categorical(values, categories=categories).codes.astype("<i4")
+                if new:
+                    with open(os.path.join(self.root, col + ".dict.json"), "w", encoding="utf-8") as f:
+                        json.dump(categories, f, ensure_ascii=False)
+
+            for col in COLUMNS:
+                with open(os.path.join(self.root, _file(col)), "ab") as f:
+                    data = np.ascontiguousarray(arrays[col]).tobytes()
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    written += len(data)
+        metrics.observe_write("sales_columnar", time.perf_counter() - start, written)
+
+        self._write_meta({"rows": rows + len(df), "source_size": source_size})
+
+    # =========================================================
+    # read
+    # =========================================================
+    def _map(self, col: str, rows: int) -> np.ndarray:
+        dtype = np.dtype(FIXED.get(col, "<i4"))
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.root, _file(col)), dtype=dtype, mode="r", shape=(rows,))
+
+    def frame(
+        self,
+        rows: Optional[int] = None,
+        select: Optional[Rows] = None,
+        columns: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Sale lines: the first `rows` committed (default: all), or those
+        of them `select` picks, typed as SALES reads them.
+
+        Over a slice, the numeric columns are views on the mapped files:
+        ints as masked arrays (-1 on disk is NA), floats as they are.
+        `ts` is copied (8 bytes a line): pandas can't view int64 as
+        tz-aware datetimes, and missing ones become NaT in that copy.
+        sale_id is decoded to strings.
+        """
+        if rows is None:
+            rows = self.meta()["rows"]
+        data = {}
+        for col in columns or COLUMNS:
+            arr = self._map(col, rows)
+            if select is not None:
+                arr = arr[select]
+            if col == "ts":
+                ts = pd.Series(arr.view("M8[ns]"), copy=False).dt.tz_localize("UTC")
+                missing = arr == -1
+                data[col] = ts.mask(missing) if missing.any() else ts
+            elif col == "sale_id":
+                data[col] = pd.Series(arr, copy=False).str.decode("ascii")
+            elif col in DICT_ENCODED:
+                data[col] = pd.Categorical.from_codes(arr, categories=self._dict(col))
+            elif FIXED[col] == "<i8":
+                data[col] = pd.arrays.IntegerArray(arr, arr == -1)
+            else:
+                data[col] = arr
+        return pd.DataFrame(data, copy=False)
+
+
+def _read_tail(csv_path: str, start: int, size: int) -> tuple[pd.DataFrame, int]:
+    """Complete CSV lines in bytes [start, size) as a frame, and where they end."""
+    t = time.perf_counter()
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        tail = f.read(size - start)
+    end = tail.rfind(b"\n") + 1
+    df = SALES.read_csv(io.BytesIO(tail[:end] if start == 0 else header + tail[:end]))
+    metrics.observe_read("sales_columnar_tail", time.perf_counter() - t, len(df), end)
+    return df, start + end
+
+
+def convert(csv_path: str, root: str, chunksize: int = 500_000) -> int:
+    """
+    Build the columnar store for `csv_path` from scratch. Returns rows.
+    It is built in "<root>.building" and moved to `root` once complete:
+    a crash part way leaves no store (imported on the next read), never
+    a partial one claiming all of sales.csv.
+    """
+    building = ColumnarSalesStore(root + ".building")
+    os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+    # no checkout may append while the chunks are read
+    with file_lock(SALES_LOCK_FILE, shared=True), file_lock(LOCK_FILE):
+        building.reset()
+        size = os.path.getsize(csv_path)
+        for chunk in SALES.read_csv_chunks(csv_path, chunksize):
+            building.append_frame(chunk, 0)
+        rows = building.meta()["rows"]
+        building._write_meta({"rows": rows, "source_size": size})
+        shutil.rmtree(root, ignore_errors=True)
+        os.rename(building.root, root)
+        return rows
+
+
+def export(root: str, csv_path: str, chunksize: int = 500_000) -> int:
+    """Write the columnar store back out in the sales.csv layout. Returns rows."""
+    df = ColumnarSalesStore(root).frame()
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for start in range(0, len(df), chunksize):
+            part = df.iloc[start:start + chunksize].copy()
+            part["ts"] = part["ts"].dt.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+            part.to_csv(f, header=False, index=False)
+    return len(df)
+
+
+class ColumnarSalesRepo(CsvSalesRepo):
+    """
+    CsvSalesRepo that serves reads from the memory-mapped columnar copy.
+    Checkouts still append to sales.csv; new lines are imported on read.
+    Rollups stay those of sales.csv.
+    """
+    def __init__(self, path: str = settings.SALES_CSV):
+        super().__init__(path)
+        self.store = ColumnarSalesStore(path + ".columns")
+        # (rows, source_size) -> whether ts.i8 is sorted
+        self._sorted: tuple[tuple, bool] = ((-1, -1), False)
+
+    def _sync(self) -> None:
+        size = self.stamp.size()
+        fresh = self.store.meta()["source_size"] == size
+        metrics.cache_lookup("sales_columnar", fresh)
+        if fresh:
+            return
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(SALES_LOCK_FILE, shared=True), file_lock(LOCK_FILE):
+            meta = self.store.meta()
+            if size < meta["source_size"]:
+                # sales.csv was replaced: re-import everything
+                self.store.reset()
+                meta = {"rows": 0, "source_size": 0}
+            if size > meta["source_size"]:
+                df, end = _read_tail(self.path, meta["source_size"], size)
+                self.store.append_frame(df, end)
+
+    def read_df(self) -> pd.DataFrame:
+        self._sync()
+        return self.store.frame()
+
+    def _ts(self) -> tuple[int, np.ndarray, bool]:
+        """(rows, their mapped ts.i8, whether it is sorted), current with sales.csv."""
+        self._sync()
+        meta = self.store.meta()
+        rows = meta["rows"]
+        ts = self.store._map("ts", rows)
+        key = (rows, meta["source_size"])
+        if self._sorted[0] != key:
+            self._sorted = (key, bool((ts[1:] >= ts[:-1]).all()))
+        return rows, ts, self._sorted[1]
+
+    def _select(self, start: date, end: date) -> tuple[int, Rows]:
+        """(rows, which of them are dated start..end, UTC inclusive)."""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        rows, ts, is_sorted = self._ts()
+        lo = pd.Timestamp(start, tz="UTC").value
+        hi = pd.Timestamp(end + timedelta(days=1), tz="UTC").value
+        if is_sorted:
+            i, j = np.searchsorted(ts, [lo, hi])
+            return rows, slice(int(i), int(j))
+        # missing timestamps (-1) are before every date asked for
+        return rows, np.flatnonzero((ts >= lo) & (ts < hi))
+
+    def _chunks_of(self, rows: int, select: Rows, chunksize: int, columns: Optional[list[str]] = None) -> Iterator[pd.DataFrame]:
+        if isinstance(select, slice):
+            parts = (slice(i, min(i + chunksize, select.stop)) for i in range(select.start, select.stop, chunksize))
+        else:
+            parts = (select[i:i + chunksize] for i in range(0, len(select), chunksize))
+        for part in parts:
+            t = time.perf_counter()
+            chunk = self.store.frame(rows, part, columns)
+            metrics.observe_read("sales_columnar_chunk", time.perf_counter() - t, len(chunk))
+            yield chunk
+
+    def read_range(self, start: date, end: date) -> pd.DataFrame:
+        """Sale lines dated start..end (UTC, inclusive), exactly."""
+        t = time.perf_counter()
+        df = self.store.frame(*self._select(start, end))
+        metrics.observe_read("sales_columnar_range", time.perf_counter() - t, len(df))
+        return df
+
+    def iter_range(self, start: date, end: date, chunksize: int = settings.EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Sale lines dated start..end (UTC, inclusive) in file order, `chunksize` at a time."""
+        rows, select = self._select(start, end)
+        return self._chunks_of(rows, select, chunksize)
+
+    def product_totals(self, start: date, end: date) -> pd.DataFrame:
+        # only the three columns summed are read
+        rows, select = self._select(start, end)
+        return _product_totals(self._chunks_of(rows, select, settings.EXPORT_CHUNK_ROWS, PRODUCT_COLUMNS))
+
+    def latest_date(self) -> Optional[str]:
+        if not os.path.exists(self.path):
+            return None
+        rows, ts, is_sorted = self._ts()
+        last = int((ts[-1] if is_sorted else ts.max()) if rows else -1)
+        return None if last == -1 else pd.Timestamp(last, tz="UTC").date().isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar sales store bridge")
+    parser.add_argument("command", choices=["convert", "export"])
+    parser.add_argument("--sales", default=settings.SALES_CSV, help="sales.csv to read (convert) or write (export)")
+    parser.add_argument("--store", default=None, help="columnar directory (default: <sales>.columns)")
+    args = parser.parse_args()
+    root = args.store or args.sales + ".columns"
+
+    if args.command == "convert":
+        rows = convert(args.sales, root)
+        print(f"converted {rows} sale lines -> {root}")
+    else:
+        rows = export(root, args.sales)
+        print(f"exported {rows} sale lines -> {args.sales}")
+
+
+if __name__ == "__main__":
+    main()
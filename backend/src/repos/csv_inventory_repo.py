@@ -1,74 +1,548 @@
 import pandas as pd
-from typing import Optional
+import json
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+from src.core import metrics
 from src.core.config import settings
+from src.repos import csv_schema
+from src.repos.csv_schema import INVENTORY
+from src.repos.csv_stock_ledger import CsvStockLedger
+from src.repos.generation import CachedCheck, generation
 from src.repos.locks import file_lock
+from src.repos.inventory_search_index import InventorySearchIndex
 import os
 
 LOCK_FILE = os.path.join(settings.DATA_DIR, "locks", "inventory.lock")
 
-class CsvInventoryRepo:
-    def __init__(self, path: str = settings.INVENTORY_CSV):
-        self.path = path
-
-    def read_df(self) -> pd.DataFrame:
-        df = pd.read_csv(self.path)
-        df = df.fillna('null')
+log = logging.getLogger(__name__)
+
+# =========================================================
+# journal
+# ---------------------------------------------------------
+# Every mutation is appended to "<csv>.journal" as one JSON line
+# instead of rewriting data.csv. Records are idempotent (they carry
+# absolute values), so replaying the journal on top of the CSV snapshot
+# rebuilds the current table even if a compaction was interrupted.
+#
+#   {"op": "set",    "no": 12, "fields": {"number": 4}}
+#   {"op": "insert", "row": {"No_": 388, "name": "...", ...}}
+#   {"op": "delete", "ids": [3, 4]}
+# =========================================================
+
+
+def _row_index(df: pd.DataFrame, product_no: int):
+    idx = df.index[df["No_"] == product_no]
+    return idx[0] if len(idx) else None
+
+
+def _text(values: pd.Series) -> pd.Series:
+    # what the search matches against: missing values read as 'null'
+    return values.astype("string").fillna("null")
+
+
+def _stock(rows: pd.DataFrame) -> pd.Series:
+    """`number` as plain ints; missing stock counts as 0."""
+    return pd.to_numeric(rows["number"], errors="coerce").fillna(0).astype(int)
+
+
+def _stock_map(df: pd.DataFrame, nos: Optional[set] = None) -> dict[int, int]:
+    """{No_: stock} for `nos` (default: every product)."""
+    rows = df[df["No_"].notna()] if nos is None else df[df["No_"].isin(list(nos))]
+    rows = rows.drop_duplicates("No_")
+    return dict(zip(rows["No_"].astype(int).tolist(), _stock(rows).tolist()))
+
+
+def _stock_touched(records: list[dict]) -> set:
+    """Products whose stock `records` may change (or create / delete)."""
+    nos = set()
+    for rec in records:
+        if rec["op"] == "set" and "number" in rec["fields"]:
+            nos.add(int(rec["no"]))
+        elif rec["op"] == "insert":
+            nos.add(int(rec["row"]["No_"]))
+        elif rec["op"] == "delete":
+            nos.update(int(i) for i in rec["ids"])
+    return nos
+
+
+def _csv_value(value):
+    # what a value looks like after a round trip through the CSV
+    return None if value == "" else value
+
+
+def _set_cell(df: pd.DataFrame, i, col: str, value) -> None:
+    value = _csv_value(value)
+    if col not in df.columns:
+        df[col] = pd.Series(pd.NA, index=df.index, dtype=object)
+    elif isinstance(df[col].dtype, pd.CategoricalDtype) and value is not None \
+            and value not in df[col].cat.categories:
+        # keep categories sorted so sorting by the column stays alphabetical
+        df[col] = df[col].cat.set_categories(sorted(set(df[col].cat.categories) | {value}, key=str))
+    try:
+        df.at[i, col] = value
+    except (TypeError, ValueError):
+        # e.g. text into an all-empty float column
+        df[col] = df[col].astype(object)
+        df.at[i, col] = value
+
+
+def _apply(df: pd.DataFrame, rec: dict) -> pd.DataFrame:
+    """Apply one journal record. `set` is done in place; returns the new frame."""
+    op = rec["op"]
+    if op == "set":
+        i = _row_index(df, rec["no"])
+        if i is not None:
+            for k, v in rec["fields"].items():
+                _set_cell(df, i, k, v)
         return df
+    if op == "insert":
+        row = rec["row"]
+        i = _row_index(df, row["No_"])
+        if i is not None:
+            for k, v in row.items():
+                _set_cell(df, i, k, v)
+            return df
+        row = {k: _csv_value(v) for k, v in row.items()}
+        return INVENTORY.conform(pd.concat([df, pd.DataFrame([row])], ignore_index=True))
+    if op == "delete":
+        return df[~df["No_"].isin(rec["ids"])].reset_index(drop=True)
+    raise ValueError(f"Unknown journal op: {op}")
+
+
+# pandas >= 3 always copies on write: a shallow copy shares the columns
+# until one of them is assigned. Before that, the data has to be copied.
+_SHALLOW_COPY_IS_PRIVATE = int(pd.__version__.split(".")[0]) >= 3
+
+
+def _applied(df: pd.DataFrame, records: list[dict]) -> pd.DataFrame:
+    """A new frame with `records` applied; `df` itself is left as it was."""
+    out = df.copy(deep=not _SHALLOW_COPY_IS_PRIVATE)
+    for rec in records:
+        out = _apply(out, rec)
+    return out
+
+
+class _Search(NamedTuple):
+    """A frame and its search index, published together."""
+    df: pd.DataFrame
+    index: InventorySearchIndex
+    positions: Optional[pd.Index]               # No_ -> row position of df
+
+
+class _ResidentTable:
+    """
+    Parsed copy of one inventory CSV (+ journal), shared by every repo
+    instance in the process. Updated while holding `lock`, by publishing
+    a new frame (and search index): neither is modified once handed
+    out, so readers use them without the lock.
+    """
+    def __init__(self):
+        self.df: Optional[pd.DataFrame] = None
+        self.stamp: Optional[tuple] = None      # snapshot CSV (mtime_ns, size)
+        self.journal_offset = 0                  # bytes of journal already applied
+        self.lock = threading.RLock()
+        # built on first search, then carried forward with each record
+        # (None, or search.df is df)
+        self.search: Optional[_Search] = None
+        # generation of data.csv the frame was last validated at
+        self.check = CachedCheck()
+
+    def replace(self, df: pd.DataFrame, stamp: tuple, journal_offset: int) -> None:
+        self.df, self.stamp, self.journal_offset = df, stamp, journal_offset
+        self.search = None
+
+    def applied(self, df: pd.DataFrame, records: list[dict]) -> None:
+        """Publish `df`: the current frame with `records` applied (see `_applied`)."""
+        search = self.search
+        if search is not None:
+            # rows only move when some are inserted or deleted
+            moved = any(rec["op"] != "set" for rec in records)
+            self.search = _Search(df, search.index.updated(records), None if moved else search.positions)
+        self.df = df
+
+
+_TABLES: dict[str, _ResidentTable] = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def _resident_table(path: str) -> _ResidentTable:
+    key = os.path.abspath(path)
+    with _TABLES_LOCK:
+        table = _TABLES.get(key)
+        if table is None:
+            table = _TABLES[key] = _ResidentTable()
+        return table
 
-    def write_df(self, df: pd.DataFrame) -> None:
-        df.to_csv(self.path, index=False)
-
-    def search(self, q: Optional[str], type_: Optional[str]) -> pd.DataFrame:
-        # print('------------from CsvInventoryRepo:----------------')
-        df = self.read_df()
-        # try:
-        #     df = df.sort_values('type').reset_index(drop=True)
-        # except:
-        #     pass
-
-        # df['No_'] = df.index + 1
-        df = df.fillna('null')
-        # print('------------from CsvInventoryRepo:', df.head(),'----------------', df.columns)
-        if q:
-            df = df[df["name"].astype(str).str.contains(q, case=False, na=False)]
-        if type_:
-            df = df[df["type"].astype(str).str.contains(type_, case=False, na=False)]
-        return df
 
-    def update_product_fields(self, product_no: int, updates: dict) -> pd.DataFrame:
+class CsvInventoryRepo:
+    def __init__(
+        self,
+        path: str = settings.INVENTORY_CSV,
+        resident: bool = settings.INVENTORY_RESIDENT,
+        journal_max_bytes: int = settings.INVENTORY_JOURNAL_MAX_BYTES,
+    ):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.resident = resident
+        self.journal_max_bytes = journal_max_bytes
+        self.generation = generation(path)
+        self.ledger = CsvStockLedger(path + ".ledger")
+
+    # =========================================================
+    # snapshot + journal I/O
+    # =========================================================
+    def _stamp(self) -> tuple:
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+
+    def _read_journal(self, offset: int = 0) -> tuple[list[dict], int]:
+        """
+        Records from `offset` on, plus the offset after the last complete
+        line. A torn trailing line (crash mid-append) is left unconsumed.
+        """
+        start = time.perf_counter()
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        metrics.observe_read("inventory_journal", time.perf_counter() - start, len(records), len(data))
+        return records, offset + end
+
+    def _append_journal(self, records: list[dict]) -> int:
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        start = time.perf_counter()
+        with open(self.journal_path, "ab+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    payload = b"\n" + payload
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            end = f.tell()
+        metrics.observe_write("inventory_journal", time.perf_counter() - start, len(payload))
+        return end
+
+    def _load(self) -> tuple[pd.DataFrame, tuple, int]:
+        """Snapshot + full journal replay -> (frame, snapshot stamp, journal offset)."""
+        while True:
+            stamp = self._stamp()
+            start = time.perf_counter()
+            df = INVENTORY.read_csv(self.path)
+            metrics.observe_read("inventory_csv", time.perf_counter() - start, len(df), stamp[1])
+            records, offset = self._read_journal()
+            # a compaction swapped the snapshot while we were reading it;
+            # the journal we hold may already be truncated, so start over
+            if self._stamp() == stamp:
+                break
+        for rec in records:
+            df = _apply(df, rec)
+        return df, stamp, offset
+
+    def _table(self) -> pd.DataFrame:
+        """
+        Current inventory frame, typed by the INVENTORY schema and with
+        missing values left as NA. In resident mode
+        this is the shared in-memory copy (refreshed only when the snapshot
+        or journal changed on disk), so callers must not mutate it.
+        """
+        if not self.resident:
+            return self._load()[0]
+
+        table = _resident_table(self.path)
+        gen = self.generation.value()
+        if table.df is not None and table.check.fresh(gen):
+            # no worker wrote since we last looked: no stat() needed
+            metrics.cache_lookup("inventory_table", True)
+            return table.df
+
+        stamp = self._stamp()
+        journal_size = self._journal_size()
+        if table.df is not None and table.stamp == stamp and table.journal_offset == journal_size:
+            metrics.cache_lookup("inventory_table", True)
+            table.check.mark(gen)
+            return table.df
+
+        metrics.cache_lookup("inventory_table", False)
+        with table.lock:
+            if table.df is not None and table.stamp == stamp and table.journal_offset < journal_size:
+                # another process appended to the journal: replay only the tail
+                records, offset = self._read_journal(table.journal_offset)
+                if records:
+                    table.applied(_applied(table.df, records), records)
+                table.journal_offset = offset
+            elif table.df is None or table.stamp != stamp or table.journal_offset != journal_size:
+                table.replace(*self._load())
+            table.check.mark(gen)
+            return table.df
+
+    def _commit(self, records: list[dict], reason: str, df: pd.DataFrame) -> None:
+        """
+        Persist mutation records, apply them to the resident table, add
+        the stock movements they make to the ledger and bump the
+        generation so other workers reload. `df` is the current table.
+        Callers hold the inventory lock.
+        """
+        # stock of the products concerned before and after, on their rows only
+        touched = _stock_touched(records)
+        if touched:
+            before = _stock_map(df, touched)
+            after = _stock_map(_applied(df[df["No_"].isin(list(touched))], records))
+
+        if self.resident:
+            table = _resident_table(self.path)
+            with table.lock:
+                df = self._table()
+                offset = self._append_journal(records)
+                table.applied(_applied(df, records), records)
+                table.journal_offset = offset
+                # our own write is already applied: stay fresh
+                table.check.mark(self.generation.bump())
+        else:
+            offset = self._append_journal(records)
+            self.generation.bump()
+
+        if touched:
+            self.ledger.record(before, after, reason, lambda: _stock_map(self._table()))
+        if offset >= self.journal_max_bytes:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Fold the journal into a fresh snapshot. Callers hold the inventory lock."""
+        df = self._table()
+        self.write_df(df)
+        with open(self.journal_path, "wb"):
+            pass
+        gen = self.generation.bump()
+        if self.resident:
+            table = _resident_table(self.path)
+            with table.lock:
+                table.stamp, table.journal_offset = self._stamp(), 0
+                table.check.mark(gen)
+
+    def compact(self) -> None:
         os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
         with file_lock(LOCK_FILE):
-            df = self.read_df()
-            idx = df.index[df["No_"] == product_no]
-            if len(idx) == 0:
-                raise KeyError(f"Product No_={product_no} not found")
-            i = idx[0]
-            for k, v in updates.items():
-                if v is not None:
-                    df.at[i, k] = v
-            self.write_df(df)
-        return df
+            self._compact()
+
+    @property
+    def version(self) -> tuple:
+        """
+        (snapshot stamp, journal bytes): changes whenever the inventory
+        content may have changed, and is the same in every process.
+        """
+        if self.resident:
+            self._table()
+            table = _resident_table(self.path)
+            with table.lock:
+                return (table.stamp, table.journal_offset)
+        return (self._stamp(), self._journal_size())
+
+    def read_df(self, fill_null: bool = True) -> pd.DataFrame:
+        df = self._table()
+        if fill_null:
+            return csv_schema.fill_null(df)
+        return df.copy() if self.resident else df
 
-    def decrement_stock(self, product_no: int, qty: int) -> None:
+    def write_df(self, df: pd.DataFrame) -> None:
+        """Write a full snapshot atomically (temp file + rename)."""
+        tmp = self.path + ".tmp"
+        start = time.perf_counter()
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, self.path)
+        metrics.observe_write("inventory_snapshot", time.perf_counter() - start, os.path.getsize(self.path))
+
+    # =========================================================
+    # queries / mutations
+    # =========================================================
+    def _search_indexed(self, q: Optional[str], type_: Optional[str]) -> Optional[pd.DataFrame]:
+        """Rows matching via the resident n-gram index, or None to fall back to a scan."""
+        df = self._table()
+        table = _resident_table(self.path)
+        search = table.search
+        metrics.cache_lookup("inventory_search_index", search is not None and search.df is df)
+        if search is None or search.df is not df or search.positions is None:
+            # built off the lock, then published unless a write got there first
+            index = search.index if search is not None and search.df is df else InventorySearchIndex.build(df)
+            search = _Search(df, index, pd.Index(df["No_"]))
+            with table.lock:
+                if table.df is df:
+                    table.search = search
+
+        found = search.index.candidates(q, type_)
+        if found is None or not search.positions.is_unique:
+            return None
+        pos = search.positions.get_indexer(list(found))
+        pos = pos[pos >= 0]
+        pos.sort()
+        return df.take(pos)
+
+    def search(self, q: Optional[str], type_: Optional[str], fill_null: bool = True) -> pd.DataFrame:
+        """
+        Rows whose name / type contain q / type_ (case-insensitive).
+        With fill_null=False the rows are returned unfilled; don't mutate them.
+        """
+        df = None
+        if (q or type_) and self.resident:
+            df = self._search_indexed(q, type_)
+
+        if df is None:
+            df = self._table()
+            if q:
+                df = df[_text(df["name"]).str.contains(q, case=False, na=False)]
+            if type_:
+                df = df[_text(df["type"]).str.contains(type_, case=False, na=False)]
+        return csv_schema.fill_null(df) if fill_null else df
+
+    def update_product_fields(self, product_no: int, updates: dict) -> None:
         os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
         with file_lock(LOCK_FILE):
-            df = self.read_df()
-            idx = df.index[df["No_"] == product_no]
-            if len(idx) == 0:
+            df = self._table()
+            if _row_index(df, product_no) is None:
                 raise KeyError(f"Product No_={product_no} not found")
-            i = idx[0]
-            current = int(df.at[i, "number"])
-            if current < qty:
-                raise ValueError(f"Not enough stock for No_={product_no} (have {current}, need {qty})")
-            df.at[i, "number"] = current - qty
-            self.write_df(df)
+            fields = {k: v for k, v in updates.items() if v is not None}
+            self._commit([{"op": "set", "no": product_no, "fields": fields}], "update", df)
+
+    def decrement_many(self, lines: list[tuple[int, int]]) -> pd.DataFrame:
+        """
+        Take stock for a whole cart in one transaction: one lock, one
+        lookup over the table, one journal write. Quantities for a repeated
+        product_no are summed. Nothing is written if any line fails.
+        Returns the affected rows indexed by No_ (typed, missing values NA).
+        """
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE):
+            df = self._table()
+
+            wanted = (
+                pd.DataFrame(lines, columns=["No_", "qty"])
+                  .groupby("No_", sort=False)["qty"]
+                  .sum()
+            )
+            rows = (
+                df[df["No_"].isin(wanted.index)]
+                  .drop_duplicates("No_")
+                  .set_index("No_")
+            )
+
+            missing = wanted.index.difference(rows.index)
+            if len(missing):
+                first = next(pno for pno in wanted.index if pno in missing)
+                raise KeyError(f"Product No_={first} not found")
+
+            stock = _stock(rows).reindex(wanted.index)
+            short = stock < wanted
+            if short.any():
+                pno = short.idxmax()
+                raise ValueError(f"Not enough stock for No_={pno} (have {stock[pno]}, need {wanted[pno]})")
+
+            left = stock - wanted
+            self._commit([
+                {"op": "set", "no": int(pno), "fields": {"number": int(n)}}
+                for pno, n in left.items()
+            ], "checkout", df)
+            return rows
+
+    def adjust_many(self, deltas: list[tuple[int, int]], reason: str = "adjust") -> dict[int, tuple[int, int]]:
+        """
+        Add signed deltas to stock in one transaction. Deltas for a
+        repeated product_no are summed. Nothing is written if any product
+        is missing or would go below zero. `reason` is what the stock
+        ledger records. Returns {No_: (before, after)}.
+        """
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE):
+            df = self._table()
+
+            delta = (
+                pd.DataFrame(deltas, columns=["No_", "delta"])
+                  .groupby("No_", sort=False)["delta"]
+                  .sum()
+            )
+            rows = df[df["No_"].isin(delta.index)].drop_duplicates("No_").set_index("No_")
+
+            missing = delta.index.difference(rows.index)
+            if len(missing):
+                first = next(pno for pno in delta.index if pno in missing)
+                raise KeyError(f"Product No_={first} not found")
+
+            before = _stock(rows).reindex(delta.index)
+            after = before + delta
+            negative = after < 0
+            if negative.any():
+                pno = negative.idxmax()
+                raise ValueError(f"Not enough stock for No_={pno} (have {before[pno]}, delta {delta[pno]})")
+
+            self._commit([
+                {"op": "set", "no": int(pno), "fields": {"number": int(n)}}
+                for pno, n in after.items()
+            ], reason, df)
+            return {int(pno): (int(before[pno]), int(after[pno])) for pno in delta.index}
+
+    def upsert_products(self, rows: list[tuple[Optional[int], dict, Optional[dict]]], strict: bool = False) -> dict:
+        """
+        Create or update many products in one transaction and one journal
+        write. Each row is (No_, fields, new_row), applied in order:
+          No_ of an existing product -> `fields` are set on it
+          no No_ / an unknown No_    -> `new_row` is inserted (with the next
+                                        free number if No_ is None)
+        A row that would need inserting but has no new_row is rejected;
+        with strict=True nothing is written if any row is rejected.
+        Returns {"created": [No_], "updated": [No_], "rejected": [row position]}.
+        """
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE):
+            df = self._table()
+            existing = set(int(n) for n in df["No_"].dropna()) if "No_" in df else set()
+            next_no = max(existing, default=0) + 1
+
+            records, created, updated, rejected = [], [], [], []
+            for pos, (no, fields, new_row) in enumerate(rows):
+                if no is not None and no in existing:
+                    records.append({"op": "set", "no": int(no), "fields": fields})
+                    updated.append(int(no))
+                    continue
+                if new_row is None:
+                    rejected.append(pos)
+                    continue
+                no = next_no if no is None else int(no)
+                next_no = max(next_no, no + 1)
+                existing.add(no)
+                records.append({"op": "insert", "row": {**new_row, "No_": no}})
+                created.append(no)
+
+            if strict and rejected:
+                return {"created": [], "updated": [], "rejected": rejected}
+            if records:
+                self._commit(records, "import", df)
+        return {"created": created, "updated": updated, "rejected": rejected}
 
     def create_product(self, data: dict):
         os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
 
         with file_lock(LOCK_FILE):
-            df = self.read_df()
-            print('==============create_product1===================')
+            df = self._table()
 
             # ensure No_ exists as python int
             if "No_" in df:
@@ -80,68 +554,59 @@ class CsvInventoryRepo:
             next_no = max_no + 1
             data["No_"] = int(next_no)
 
-            print('==============create_product2===================')
-
-            # keep python types (avoid numpy.int64)
-            row = pd.DataFrame([data], dtype=object)
-
-            df = pd.concat([df, row], ignore_index=True)
-
-            print('==============create_product3', df.head(2), '=================')
-
-            self.write_df(df)
+            self._commit([{"op": "insert", "row": data}], "create", df)
+        log.debug("product created", extra={"product_no": data["No_"]})
 
         return data
 
 
-    
+
     def increment_stock(self, product_no: int, qty: int):
-        print('==============increment=================')
-        df = self.read_df()
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
 
-        idx = df.index[df["No_"] == product_no]
-        print('==============increment2', df[df["No_"] == product_no], '========')
-        if not len(idx):
-            raise KeyError("Product not found")
+        with file_lock(LOCK_FILE):
+            df = self._table()
 
-        i = idx[0]
-        df.at[i, "number"] = int(df.at[i, "number"]) + int(qty)
+            i = _row_index(df, product_no)
+            if i is None:
+                raise KeyError("Product not found")
 
-        self.write_df(df)
-        print('==============increment3', df.head(2),'=================')
-        return {"ok": True, "new_stock": df.at[i, "number"]}
+            new_stock = int(_stock(df.loc[[i]]).iloc[0]) + int(qty)
+
+            self._commit([{"op": "set", "no": product_no, "fields": {"number": new_stock}}], "add_stock", df)
+        log.debug("stock incremented", extra={"product_no": product_no, "new_stock": new_stock})
+        return {"ok": True, "new_stock": new_stock}
 
 
     def delete_products(self, ids: list[int]):
         os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
 
         with file_lock(LOCK_FILE):
-            df = self.read_df()
-
-            before = len(df)
+            df = self._table()
 
-            df = df[~df["No_"].isin(ids)].copy()
+            deleted = int(df["No_"].isin(ids).sum())
 
             # reassign No_
             # df["No_"] = range(1, len(df)+1)
 
-            self.write_df(df)
+            if deleted:
+                self._commit([{"op": "delete", "ids": [int(i) for i in ids]}], "delete", df)
 
-        return before - len(df)
+        return deleted
 
     def decrement_stock(self, product_no:int, qty:int):
-        df = self.read_df()
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
 
-        row = df[df["No_"] == product_no]
-        if row.empty:
-            raise KeyError("Product not found")
+        with file_lock(LOCK_FILE):
+            df = self._table()
 
-        idx = row.index[0]
-        current = int(df.at[idx, "number"])
+            i = _row_index(df, product_no)
+            if i is None:
+                raise KeyError("Product not found")
 
-        new_stock = max(0, current - qty)
-        df.at[idx, "number"] = new_stock
+            current = int(_stock(df.loc[[i]]).iloc[0])
 
-        self.write_df(df)
+            new_stock = max(0, current - qty)
+            self._commit([{"op": "set", "no": product_no, "fields": {"number": new_stock}}], "return_broken", df)
 
         return {"before": current, "after": new_stock}
@@ -1,51 +1,203 @@
-import csv, os, uuid
-from datetime import datetime, timezone
+import csv, io, logging, os, queue, threading, time, uuid
+from concurrent.futures import Future
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional
+from src.core import metrics
 from src.core.config import settings
+from src.repos.csv_schema import SALES, SALES_COLUMNS
+from src.repos.generation import file_stamp, generation
 from src.repos.locks import file_lock
+from src.repos.sales_rollups import SalesRollupStore, SalesRollups
+from src.repos.sales_date_index import SalesDateIndexStore
 import pandas as pd
 LOCK_FILE = os.path.join(settings.DATA_DIR, "locks", "sales.lock")
 
+log = logging.getLogger(__name__)
+
+PRODUCT_TOTALS = ["product_no", "units_sold", "revenue_total"]
+
+
+def _product_totals(chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+    """PRODUCT_TOTALS of sale lines read chunk by chunk."""
+    parts = [
+        chunk.assign(line_total=chunk["qty"] * chunk["unit_price"])
+             .groupby("product_no")
+             .agg(units_sold=("qty", "sum"), revenue_total=("line_total", "sum"))
+        for chunk in chunks
+    ]
+    if not parts:
+        return pd.DataFrame(columns=PRODUCT_TOTALS)
+    # summed per chunk, then across chunks: one row per product in memory
+    return pd.concat(parts).groupby(level=0).sum().reset_index()
+
+
+def _in_days(df: pd.DataFrame, start: date, end: date) -> pd.DataFrame:
+    """Lines dated start..end (UTC, inclusive); NaT days match neither bound."""
+    day = df["ts"].dt.floor("D")
+    return df[(day >= pd.Timestamp(start, tz="UTC")) & (day <= pd.Timestamp(end, tz="UTC"))]
+
+
+class _ByteRange(io.RawIOBase):
+    """The header line of a file followed by its bytes [lo, hi), as one stream."""
+    def __init__(self, path: str, lo: int, hi: int):
+        self.f = open(path, "rb")
+        self.pending = self.f.readline()
+        self.f.seek(max(lo, len(self.pending)))
+        self.left = max(0, hi - self.f.tell())
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self.pending and self.left:
+            self.pending = self.f.read(min(len(b), self.left))
+            self.left = 0 if not self.pending else self.left - len(self.pending)
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+    def close(self) -> None:
+        self.f.close()
+        super().close()
+
+
 class CsvSalesRepo:
     def __init__(self, path: str = settings.SALES_CSV):
         self.path = path
+        self.rollup_store = SalesRollupStore(path)
+        self.date_index = SalesDateIndexStore(path)
+        self.generation = generation(path)
+        self.stamp = file_stamp(path)
     def read_df(self) -> pd.DataFrame:
-        df = pd.read_csv(self.path)
-        df = df.fillna('null')
+        """Every sale line, typed by the SALES schema (missing values NA)."""
+        # shared lock: never parse a line a checkout is halfway through writing
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE, shared=True):
+            start = time.perf_counter()
+            df = SALES.read_csv(self.path)
+            metrics.observe_read("sales_csv", time.perf_counter() - start, len(df), os.path.getsize(self.path))
+        return df
+
+    @property
+    def version(self) -> Optional[tuple]:
+        """Changes whenever sales.csv changes (None if it doesn't exist)."""
+        return self.stamp.get()
+
+    def rollups(self) -> SalesRollups:
+        """Daily / per-product aggregates, current with sales.csv."""
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE, shared=True):
+            return self.rollup_store.get(self.stamp.size())
+
+    def read_range(self, start: date, end: date) -> pd.DataFrame:
+        """
+        Sale lines dated start..end (UTC, inclusive) and possibly a few
+        neighbours; callers still filter on the exact date. Reads only the
+        byte range the date index points at.
+        """
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE, shared=True):
+            idx = self.date_index.get(self.stamp.size())
+            t = time.perf_counter()
+            if not idx.ordered:
+                df = SALES.read_csv(self.path)
+                nbytes = os.path.getsize(self.path)
+            else:
+                lo, hi = idx.byte_range(start.isoformat(), end.isoformat())
+                with open(self.path, "rb") as f:
+                    header = f.readline()
+                    f.seek(lo)
+                    body = f.read(hi - lo) if hi > lo else b""
+                df = SALES.read_csv(io.BytesIO(header + body))
+                nbytes = len(body)
+            metrics.observe_read("sales_range", time.perf_counter() - t, len(df), nbytes)
         return df
-    
+
+    def iter_range(self, start: date, end: date, chunksize: int = settings.EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Sale lines dated start..end (UTC, inclusive) in file order, as
+        typed chunks of at most `chunksize` lines. Covers the lines on disk
+        when called; the lock isn't held while iterating, since checkouts
+        only append past that point.
+        """
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE, shared=True):
+            idx = self.date_index.get(self.stamp.size())
+            if idx.ordered:
+                lo, hi = idx.byte_range(start.isoformat(), end.isoformat())
+            else:
+                lo, hi = 0, os.path.getsize(self.path)
+        return self._chunks(lo, hi, start, end, chunksize)
+
+    def _chunks(self, lo: int, hi: int, start: date, end: date, chunksize: int) -> Iterator[pd.DataFrame]:
+        with io.BufferedReader(_ByteRange(self.path, lo, hi)) as f:
+            t = time.perf_counter()
+            for chunk in SALES.read_csv_chunks(f, chunksize):
+                metrics.observe_read("sales_chunk", time.perf_counter() - t, len(chunk))
+                chunk = _in_days(chunk, start, end)
+                if not chunk.empty:
+                    yield chunk
+                t = time.perf_counter()
+
+    def product_totals(self, start: date, end: date) -> pd.DataFrame:
+        """product_no, units_sold, revenue_total (qty * unit_price) for start..end (UTC, inclusive)."""
+        return _product_totals(self.iter_range(start, end))
+
+    def latest_date(self) -> Optional[str]:
+        """Most recent sale date (UTC, YYYY-MM-DD) or None if there are no sales."""
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with file_lock(LOCK_FILE, shared=True):
+            idx = self.date_index.get(self.stamp.size())
+        if idx.ordered:
+            return idx.latest()
+        with idx.lock:
+            return max(idx.dates) if idx.dates else None
+
     def _ensure_file(self):
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         if not os.path.exists(self.path):
             with open(self.path, "w", newline="", encoding="utf-8") as f:
                 w = csv.writer(f)
-                w.writerow([
-                    "sale_id",
-                    "ts",
-                    "customer_id",
-                    "product_no",
-                    "product_name",
-                    "product_type",   # ✅ NEW
-                    "qty",
-                    "unit_price",
-                    "total_line",
-                ])
+                w.writerow(SALES_COLUMNS)
 
 
-    def append_lines(self, customer_id: str, lines: list[dict]) -> tuple[str, datetime]:
+    def submit_lines(self, customer_id: str, lines: list[dict]) -> Future:
+        """
+        Queue one checkout for the next group commit. The future resolves
+        to (sale_id, ts) once its lines are written and fsynced.
+        """
         self._ensure_file()
-        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        return _committer(self).submit(_PendingSale(customer_id, lines))
 
-        sale_id = str(uuid.uuid4())
-        ts = datetime.now(timezone.utc)
+    def append_lines(self, customer_id: str, lines: list[dict]) -> tuple[str, datetime]:
+        return self.submit_lines(customer_id, lines).result()
+
+    def _write_batch(self, batch: list["_PendingSale"]) -> None:
+        """Append every sale of `batch` with one write and one fsync."""
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
 
         with file_lock(LOCK_FILE):
-            with open(self.path, "a", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                for ln in lines:
+            # fold in anything other processes appended before our lines
+            rollups = self.rollup_store.get()
+            index = self.date_index.get()
+            offset = os.path.getsize(self.path)
+
+            chunks = []
+            for sale in batch:
+                # stamped at commit time, so timestamps follow file order
+                sale.ts = datetime.now(timezone.utc)
+                buf = io.StringIO()
+                w = csv.writer(buf)
+                for ln in sale.lines:
                     w.writerow([
-                        sale_id,
-                        ts.isoformat(),
-                        customer_id,
+                        sale.sale_id,
+                        sale.ts.isoformat(),
+                        sale.customer_id,
                         ln["product_no"],
                         ln["product_name"],
                         ln["product_type"],   # ✅ NEW
@@ -53,6 +205,108 @@ class CsvSalesRepo:
                         ln["unit_price"],
                         ln["total_line"],
                     ])
+                chunks.append(buf.getvalue().encode("utf-8"))
+
+            payload = b"".join(chunks)
+            t = time.perf_counter()
+            with open(self.path, "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            metrics.observe_write("sales_csv", time.perf_counter() - t, len(payload))
+            self.generation.bump()
+            metrics.SALES_COMMIT_BATCH.observe(len(batch))
+
+            # the sales are durable from here on: nothing below may fail them
+            try:
+                for sale, chunk in zip(batch, chunks):
+                    end = offset + len(chunk)
+                    self.rollup_store.add_sale(rollups, sale.ts, sale.lines, end)
+                    self.date_index.add_sale(index, sale.ts, offset, end)
+                    offset = end
+            except Exception:
+                # drop what may be half updated; the next read reloads the
+                # saved checkpoints and folds sales.csv in from there
+                log.exception("rollups / date index not updated after a commit", extra={"path": self.path})
+                self.rollup_store.forget()
+                self.date_index.forget()
+
+
+# =========================================================
+# group commit
+# ---------------------------------------------------------
+# Checkouts are not written one by one. A committer thread per sales
+# file takes the first queued sale, keeps collecting for up to
+# SALES_COMMIT_WINDOW_MS or SALES_COMMIT_MAX_BATCH sales, then appends
+# the whole batch under one lock with one write and one fsync, and only
+# then resolves every caller's future. An acknowledged sale is on disk;
+# under load many checkouts share the cost of each fsync.
+#
+# If the write fails, every future of the batch fails with the same
+# exception. The committer knows nothing of stock: CartService took it
+# before queueing the sale and gives it back when the future fails
+# (ledger reason "checkout_failed"). Once the batch is fsynced its
+# futures succeed: keeping the rollups and the date index up to date is
+# best effort, and they are rebuilt from sales.csv if that fails.
+# =========================================================
+class _PendingSale:
+    def __init__(self, customer_id: str, lines: list[dict]):
+        self.customer_id = customer_id
+        self.lines = lines
+        self.sale_id = str(uuid.uuid4())
+        self.ts: Optional[datetime] = None
+        self.future: Future = Future()
+
+
+class _GroupCommitter:
+    def __init__(self, repo, window_sec: float, max_batch: int):
+        self.repo = repo
+        self.window_sec = window_sec
+        self.max_batch = max(1, max_batch)
+        self.queue: queue.Queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="sales-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, sale: _PendingSale) -> Future:
+        self.queue.put(sale)
+        return sale.future
+
+    def _collect(self) -> list[_PendingSale]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window_sec
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self.repo._write_batch(batch)
+            except Exception as e:
+                for sale in batch:
+                    sale.future.set_exception(e)
+            else:
+                for sale in batch:
+                    sale.future.set_result((sale.sale_id, sale.ts))
+
+
+_COMMITTERS: dict[str, _GroupCommitter] = {}
+_COMMITTERS_LOCK = threading.Lock()
+
 
-                    
-        return sale_id, ts
+def _committer(repo) -> _GroupCommitter:
+    """The committer of repo's store (any repo with `path` and `_write_batch`)."""
+    key = os.path.abspath(repo.path)
+    with _COMMITTERS_LOCK:
+        c = _COMMITTERS.get(key)
+        if c is None:
+            c = _COMMITTERS[key] = _GroupCommitter(
+                type(repo)(repo.path),
+                settings.SALES_COMMIT_WINDOW_MS / 1000.0,
+                settings.SALES_COMMIT_MAX_BATCH,
+            )
+        return c
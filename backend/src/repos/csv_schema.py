@@ -0,0 +1,164 @@
+import logging
+import types
+from typing import Iterator, Optional, Union, get_args, get_origin
+
+import pandas as pd
+
+from src.domain.schemas import Product
+
+log = logging.getLogger(__name__)
+
+# =========================================================
+# CSV schemas
+# ---------------------------------------------------------
+# Every parse of data.csv / sales.csv goes through a TableSchema, so all
+# repos hand out frames typed the same way:
+#
+#   int fields    -> Int64 (nullable: an empty cell is <NA>, not a float)
+#   float fields  -> float64
+#   text          -> string; low-cardinality text (type) -> category
+#   timestamps    -> datetime64[ns, UTC], parsed with one fixed format
+#
+# Frames keep their missing values. The API's 'null' placeholder is put
+# in once, when a frame is turned into JSON records (`to_records`).
+# =========================================================
+
+NULL = "null"
+
+# datetime.isoformat() of an aware UTC timestamp with microseconds
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+# the same, for strftime: isoformat() text ("%z" would format as "+0000")
+TS_TEXT = "%Y-%m-%dT%H:%M:%S.%f+00:00"
+
+_DTYPES = {int: "Int64", float: "float64", str: "string"}
+
+
+def _dtype(annotation) -> str:
+    """pandas dtype for a pydantic field annotation (Optional[X] -> X)."""
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        annotation = args[0] if len(args) == 1 else str
+    return _DTYPES.get(annotation, "string")
+
+
+def parse_ts(values: pd.Series) -> pd.Series:
+    """Timestamps as datetime64[ns, UTC]; unparseable ones become NaT."""
+    try:
+        ts = pd.to_datetime(values, format=TS_FORMAT, utc=True)
+    except (ValueError, TypeError):
+        # e.g. isoformat() drops ".%f" when microseconds are 0
+        ts = pd.to_datetime(values, format="ISO8601", utc=True, errors="coerce")
+    return ts.dt.as_unit("ns")
+
+
+class TableSchema:
+    def __init__(self, dtypes: dict[str, str], timestamps: tuple = (), strict: bool = False):
+        """
+        dtypes:     column -> pandas dtype
+        timestamps: columns parsed with `parse_ts`
+        strict:     drop columns the schema doesn't know (otherwise they
+                    are kept and left to pandas' inference)
+        """
+        self.dtypes = dtypes
+        self.timestamps = timestamps
+        self.strict = strict
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.dtypes)
+
+    def _usecols(self, columns: Optional[list[str]]):
+        if columns is not None:
+            wanted = set(columns)
+            return lambda c: c in wanted
+        if self.strict:
+            return lambda c: c in self.dtypes
+        return None
+
+    def _read_dtypes(self, relaxed: bool = False) -> dict[str, str]:
+        out = {}
+        for col, dtype in self.dtypes.items():
+            if col in self.timestamps:
+                dtype = "string"
+            elif relaxed and dtype == "Int64":
+                dtype = "float64"
+            out[col] = dtype
+        return out
+
+    def finish(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Post-parse step shared by whole-file and chunked reads."""
+        for col in self.timestamps:
+            if col in df:
+                df[col] = parse_ts(df[col])
+        return df
+
+    def read_csv(self, source, columns: Optional[list[str]] = None, **kw) -> pd.DataFrame:
+        """
+        Typed frame from a path or buffer. `columns` limits parsing to
+        those columns; extra keywords go to pd.read_csv.
+        """
+        try:
+            df = pd.read_csv(source, dtype=self._read_dtypes(), usecols=self._usecols(columns), **kw)
+        except (ValueError, TypeError):
+            # a fractional value in an int column: keep the data, read it as float
+            if hasattr(source, "seek"):
+                source.seek(0)
+            log.warning("int column with fractional values, reading as float", extra={"source": str(source)})
+            df = pd.read_csv(source, dtype=self._read_dtypes(relaxed=True), usecols=self._usecols(columns), **kw)
+        return self.finish(df)
+
+    def read_csv_chunks(self, source, chunksize: int, columns: Optional[list[str]] = None, **kw) -> Iterator[pd.DataFrame]:
+        reader = pd.read_csv(
+            source, dtype=self._read_dtypes(), usecols=self._usecols(columns), chunksize=chunksize, **kw
+        )
+        for chunk in reader:
+            yield self.finish(chunk)
+
+    def conform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cast schema columns back to their dtypes (e.g. after a concat)."""
+        for col, dtype in self.dtypes.items():
+            if col in df and col not in self.timestamps and str(df[col].dtype) != dtype:
+                try:
+                    df[col] = df[col].astype(dtype)
+                except (ValueError, TypeError):
+                    pass
+        return df
+
+
+def _product_dtypes() -> dict[str, str]:
+    dtypes = {name: _dtype(field.annotation) for name, field in Product.model_fields.items()}
+    dtypes["type"] = "category"
+    return dtypes
+
+
+INVENTORY = TableSchema(_product_dtypes())
+
+# sales.csv, in header order (CsvSalesRepo writes SALES_COLUMNS)
+SALES = TableSchema(
+    {
+        "sale_id": "string",
+        "ts": "datetime64[ns, UTC]",
+        "customer_id": "category",
+        "product_no": "Int64",
+        "product_name": "string",
+        "product_type": "category",
+        "qty": "Int64",
+        "unit_price": "float64",
+        "total_line": "float64",
+    },
+    timestamps=("ts",),
+    strict=True,
+)
+SALES_COLUMNS = SALES.columns
+
+
+# =========================================================
+# serialization boundary
+# =========================================================
+def fill_null(df: pd.DataFrame) -> pd.DataFrame:
+    """Object frame with every missing value replaced by 'null'."""
+    return df.astype(object).where(df.notna(), NULL)
+
+
+def to_records(df: pd.DataFrame) -> list[dict]:
+    return fill_null(df).to_dict(orient="records")
@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import pandas as pd
+
+from src.core import metrics
+from src.core.config import settings
+from src.repos.stock_ledger import MOVEMENT_COLUMNS, Checkpoint, StockLedger, moves, now_text
+
+# =========================================================
+# stock ledger files
+# ---------------------------------------------------------
+#   data.csv.ledger               the movements, one CSV line each
+#   data.csv.ledger.checkpoints/  index.jsonl: {"seq", "ts", "offset"}
+#                                 per checkpoint, and <seq>.json with
+#                                 its stock ({"No_": number, ...})
+#
+# `offset` is where the ledger stood when the checkpoint was taken, so
+# a replay reads only the bytes between two checkpoints. Movements are
+# appended while the inventory lock is held, after the journal record
+# they describe. The ledger isn't synced on its own: a power cut can
+# lose its last lines, never stock, and the next movement of a product
+# carries its stock again.
+# =========================================================
+
+_HEADER = (",".join(MOVEMENT_COLUMNS) + "\n").encode("utf-8")
+_INT_COLUMNS = ["seq", "product_no", "delta", "stock"]
+
+
+def _frame(data: bytes) -> pd.DataFrame:
+    if not data:
+        return pd.DataFrame({c: pd.Series(dtype="int64" if c in _INT_COLUMNS else object) for c in MOVEMENT_COLUMNS})
+    df = pd.read_csv(io.BytesIO(data), names=MOVEMENT_COLUMNS, header=None, dtype=str, on_bad_lines="skip")
+    for col in _INT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # a line torn by a crash mid-append
+    return df.dropna().astype({c: "int64" for c in _INT_COLUMNS}).reset_index(drop=True)
+
+
+class CsvStockLedger(StockLedger):
+    def __init__(self, path: str, checkpoint_every: int = settings.STOCK_CHECKPOINT_EVERY):
+        self.path = path
+        self.dir = path + ".checkpoints"
+        self.index_path = os.path.join(self.dir, "index.jsonl")
+        self.checkpoint_every = checkpoint_every
+        # (index bytes, checkpoints), the last checkpoint loaded and its stock,
+        # (seq, offset) of the ledger's end as last written
+        self._index: tuple[int, list[Checkpoint]] = (-1, [])
+        self._stock: Optional[tuple[Checkpoint, pd.Series]] = None
+        self._tail: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    # =========================================================
+    # reads
+    # =========================================================
+    def checkpoints(self) -> list[Checkpoint]:
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if self._index[0] == size:
+                return self._index[1]
+        with open(self.index_path, "rb") as f:
+            data = f.read(size)
+        cps = []
+        for line in data[:data.rfind(b"\n") + 1].splitlines():
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            cps.append(Checkpoint(rec["seq"], rec["ts"], rec["offset"]))
+        with self._lock:
+            self._index = (size, cps)
+        return cps
+
+    def checkpoint_stock(self, cp: Checkpoint) -> pd.Series:
+        cached = self._stock
+        metrics.cache_lookup("stock_checkpoint", cached is not None and cached[0] == cp)
+        if cached is not None and cached[0] == cp:
+            return cached[1]
+        start = time.perf_counter()
+        path = os.path.join(self.dir, f"{cp.seq}.json")
+        with open(path, "rb") as f:
+            stock = json.load(f)["stock"]
+        series = pd.Series({int(no): int(n) for no, n in stock.items()}, dtype="int64").sort_index()
+        metrics.observe_read("stock_checkpoint", time.perf_counter() - start, len(series), os.path.getsize(path))
+        self._stock = (cp, series)
+        return series
+
+    def read(self, cp: Checkpoint, until: Optional[Checkpoint], product_no: Optional[int] = None) -> pd.DataFrame:
+        start = time.perf_counter()
+        with open(self.path, "rb") as f:
+            f.seek(cp.pos)
+            data = f.read() if until is None else f.read(until.pos - cp.pos)
+        data = data[:data.rfind(b"\n") + 1]
+        df = _frame(data)
+        metrics.observe_read("stock_ledger", time.perf_counter() - start, len(df), len(data))
+        if product_no is not None:
+            df = df[df["product_no"] == product_no]
+        return df
+
+    # =========================================================
+    # writes (callers hold the inventory lock)
+    # =========================================================
+    def _end(self) -> tuple[int, int]:
+        """(seq, offset) of the last complete movement."""
+        size = os.path.getsize(self.path)
+        if self._tail is not None and self._tail[1] == size:
+            return self._tail
+        # another process appended: find the last line
+        with open(self.path, "rb") as f:
+            f.seek(max(0, size - 4096))
+            tail = f.read()
+        lines = tail[:tail.rfind(b"\n") + 1].splitlines()
+        seq = 0
+        # the header, or a line torn by a crash, doesn't start with a number
+        for line in reversed(lines):
+            head = line.split(b",", 1)[0]
+            if head.isdigit():
+                seq = int(head)
+                break
+        return seq, size
+
+    def _checkpoint(self, seq: int, offset: int, stock: dict[int, int]) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        ts = now_text()
+        start = time.perf_counter()
+        path = os.path.join(self.dir, f"{seq}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "ts": ts, "offset": offset, "stock": {str(no): int(n) for no, n in stock.items()}}, f)
+        os.replace(path + ".tmp", path)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"seq": seq, "ts": ts, "offset": offset}) + "\n")
+        metrics.observe_write("stock_checkpoint", time.perf_counter() - start, os.path.getsize(path))
+
+    def record(
+        self,
+        before: dict[int, int],
+        after: dict[int, int],
+        reason: str,
+        stock: Callable[[], dict[int, int]],
+    ) -> int:
+        """
+        Append the movements from `before` to `after` ({No_: stock} of the
+        products a mutation touched). `stock()` is every product's stock
+        once the mutation is applied, read only when a checkpoint is due.
+        Returns the number of movements written.
+        """
+        mv = moves(before, after)
+        if not mv:
+            return 0
+
+        cps = self.checkpoints()
+        if not cps or not os.path.exists(self.path):
+            # history starts here: the stock just before this mutation
+            # (a ledger without its checkpoints, or the reverse, is dropped)
+            with open(self.path, "wb") as f:
+                f.write(_HEADER)
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self._index, self._tail = (-1, []), None
+            opening = {no: n for no, n in stock().items() if no not in after}
+            opening.update(before)
+            self._checkpoint(0, len(_HEADER), opening)
+            cps = self.checkpoints()
+
+        seq, _ = self._end()
+        ts = now_text()
+        payload = "".join(
+            f"{seq + k},{ts},{no},{delta},{n},{reason}\n" for k, (no, delta, n) in enumerate(mv, 1)
+        ).encode("utf-8")
+        start = time.perf_counter()
+        with open(self.path, "ab+") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                payload = b"\n" + payload
+            f.write(payload)
+            end = f.tell()
+        metrics.observe_write("stock_ledger", time.perf_counter() - start, len(payload))
+        seq += len(mv)
+        self._tail = (seq, end)
+
+        if seq - cps[-1].seq >= self.checkpoint_every:
+            self._checkpoint(seq, end, stock())
+        return len(mv)
@@ -0,0 +1,157 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+from src.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# =========================================================
+# generation counters
+# ---------------------------------------------------------
+# "<data file>.gen" is an 8-byte little-endian counter, memory-mapped
+# shared by every process serving the data directory. Each mutation of
+# the data file bumps it after the change is on disk (the caller holds
+# the file's writer lock, so bumps never race).
+#
+# Per-process caches remember the generation they were built at. While
+# it is unchanged they are served with one memory read instead of
+# stat()s of the data files; a moved counter means another worker wrote
+# and the cache is revalidated from disk. Files changed by anything
+# that doesn't bump (a hand edit, a restored backup) are still noticed
+# through a stat at most every COHERENCE_RECHECK_SEC.
+#
+# Without a mapping (read-only data dir, no mmap) `value` is None and
+# callers fall back to checking the files every time.
+# =========================================================
+
+_FORMAT = "<Q"
+_SIZE = struct.calcsize(_FORMAT)
+
+
+class Generation:
+    def __init__(self, data_path: str):
+        self.path = data_path + ".gen"
+        self._mm: Optional[mmap.mmap] = None
+        self._tried = False
+        self._lock = threading.Lock()
+
+    def _map(self) -> Optional[mmap.mmap]:
+        # opened lazily, so a forked worker maps the file itself
+        if self._tried:
+            return self._mm
+        with self._lock:
+            if not self._tried:
+                try:
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    try:
+                        if os.fstat(fd).st_size < _SIZE:
+                            os.ftruncate(fd, _SIZE)
+                        self._mm = mmap.mmap(fd, _SIZE)
+                    finally:
+                        os.close(fd)
+                except (OSError, ValueError) as e:
+                    log.warning("no generation counter, checking files instead", extra={"path": self.path, "error": str(e)})
+                self._tried = True
+        return self._mm
+
+    def value(self) -> Optional[int]:
+        mm = self._map()
+        return None if mm is None else struct.unpack_from(_FORMAT, mm)[0]
+
+    def bump(self) -> Optional[int]:
+        """Count one mutation. Callers hold the data file's writer lock."""
+        mm = self._map()
+        if mm is None:
+            return None
+        value = struct.unpack_from(_FORMAT, mm)[0] + 1
+        struct.pack_into(_FORMAT, mm, 0, value)
+        return value
+
+
+class CachedCheck:
+    """
+    Whether a per-process cache may be served without looking at the
+    files: the counter hasn't moved since it was validated and that was
+    less than `recheck_sec` ago. Read the generation *before* looking at
+    the files, then `mark` it; a cache tagged with an older generation
+    than it holds is only revalidated once more, never served stale.
+    """
+    def __init__(self, recheck_sec: float = settings.COHERENCE_RECHECK_SEC):
+        self.recheck_sec = recheck_sec
+        # (generation, monotonic time, cached value), replaced as one object
+        self.state: tuple = (None, 0.0, None)
+
+    def lookup(self, generation: Optional[int]) -> tuple[bool, object]:
+        """(fresh, value marked with it)"""
+        seen, checked, value = self.state
+        fresh = (
+            generation is not None
+            and generation == seen
+            and time.monotonic() - checked < self.recheck_sec
+        )
+        return fresh, value
+
+    def fresh(self, generation: Optional[int]) -> bool:
+        return self.lookup(generation)[0]
+
+    def mark(self, generation: Optional[int], value=None) -> None:
+        self.state = (generation, time.monotonic(), value)
+
+
+class FileStamp:
+    """(mtime_ns, size) of a data file (None if missing), re-stat'ed only when stale."""
+    def __init__(self, path: str):
+        self.path = path
+        self.generation = generation(path)
+        self.check = CachedCheck()
+
+    def get(self) -> Optional[tuple]:
+        gen = self.generation.value()
+        fresh, value = self.check.lookup(gen)
+        if fresh:
+            return value
+        try:
+            st = os.stat(self.path)
+            value = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            value = None
+        self.check.mark(gen, value)
+        return value
+
+    def size(self) -> int:
+        value = self.get()
+        return value[1] if value else 0
+
+
+_GENERATIONS: dict[str, Generation] = {}
+_GENERATIONS_LOCK = threading.Lock()
+
+
+def generation(data_path: str) -> Generation:
+    """The (process-wide) counter of one data file."""
+    key = os.path.abspath(data_path)
+    with _GENERATIONS_LOCK:
+        gen = _GENERATIONS.get(key)
+        if gen is None:
+            gen = _GENERATIONS[key] = Generation(key)
+        return gen
+
+
+_STAMPS: dict[str, FileStamp] = {}
+
+
+def file_stamp(data_path: str) -> FileStamp:
+    """The (process-wide) cached stat of one data file."""
+    key = os.path.abspath(data_path)
+    stamp = _STAMPS.get(key)
+    if stamp is None:
+        # FileStamp() takes _GENERATIONS_LOCK itself
+        new = FileStamp(key)
+        with _GENERATIONS_LOCK:
+            stamp = _STAMPS.setdefault(key, new)
+    return stamp
@@ -0,0 +1,191 @@
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# =========================================================
+# inventory search index
+# ---------------------------------------------------------
+# /inventory/search matches `q` against name and `type_` against type as
+# case-insensitive substrings (pandas str.contains). This index answers
+# the same question without scanning every row:
+#
+#   name : bigram + trigram inverted index over the lowercased name.
+#          A query's trigrams (or its single bigram) give a candidate set,
+#          the smallest postings intersected first, then each candidate is
+#          checked with a real substring test. n-grams are taken over code
+#          points, so Thai and Latin text need no tokenizer.
+#   type : distinct type value -> product numbers. There are only a few
+#          dozen types, so matching values are found by checking each one.
+#
+# Text is what the old scan saw: missing values read as 'null'.
+# Queries with regex metacharacters keep the old str.contains regex
+# semantics: `candidates` returns None and the caller scans.
+#
+# Readers use an index without a lock, so a published index is never
+# changed: `updated` returns a copy with the journal records applied.
+# The copy shares the posting sets it doesn't touch and copies the
+# others on their first change.
+# =========================================================
+
+REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+def search_text(value) -> str:
+    return ("null" if pd.isna(value) else str(value)).lower()
+
+
+def _grams(text: str, n: int) -> set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def is_plain(q: str) -> bool:
+    return not (set(q) & REGEX_META)
+
+
+class InventorySearchIndex:
+    def __init__(self):
+        self.names: dict[int, str] = {}
+        self.postings: dict[str, set[int]] = {}
+        self.types: dict[str, set[int]] = {}
+        self.type_of: dict[int, str] = {}
+        # keys of `postings` / `types` whose sets belong to this index
+        # (None: all of them, i.e. not a copy)
+        self._owned: Optional[dict[str, set]] = None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "InventorySearchIndex":
+        idx = cls()
+        names = df["name"] if "name" in df else pd.Series(None, index=df.index)
+        types = df["type"] if "type" in df else pd.Series(None, index=df.index)
+        for no, name, type_ in zip(df["No_"], names, types):
+            idx.add(int(no), name, type_)
+        return idx
+
+    # =========================================================
+    # maintenance (only on an index nobody reads yet)
+    # =========================================================
+    def copy(self) -> "InventorySearchIndex":
+        idx = InventorySearchIndex()
+        idx.names = dict(self.names)
+        idx.postings = dict(self.postings)
+        idx.types = dict(self.types)
+        idx.type_of = dict(self.type_of)
+        idx._owned = {"postings": set(), "types": set()}
+        return idx
+
+    def updated(self, records: list[dict]) -> "InventorySearchIndex":
+        """This index with journal `records` applied: itself if none changes it, else a copy."""
+        if not any(rec["op"] != "set" or {"name", "type"} & rec["fields"].keys() for rec in records):
+            return self
+        idx = self.copy()
+        for rec in records:
+            idx.apply(rec)
+        return idx
+
+    def _own(self, table: str, key: str) -> set[int]:
+        """The set at `key` of postings / types, made this index's own to change."""
+        sets = getattr(self, table)
+        members = sets.get(key)
+        if members is None or not (self._owned is None or key in self._owned[table]):
+            members = sets[key] = set(members or ())
+            if self._owned is not None:
+                self._owned[table].add(key)
+        return members
+
+    def add(self, no: int, name, type_) -> None:
+        self.set_name(no, name)
+        self.set_type(no, type_)
+
+    def set_name(self, no: int, name) -> None:
+        self._drop_name(no)
+        text = search_text(name)
+        self.names[no] = text
+        for g in _grams(text, 2) | _grams(text, 3):
+            self._own("postings", g).add(no)
+
+    def set_type(self, no: int, type_) -> None:
+        self._drop_type(no)
+        text = search_text(type_)
+        self.type_of[no] = text
+        self._own("types", text).add(no)
+
+    def remove(self, nos: Iterable[int]) -> None:
+        for no in nos:
+            self._drop_name(no)
+            self._drop_type(no)
+
+    def _drop_name(self, no: int) -> None:
+        text = self.names.pop(no, None)
+        if text is None:
+            return
+        for g in _grams(text, 2) | _grams(text, 3):
+            if g in self.postings:
+                posting = self._own("postings", g)
+                posting.discard(no)
+                if not posting:
+                    del self.postings[g]
+
+    def _drop_type(self, no: int) -> None:
+        text = self.type_of.pop(no, None)
+        if text is None:
+            return
+        if text in self.types:
+            members = self._own("types", text)
+            members.discard(no)
+            if not members:
+                del self.types[text]
+
+    def apply(self, rec: dict) -> None:
+        """Keep the index in step with one inventory journal record."""
+        op = rec["op"]
+        if op == "set":
+            fields = rec["fields"]
+            if rec["no"] not in self.names:
+                return
+            if "name" in fields:
+                self.set_name(rec["no"], fields["name"])
+            if "type" in fields:
+                self.set_type(rec["no"], fields["type"])
+        elif op == "insert":
+            row = rec["row"]
+            self.add(int(row["No_"]), row.get("name"), row.get("type"))
+        elif op == "delete":
+            self.remove(int(i) for i in rec["ids"])
+
+    # =========================================================
+    # lookup
+    # =========================================================
+    def match_name(self, q: str) -> Optional[set[int]]:
+        q = q.lower()
+        if len(q) == 1:
+            return {no for no, text in self.names.items() if q in text}
+        grams = [q] if len(q) == 2 else sorted(_grams(q, 3))
+        postings = sorted((self.postings.get(g, set()) for g in grams), key=len)
+        found = set(postings[0])
+        for p in postings[1:]:
+            found &= p
+            if not found:
+                break
+        if len(q) > 3:
+            found = {no for no in found if q in self.names[no]}
+        return found
+
+    def match_type(self, type_: str) -> set[int]:
+        type_ = type_.lower()
+        found: set[int] = set()
+        for text, members in self.types.items():
+            if type_ in text:
+                found |= members
+        return found
+
+    def candidates(self, q: Optional[str], type_: Optional[str]) -> Optional[set[int]]:
+        """Product numbers matching both filters, or None if the index can't answer."""
+        if (q and not is_plain(q)) or (type_ and not is_plain(type_)):
+            return None
+        found = None
+        if q:
+            found = self.match_name(q)
+        if type_:
+            by_type = self.match_type(type_)
+            found = by_type if found is None else found & by_type
+        return found
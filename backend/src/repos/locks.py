@@ -1,22 +1,187 @@
-import os, time
+import os, time, threading
 from contextlib import contextmanager
 
-@contextmanager
-def file_lock(lock_path: str, timeout_sec: int = 10):
-    start = time.time()
-    while True:
+from src.core import metrics
+
+try:
+    import fcntl
+    _SH, _EX, _UN, _NB = fcntl.LOCK_SH, fcntl.LOCK_EX, fcntl.LOCK_UN, fcntl.LOCK_NB
+except ImportError:  # no flock (e.g. Windows dev box): in-process locking only
+    fcntl = None
+    _SH = _EX = _UN = _NB = 0
+
+# =========================================================
+# lock manager
+# ---------------------------------------------------------
+# One _PathLock per lock file. Threads of this process coordinate on a
+# condition variable (readers share, writers exclude), so they never
+# poll the filesystem. The process as a whole holds a kernel flock on
+# the file, which disappears with the process if it dies, so there are
+# no stale locks.
+#
+# The flock is only tried (LOCK_NB), never waited for in the kernel:
+# while another process holds it, the thread taking it waits on the
+# condition between tries (FLOCK_RETRY_SEC, doubling up to
+# FLOCK_RETRY_MAX_SEC), so the other threads of this process keep
+# using the condition and every wait ends at its timeout, whoever
+# holds the lock.
+# =========================================================
+
+FLOCK_RETRY_SEC = 0.001
+FLOCK_RETRY_MAX_SEC = 0.025
+
+
+class LockStats:
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+    def as_dict(self) -> dict:
+        n = self.acquired or 1
+        return {
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_total_sec": self.wait_total,
+            "wait_avg_sec": self.wait_total / n,
+            "wait_max_sec": self.wait_max,
+            "hold_total_sec": self.hold_total,
+            "hold_avg_sec": self.hold_total / n,
+            "hold_max_sec": self.hold_max,
+        }
+
+
+class _PathLock:
+    def __init__(self, path: str):
+        self.path = path
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.writers_waiting = 0
+        self.flocking = False       # a thread is taking the flock
+        self.fd = None
+        self.stats = LockStats()
+
+    def _flock(self, op: int) -> bool:
+        """flock(op); False if it would have to wait (op with _NB)."""
+        if fcntl is None:
+            return True
+        if self.fd is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(self.fd, op)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _timeout(self, mode: str) -> TimeoutError:
+        self.stats.timeouts += 1
+        metrics.LOCK_TIMEOUTS.inc(os.path.basename(self.path), mode)
+        return TimeoutError(f"Could not acquire lock: {self.path}")
+
+    def _take_flock(self, op: int, deadline: float, mode: str) -> None:
+        """Take the process's flock by the deadline. Caller holds `cond`."""
+        self.flocking = True
         try:
-            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-            os.close(fd)
-            break
-        except FileExistsError:
-            if time.time() - start > timeout_sec:
-                raise TimeoutError(f"Could not acquire lock: {lock_path}")
-            time.sleep(0.1)
+            delay = FLOCK_RETRY_SEC
+            while not self._flock(op | _NB):
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise self._timeout(mode)
+                # lets go of the condition until the next try
+                self.cond.wait(min(delay, left))
+                delay = min(delay * 2, FLOCK_RETRY_MAX_SEC)
+        finally:
+            self.flocking = False
+            self.cond.notify_all()
+
+    def acquire(self, shared: bool, timeout_sec: float) -> None:
+        deadline = time.monotonic() + timeout_sec
+        with self.cond:
+            if shared:
+                # writers waiting go first so a stream of readers can't starve them
+                ok = self.cond.wait_for(
+                    lambda: not self.writer and not self.writers_waiting and not self.flocking, timeout_sec,
+                )
+                if not ok:
+                    raise self._timeout("shared")
+                if self.readers == 0:
+                    self._take_flock(_SH, deadline, "shared")
+                self.readers += 1
+            else:
+                self.writers_waiting += 1
+                try:
+                    ok = self.cond.wait_for(
+                        lambda: not self.writer and self.readers == 0 and not self.flocking, timeout_sec,
+                    )
+                finally:
+                    self.writers_waiting -= 1
+                if not ok:
+                    self.cond.notify_all()
+                    raise self._timeout("exclusive")
+                self._take_flock(_EX, deadline, "exclusive")
+                self.writer = True
+
+    def release(self, shared: bool) -> None:
+        with self.cond:
+            if shared:
+                self.readers -= 1
+                if self.readers == 0:
+                    self._flock(_UN)
+            else:
+                self.writer = False
+                self._flock(_UN)
+            self.cond.notify_all()
+
+    def record(self, shared: bool, waited: float, held: float) -> None:
+        name, mode = os.path.basename(self.path), "shared" if shared else "exclusive"
+        metrics.LOCK_WAIT.observe(waited, name, mode)
+        metrics.LOCK_HOLD.observe(held, name, mode)
+        with self.cond:
+            s = self.stats
+            s.acquired += 1
+            s.wait_total += waited
+            s.wait_max = max(s.wait_max, waited)
+            s.hold_total += held
+            s.hold_max = max(s.hold_max, held)
+
+
+_LOCKS: dict[str, _PathLock] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _path_lock(lock_path: str) -> _PathLock:
+    key = os.path.abspath(lock_path)
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(key)
+        if lock is None:
+            lock = _LOCKS[key] = _PathLock(key)
+        return lock
+
+
+@contextmanager
+def file_lock(lock_path: str, timeout_sec: int = 10, shared: bool = False):
+    """
+    Exclusive (default) or shared lock on `lock_path`.
+    Not re-entrant: don't nest two locks on the same file in one thread.
+    """
+    lock = _path_lock(lock_path)
+    start = time.perf_counter()
+    lock.acquire(shared, timeout_sec)
+    acquired = time.perf_counter()
     try:
         yield
     finally:
-        try:
-            os.remove(lock_path)
-        except FileNotFoundError:
-            pass
+        lock.release(shared)
+        lock.record(shared, acquired - start, time.perf_counter() - acquired)
+
+
+def lock_stats() -> dict[str, dict]:
+    """Wait/hold statistics per lock file, for this process."""
+    with _LOCKS_GUARD:
+        locks = list(_LOCKS.values())
+    return {lock.path: lock.stats.as_dict() for lock in locks}
@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Optional
+
+from src.core import metrics
+from src.core.config import settings
+
+# =========================================================
+# sales date index
+# ---------------------------------------------------------
+# Sparse sidecar "<sales.csv>.dateidx.json": for every UTC date, the byte
+# offset of its first line in sales.csv. Sales are appended in time
+# order, so the lines of [start, end] are one contiguous byte range.
+#
+# `indexed_size` is how many bytes of sales.csv are covered; the tail is
+# scanned on the next read (lines appended elsewhere). If a date ever
+# goes backwards the file is not ordered and `ordered` turns False:
+# callers then fall back to a full scan.
+# =========================================================
+
+
+def utc_date(ts: str) -> Optional[str]:
+    """UTC calendar date of an ISO timestamp, or None if it doesn't parse."""
+    if ts.endswith("+00:00") or ts.endswith("Z"):
+        return ts[:10]
+    try:
+        d = datetime.fromisoformat(ts)
+    except ValueError:
+        return None
+    if d.tzinfo is not None:
+        d = d.astimezone(timezone.utc)
+    return d.date().isoformat()
+
+
+class SalesDateIndex:
+    def __init__(self):
+        self.dates: list[str] = []
+        self.offsets: list[int] = []
+        self.indexed_size = 0
+        self.ordered = True
+        self.lock = threading.RLock()
+
+    def add(self, date: str, offset: int) -> bool:
+        """Note a line of `date` at `offset`. True if the index changed shape."""
+        if self.dates and date == self.dates[-1]:
+            return False
+        if self.dates and date < self.dates[-1]:
+            self.ordered = False
+            return True
+        self.dates.append(date)
+        self.offsets.append(offset)
+        return True
+
+    def byte_range(self, start: str, end: str) -> tuple[int, int]:
+        """[from, to) bytes holding every line dated start..end (inclusive)."""
+        with self.lock:
+            i = bisect_left(self.dates, start)
+            j = bisect_right(self.dates, end)
+            lo = self.offsets[i] if i < len(self.offsets) else self.indexed_size
+            hi = self.offsets[j] if j < len(self.offsets) else self.indexed_size
+            return lo, max(lo, hi)
+
+    def latest(self) -> Optional[str]:
+        with self.lock:
+            return self.dates[-1] if self.dates else None
+
+    def to_json(self) -> dict:
+        with self.lock:
+            return {
+                "indexed_size": self.indexed_size,
+                "ordered": self.ordered,
+                "dates": [[d, o] for d, o in zip(self.dates, self.offsets)],
+            }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SalesDateIndex":
+        idx = cls()
+        idx.indexed_size = int(data["indexed_size"])
+        idx.ordered = bool(data["ordered"])
+        idx.dates = [d for d, _ in data["dates"]]
+        idx.offsets = [int(o) for _, o in data["dates"]]
+        return idx
+
+
+# =========================================================
+# store: one shared SalesDateIndex per sales file
+# =========================================================
+_INDEXES: dict[str, SalesDateIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+class SalesDateIndexStore:
+    def __init__(self, sales_path: str):
+        self.sales_path = sales_path
+        self.path = sales_path + ".dateidx.json"
+
+    def _sales_size(self) -> int:
+        try:
+            return os.path.getsize(self.sales_path)
+        except FileNotFoundError:
+            return 0
+
+    def _load_saved(self) -> SalesDateIndex:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return SalesDateIndex.from_json(json.load(f))
+        except (FileNotFoundError, ValueError, KeyError):
+            return SalesDateIndex()
+
+    def save(self, idx: SalesDateIndex) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(idx.to_json(), f)
+        os.replace(tmp, self.path)
+
+    def _scan(self, idx: SalesDateIndex, size: int) -> None:
+        """Index sales.csv bytes [idx.indexed_size, size), complete lines only."""
+        start = time.perf_counter()
+        lines = 0
+        with open(self.sales_path, "rb") as f:
+            offset = idx.indexed_size
+            first = offset
+            f.seek(offset)
+            if offset == 0:
+                offset += len(f.readline())          # header
+            while offset < size:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                # sale_id never contains a comma, so ts is always field 2
+                parts = line.split(b",", 2)
+                if len(parts) > 2:
+                    date = utc_date(parts[1].decode("ascii", "replace"))
+                    if date is not None:
+                        idx.add(date, offset)
+                offset += len(line)
+                lines += 1
+        idx.indexed_size = offset
+        metrics.observe_read("sales_date_index_scan", time.perf_counter() - start, lines, offset - first)
+
+    def rebuild(self) -> SalesDateIndex:
+        idx = SalesDateIndex()
+        size = self._sales_size()
+        if size:
+            self._scan(idx, size)
+        self.save(idx)
+        with _INDEXES_LOCK:
+            _INDEXES[os.path.abspath(self.sales_path)] = idx
+        return idx
+
+    def add_sale(self, idx: SalesDateIndex, ts: datetime, offset: int, size: int) -> None:
+        """Record a checkout this process wrote at `offset` (sales lock held)."""
+        with idx.lock:
+            changed = idx.add(ts.astimezone(timezone.utc).date().isoformat(), offset)
+            idx.indexed_size = size
+            if changed:
+                self.save(idx)
+
+    def forget(self) -> None:
+        """Drop the shared index; the next get() reloads the saved one and scans on."""
+        with _INDEXES_LOCK:
+            _INDEXES.pop(os.path.abspath(self.sales_path), None)
+
+    def get(self, size: Optional[int] = None) -> SalesDateIndex:
+        """
+        Index covering all of sales.csv as it is now, or its first `size`
+        bytes when the caller already knows the size (see SalesRollupStore.get).
+        """
+        key = os.path.abspath(self.sales_path)
+        with _INDEXES_LOCK:
+            idx = _INDEXES.get(key)
+            if idx is None:
+                idx = _INDEXES[key] = self._load_saved()
+
+        if size is None:
+            size = self._sales_size()
+        metrics.cache_lookup("sales_date_index", size == idx.indexed_size)
+        if size == idx.indexed_size:
+            return idx
+
+        with idx.lock:
+            if size < idx.indexed_size:
+                # sales.csv was replaced or truncated: start over
+                return self.rebuild()
+            if size > idx.indexed_size:
+                n = len(idx.dates)
+                self._scan(idx, size)
+                if len(idx.dates) != n:
+                    self.save(idx)
+        return idx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales date index maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--sales", default=settings.SALES_CSV, help="path to sales.csv")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        idx = SalesDateIndexStore(args.sales).rebuild()
+        state = "ordered" if idx.ordered else "NOT ordered (range reads fall back to full scans)"
+        print(f"indexed {len(idx.dates)} dates from {args.sales}, {state}")
+
+
+if __name__ == "__main__":
+    main()
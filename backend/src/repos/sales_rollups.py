@@ -0,0 +1,294 @@
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import pandas as pd
+
+from src.core import metrics
+from src.core.config import settings
+from src.repos.csv_schema import SALES, parse_ts
+
+# =========================================================
+# sales rollups
+# ---------------------------------------------------------
+# Small aggregate tables kept next to sales.csv ("<csv>.rollups.json"):
+#
+#   days  : date -> [orders, units, amount]
+#   lines : (date, product_no, product_name, product_type) -> [units, amount]
+#
+# Monthly / per-product / per-period views are re-aggregated from these,
+# so dashboard cost depends on days x products sold, not on sale lines.
+#
+# `source_size` is how many bytes of sales.csv are folded in. Anything
+# past it (lines appended by another process, or since the last save)
+# is folded in from the CSV tail on the next read, so the JSON file is
+# only a checkpoint and does not have to be rewritten on every checkout.
+#
+# Lines are folded in chunks, and a chunk can end in the middle of a
+# sale. `last_sale` (the sale_id of the last line folded) lets the next
+# chunk recognise the same sale and avoid counting it as a second order.
+# =========================================================
+
+LINE_KEYS = ["date", "product_no", "product_name", "product_type"]
+# the sales.csv columns folding needs; the rest are not parsed
+FOLD_COLUMNS = ["sale_id", "ts", "product_no", "product_name", "product_type", "qty", "total_line"]
+
+
+class SalesRollups:
+    def __init__(self):
+        self.days: dict[str, list] = {}
+        self.lines: dict[tuple, list] = {}
+        # date -> its keys in `lines`, so recent days are read without a full scan
+        self.by_date: dict[str, list[tuple]] = {}
+        self.source_size = 0
+        self.saved_size = 0
+        self.last_sale: Optional[str] = None
+        self.lock = threading.RLock()
+
+    # =========================================================
+    # folding
+    # =========================================================
+    def _line(self, key: tuple) -> list:
+        agg = self.lines.get(key)
+        if agg is None:
+            agg = self.lines[key] = [0, 0.0]
+            self.by_date.setdefault(key[0], []).append(key)
+        return agg
+
+    def fold_sale(self, ts: datetime, lines: list[dict], source_size: int) -> None:
+        """Add one checkout (all lines share a sale_id and timestamp)."""
+        date = ts.astimezone(timezone.utc).date().isoformat()
+        with self.lock:
+            day = self.days.setdefault(date, [0, 0, 0.0])
+            day[0] += 1
+            for ln in lines:
+                qty = int(ln["qty"])
+                amount = float(ln["total_line"])
+                day[1] += qty
+                day[2] += amount
+                key = (date, int(ln["product_no"]), str(ln["product_name"]), str(ln.get("product_type", "")))
+                agg = self._line(key)
+                agg[0] += qty
+                agg[1] += amount
+            self.source_size = source_size
+            self.last_sale = None
+
+    def fold_frame(self, df: pd.DataFrame) -> None:
+        """Add raw sale lines (columns as in sales.csv) in one vectorized pass."""
+        if df.empty:
+            return
+        df = df.copy()
+        # UTC calendar day; unparseable timestamps are dropped
+        ts = df["ts"]
+        if not isinstance(ts.dtype, pd.DatetimeTZDtype):
+            ts = parse_ts(ts)
+        df["date"] = ts.dt.tz_localize(None).dt.normalize()
+        df = df.dropna(subset=["date"])
+        if "product_type" not in df:
+            df["product_type"] = ""
+        df["product_type"] = df["product_type"].astype("string").fillna("null")
+        df["product_name"] = df["product_name"].astype("string").fillna("null")
+
+        if df.empty:
+            return
+        first, last = df["sale_id"].iloc[0], df["sale_id"].iloc[-1]
+
+        days = df.groupby("date").agg(
+            orders=("sale_id", "nunique"),
+            units=("qty", "sum"),
+            amount=("total_line", "sum"),
+        )
+        lines = df.groupby(LINE_KEYS).agg(
+            units=("qty", "sum"),
+            amount=("total_line", "sum"),
+        )
+
+        with self.lock:
+            for date, r in days.iterrows():
+                day = self.days.setdefault(date.date().isoformat(), [0, 0, 0.0])
+                day[0] += int(r["orders"])
+                day[1] += int(r["units"])
+                day[2] += float(r["amount"])
+            if not pd.isna(first) and first == self.last_sale:
+                # the sale carried on from the previous chunk: one order, not two
+                self.days[df["date"].iloc[0].date().isoformat()][0] -= 1
+            self.last_sale = None if pd.isna(last) else str(last)
+            for key, r in lines.iterrows():
+                key = (key[0].date().isoformat(), int(key[1]), key[2], key[3])
+                agg = self._line(key)
+                agg[0] += int(r["units"])
+                agg[1] += float(r["amount"])
+
+    # =========================================================
+    # views
+    # =========================================================
+    def daily_frame(self) -> pd.DataFrame:
+        with self.lock:
+            rows = [(d, *v) for d, v in self.days.items()]
+        return (
+            pd.DataFrame(rows, columns=["date", "orders", "units", "amount"])
+              .sort_values("date")
+              .reset_index(drop=True)
+        )
+
+    def lines_frame(self, since: Optional[str] = None) -> pd.DataFrame:
+        """One row per (date, product): qty and total_line summed (dates >= since)."""
+        with self.lock:
+            if since is None:
+                rows = [(*k, *v) for k, v in self.lines.items()]
+            else:
+                rows = [(*k, *self.lines[k]) for d, keys in self.by_date.items() if d >= since for k in keys]
+        return pd.DataFrame(rows, columns=LINE_KEYS + ["qty", "total_line"])
+
+    # =========================================================
+    # persistence
+    # =========================================================
+    def to_json(self) -> dict:
+        with self.lock:
+            return {
+                "source_size": self.source_size,
+                "last_sale": self.last_sale,
+                "days": self.days,
+                "lines": [[*k, *v] for k, v in self.lines.items()],
+            }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SalesRollups":
+        r = cls()
+        r.source_size = r.saved_size = int(data["source_size"])
+        r.last_sale = data.get("last_sale")
+        r.days = {d: list(v) for d, v in data["days"].items()}
+        r.lines = {tuple(row[:4]): list(row[4:]) for row in data["lines"]}
+        for key in r.lines:
+            r.by_date.setdefault(key[0], []).append(key)
+        return r
+
+
+# =========================================================
+# store: one shared SalesRollups per sales file
+# =========================================================
+_ROLLUPS: dict[str, SalesRollups] = {}
+_ROLLUPS_LOCK = threading.Lock()
+
+
+class SalesRollupStore:
+    def __init__(self, sales_path: str, flush_bytes: int = settings.SALES_ROLLUP_FLUSH_BYTES):
+        self.sales_path = sales_path
+        self.path = sales_path + ".rollups.json"
+        self.flush_bytes = flush_bytes
+
+    def _sales_size(self) -> int:
+        try:
+            return os.path.getsize(self.sales_path)
+        except FileNotFoundError:
+            return 0
+
+    def _read_header(self) -> list[str]:
+        with open(self.sales_path, "r", encoding="utf-8", newline="") as f:
+            return f.readline().strip().split(",")
+
+    def _load_saved(self) -> SalesRollups:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return SalesRollups.from_json(json.load(f))
+        except (FileNotFoundError, ValueError, KeyError):
+            return SalesRollups()
+
+    def save(self, r: SalesRollups) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(r.to_json(), f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        r.saved_size = r.source_size
+
+    def rebuild(self, chunksize: int = 500_000) -> SalesRollups:
+        """Recompute everything from sales.csv (chunked, bounded memory)."""
+        r = SalesRollups()
+        size = self._sales_size()
+        start = time.perf_counter()
+        rows = 0
+        if size:
+            for chunk in SALES.read_csv_chunks(self.sales_path, chunksize, columns=FOLD_COLUMNS):
+                r.fold_frame(chunk)
+                rows += len(chunk)
+        metrics.observe_read("sales_rollups_rebuild", time.perf_counter() - start, rows, size)
+        r.source_size = size
+        self.save(r)
+        with _ROLLUPS_LOCK:
+            _ROLLUPS[os.path.abspath(self.sales_path)] = r
+        return r
+
+    def add_sale(self, r: SalesRollups, ts: datetime, lines: list[dict], source_size: int) -> None:
+        """Fold a checkout just appended by this process (sales lock held)."""
+        r.fold_sale(ts, lines, source_size)
+        if r.source_size - r.saved_size >= self.flush_bytes:
+            self.save(r)
+
+    def forget(self) -> None:
+        """Drop the shared rollups; the next get() reloads the saved ones and catches up."""
+        with _ROLLUPS_LOCK:
+            _ROLLUPS.pop(os.path.abspath(self.sales_path), None)
+
+    def _catch_up(self, r: SalesRollups, size: int) -> None:
+        """Fold sales.csv bytes [r.source_size, size) into `r`."""
+        start = time.perf_counter()
+        with open(self.sales_path, "rb") as f:
+            f.seek(r.source_size)
+            tail = f.read(size - r.source_size)
+        end = tail.rfind(b"\n") + 1          # only complete lines
+        if r.source_size == 0:
+            # the header line is part of the tail
+            df = SALES.read_csv(io.BytesIO(tail[:end]), columns=FOLD_COLUMNS)
+        else:
+            df = SALES.read_csv(io.BytesIO(tail[:end]), columns=FOLD_COLUMNS, header=None, names=self._read_header())
+        r.fold_frame(df)
+        r.source_size += end
+        metrics.observe_read("sales_rollups_tail", time.perf_counter() - start, len(df), end)
+
+    def get(self, size: Optional[int] = None) -> SalesRollups:
+        """
+        Rollups covering all of sales.csv as it is now, or its first
+        `size` bytes when the caller already knows the size (readers,
+        through the generation-checked stat). Writers let it stat.
+        """
+        key = os.path.abspath(self.sales_path)
+        with _ROLLUPS_LOCK:
+            r = _ROLLUPS.get(key)
+            if r is None:
+                r = _ROLLUPS[key] = self._load_saved()
+
+        if size is None:
+            size = self._sales_size()
+        metrics.cache_lookup("sales_rollups", size == r.source_size)
+        if size == r.source_size:
+            return r
+
+        with r.lock:
+            if size < r.source_size:
+                # sales.csv was replaced or truncated: start over
+                return self.rebuild()
+            if size > r.source_size:
+                self._catch_up(r, size)
+            if r.source_size - r.saved_size >= self.flush_bytes:
+                self.save(r)
+        return r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--sales", default=settings.SALES_CSV, help="path to sales.csv")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        r = SalesRollupStore(args.sales).rebuild()
+        print(f"rebuilt {len(r.days)} days / {len(r.lines)} product-days from {args.sales}")
+
+
+if __name__ == "__main__":
+    main()
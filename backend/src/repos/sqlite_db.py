@@ -0,0 +1,302 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src.core import metrics
+from src.core.config import settings
+from src.repos.csv_inventory_repo import CsvInventoryRepo
+from src.repos.csv_schema import INVENTORY, SALES, SALES_COLUMNS, TS_TEXT
+
+# =========================================================
+# SQLite storage
+# ---------------------------------------------------------
+# One database file (SQLITE_PATH) in WAL mode:
+#
+#   inventory           the data.csv columns, No_ as INTEGER PRIMARY KEY
+#   sales               the sales.csv columns, one row per sale line;
+#                       indexed on ts and on (product_no, ts)
+#   sales_days          date -> orders, units, amount
+#   sales_day_products  (date, product_no, product_name, product_type)
+#                       -> units, amount
+#   versions            "inventory" / "sales" -> counter bumped by every
+#                       write transaction (the repos' `version`)
+#   stock_movements     the stock ledger (see stock_ledger.py), id = seq
+#   stock_checkpoints   seq (last movement included) -> ts
+#   stock_checkpoint_rows
+#                       (seq, product_no) -> stock
+#
+# The two rollup tables play the part of sales.csv.rollups.json, but
+# are updated in the same transaction as the sale lines they summarize.
+# ts is stored as isoformat() text in UTC, so text order is time order
+# and date ranges are index range scans.
+#
+# Every thread has its own connection. Writers take the write lock up
+# front (BEGIN IMMEDIATE) and wait up to SQLITE_BUSY_TIMEOUT_SEC for
+# another process's write; with WAL, readers see the last committed
+# state and never block the writer or each other.
+# =========================================================
+
+_SQL_TYPES = {"Int64": "INTEGER", "float64": "REAL"}
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _inventory_table() -> str:
+    cols = ['"No_" INTEGER PRIMARY KEY']
+    for col, dtype in INVENTORY.dtypes.items():
+        if col != "No_":
+            cols.append(f"{quote(col)} {_SQL_TYPES.get(dtype, 'TEXT')}")
+    return f"CREATE TABLE IF NOT EXISTS inventory ({', '.join(cols)})"
+
+
+TABLES = [
+    _inventory_table(),
+    """CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY,
+        sale_id TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        customer_id TEXT,
+        product_no INTEGER,
+        product_name TEXT,
+        product_type TEXT,
+        qty INTEGER,
+        unit_price REAL,
+        total_line REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS sales_days (
+        date TEXT PRIMARY KEY,
+        orders INTEGER NOT NULL,
+        units INTEGER NOT NULL,
+        amount REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS sales_day_products (
+        date TEXT NOT NULL,
+        product_no INTEGER NOT NULL,
+        product_name TEXT NOT NULL,
+        product_type TEXT NOT NULL,
+        units INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        PRIMARY KEY (date, product_no, product_name, product_type)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY,
+        ts TEXT NOT NULL,
+        product_no INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        stock INTEGER NOT NULL,
+        reason TEXT NOT NULL
+    )""",
+    "CREATE TABLE IF NOT EXISTS stock_checkpoints (seq INTEGER PRIMARY KEY, ts TEXT NOT NULL)",
+    """CREATE TABLE IF NOT EXISTS stock_checkpoint_rows (
+        seq INTEGER NOT NULL,
+        product_no INTEGER NOT NULL,
+        stock INTEGER NOT NULL,
+        PRIMARY KEY (seq, product_no)
+    ) WITHOUT ROWID""",
+    "CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, n INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO versions VALUES ('inventory', 0), ('sales', 0)",
+]
+INDEXES = {
+    "sales_ts": "CREATE INDEX IF NOT EXISTS sales_ts ON sales (ts)",
+    "sales_product_ts": "CREATE INDEX IF NOT EXISTS sales_product_ts ON sales (product_no, ts)",
+    "stock_movements_product": "CREATE INDEX IF NOT EXISTS stock_movements_product ON stock_movements (product_no, id)",
+}
+
+# sale lines in sales.csv column order
+SALES_SELECT = "SELECT " + ", ".join(SALES_COLUMNS) + " FROM sales"
+
+
+class Database:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit: transactions are opened explicitly below
+        c = sqlite3.connect(self.path, timeout=settings.SQLITE_BUSY_TIMEOUT_SEC, isolation_level=None)
+        c.execute("PRAGMA journal_mode=WAL")
+        # an acknowledged checkout must survive a power cut, as with the CSV fsync
+        c.execute("PRAGMA synchronous=FULL")
+        return c
+
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection (schema created on first use)."""
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            c = self._local.conn = self._connect()
+            with self._ready_lock:
+                if not self._ready:
+                    for stmt in TABLES + list(INDEXES.values()):
+                        c.execute(stmt)
+                    self._ready = True
+        return c
+
+    @contextmanager
+    def write(self):
+        """One write transaction; rolled back if the block raises."""
+        c = self.conn()
+        start = time.perf_counter()
+        c.execute("BEGIN IMMEDIATE")
+        metrics.LOCK_WAIT.observe(time.perf_counter() - start, "sqlite", "exclusive")
+        try:
+            yield c
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
+        metrics.observe_write("sqlite", time.perf_counter() - start)
+
+    @contextmanager
+    def snapshot(self):
+        """Several reads that must see the same committed state."""
+        c = self.conn()
+        c.execute("BEGIN")
+        try:
+            yield c
+        finally:
+            c.execute("COMMIT")
+
+    def query(self, sql: str, params=(), source: str = "sqlite", conn=None) -> pd.DataFrame:
+        start = time.perf_counter()
+        df = pd.read_sql_query(sql, conn or self.conn(), params=params)
+        metrics.observe_read(source, time.perf_counter() - start, len(df))
+        return df
+
+    def version(self, name: str, conn=None) -> int:
+        return (conn or self.conn()).execute("SELECT n FROM versions WHERE name = ?", (name,)).fetchone()[0]
+
+    @staticmethod
+    def bump(c: sqlite3.Connection, name: str) -> None:
+        c.execute("UPDATE versions SET n = n + 1 WHERE name = ?", (name,))
+
+    def inventory_columns(self, c: sqlite3.Connection) -> list[str]:
+        return [row[1] for row in c.execute("PRAGMA table_info(inventory)")]
+
+    def ensure_inventory_columns(self, c: sqlite3.Connection, columns) -> None:
+        """Add (as TEXT) any column data.csv had that the schema doesn't know."""
+        have = set(self.inventory_columns(c))
+        for col in columns:
+            if col not in have:
+                c.execute(f"ALTER TABLE inventory ADD COLUMN {quote(col)} TEXT")
+                have.add(col)
+
+
+_DATABASES: dict[str, Database] = {}
+_DATABASES_LOCK = threading.Lock()
+
+
+def database(path: str = settings.SQLITE_PATH) -> Database:
+    key = os.path.abspath(path)
+    with _DATABASES_LOCK:
+        db = _DATABASES.get(key)
+        if db is None:
+            db = _DATABASES[key] = Database(key)
+        return db
+
+
+def records(df: pd.DataFrame) -> list[tuple]:
+    """Rows as tuples for executemany, NA as NULL."""
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def rebuild_rollups(c: sqlite3.Connection) -> None:
+    """Recompute both rollup tables from the sale lines."""
+    c.execute("DELETE FROM sales_days")
+    c.execute("DELETE FROM sales_day_products")
+    c.execute("""
+        INSERT INTO sales_days
+        SELECT substr(ts, 1, 10), COUNT(DISTINCT sale_id), COALESCE(SUM(qty), 0), COALESCE(SUM(total_line), 0)
+        FROM sales GROUP BY 1
+    """)
+    c.execute("""
+        INSERT INTO sales_day_products
+        SELECT substr(ts, 1, 10), product_no, COALESCE(product_name, 'null'), COALESCE(product_type, 'null'),
+               COALESCE(SUM(qty), 0), COALESCE(SUM(total_line), 0)
+        FROM sales WHERE product_no IS NOT NULL GROUP BY 1, 2, 3, 4
+    """)
+
+
+# =========================================================
+# migration from the CSV files
+# =========================================================
+def migrate(db_path: str, inventory_csv: str, sales_csv: str, replace: bool = False, chunksize: int = 200_000) -> dict:
+    """Import data.csv (+ journal) and sales.csv. Returns row counts."""
+    db = database(db_path)
+    out = {"inventory": 0, "sales": 0, "sales_skipped": 0}
+    with db.write() as c:
+        if replace:
+            for table in [
+                "inventory", "sales", "sales_days", "sales_day_products",
+                "stock_movements", "stock_checkpoints", "stock_checkpoint_rows",
+            ]:
+                c.execute(f"DELETE FROM {table}")
+        elif c.execute("SELECT EXISTS (SELECT 1 FROM inventory) OR EXISTS (SELECT 1 FROM sales)").fetchone()[0]:
+            raise ValueError(f"{db_path} already has data (use --replace)")
+
+        if os.path.exists(inventory_csv):
+            inv = CsvInventoryRepo(inventory_csv, resident=False).read_df(fill_null=False)
+            db.ensure_inventory_columns(c, inv.columns)
+            cols = ", ".join(quote(col) for col in inv.columns)
+            marks = ", ".join("?" for _ in inv.columns)
+            # a duplicated No_ keeps its last row, as a journal replay would
+            c.executemany(f"INSERT OR REPLACE INTO inventory ({cols}) VALUES ({marks})", records(inv))
+            out["inventory"] = len(inv)
+
+        if os.path.exists(sales_csv) and os.path.getsize(sales_csv):
+            # indexes are built once at the end, not maintained row by row
+            for name in INDEXES:
+                c.execute(f"DROP INDEX IF EXISTS {name}")
+            for chunk in SALES.read_csv_chunks(sales_csv, chunksize):
+                ok = chunk["ts"].notna()
+                out["sales_skipped"] += int((~ok).sum())
+                chunk = chunk[ok].assign(ts=chunk.loc[ok, "ts"].dt.strftime(TS_TEXT))
+                c.executemany(
+                    f"INSERT INTO sales ({', '.join(SALES_COLUMNS)}) VALUES ({', '.join('?' for _ in SALES_COLUMNS)})",
+                    records(chunk[SALES_COLUMNS]),
+                )
+                out["sales"] += len(chunk)
+            for stmt in INDEXES.values():
+                c.execute(stmt)
+            rebuild_rollups(c)
+
+        db.bump(c, "inventory")
+        db.bump(c, "sales")
+    db.conn().execute("ANALYZE")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite storage maintenance")
+    parser.add_argument("command", choices=["migrate", "rebuild-rollups"])
+    parser.add_argument("--db", default=settings.SQLITE_PATH)
+    parser.add_argument("--inventory", default=settings.INVENTORY_CSV, help="data.csv to import")
+    parser.add_argument("--sales", default=settings.SALES_CSV, help="sales.csv to import")
+    parser.add_argument("--replace", action="store_true", help="empty the tables first")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        n = migrate(args.db, args.inventory, args.sales, args.replace)
+        print(
+            f"imported {n['inventory']} products and {n['sales']} sale lines -> {args.db}"
+            + (f" ({n['sales_skipped']} lines without a valid ts skipped)" if n["sales_skipped"] else "")
+        )
+    else:
+        db = database(args.db)
+        with db.write() as c:
+            rebuild_rollups(c)
+            db.bump(c, "sales")
+        print(f"rebuilt sales rollups in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
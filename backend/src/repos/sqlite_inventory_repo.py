@@ -0,0 +1,291 @@
+import logging
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from src.core import metrics
+from src.core.config import settings
+from src.repos import csv_schema
+from src.repos.csv_schema import INVENTORY
+from src.repos.inventory_search_index import is_plain
+from src.repos.sqlite_db import database, quote
+from src.repos.sqlite_stock_ledger import SqliteStockLedger
+
+log = logging.getLogger(__name__)
+
+# =========================================================
+# inventory in SQLite
+# ---------------------------------------------------------
+# Same methods and errors as CsvInventoryRepo. Each mutation is one
+# write transaction: the checks (product exists, enough stock) and the
+# updates see the same rows, so there is no file lock to hold around
+# them. The full frame (analytics, regex searches) is cached per
+# process on the inventory version. Stock movements go to the ledger
+# tables in the same transaction.
+# =========================================================
+
+# version -> frame, per database file
+_FRAMES: dict[str, tuple[int, pd.DataFrame]] = {}
+_FRAMES_LOCK = threading.Lock()
+
+
+def _value(value):
+    # "" is stored as NULL, as a CSV round trip would
+    return None if value == "" else value
+
+
+def _like(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    return INVENTORY.conform(df)
+
+
+class SqliteInventoryRepo:
+    def __init__(self, path: str = settings.SQLITE_PATH):
+        self.path = path
+        self.db = database(path)
+        self.ledger = SqliteStockLedger(self.db)
+
+    # =========================================================
+    # reads
+    # =========================================================
+    @property
+    def version(self) -> tuple:
+        return ("sqlite", self.db.version("inventory"))
+
+    def _table(self) -> pd.DataFrame:
+        """Every product, typed; cached until the next write. Don't mutate it."""
+        with self.db.snapshot() as c:
+            version = self.db.version("inventory", c)
+            cached = _FRAMES.get(self.db.path)
+            metrics.cache_lookup("inventory_table", cached is not None and cached[0] == version)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            df = _typed(self.db.query("SELECT * FROM inventory ORDER BY No_", source="sqlite_inventory", conn=c))
+        with _FRAMES_LOCK:
+            _FRAMES[self.db.path] = (version, df)
+        return df
+
+    def read_df(self, fill_null: bool = True) -> pd.DataFrame:
+        df = self._table()
+        return csv_schema.fill_null(df) if fill_null else df.copy()
+
+    def search(self, q: Optional[str], type_: Optional[str], fill_null: bool = True) -> pd.DataFrame:
+        """
+        Rows whose name / type contain q / type_ (case-insensitive).
+        Plain text is matched with LIKE in SQL; patterns with regex
+        metacharacters keep the str.contains semantics on the cached frame.
+        """
+        if all(s is None or is_plain(s) for s in (q, type_)):
+            where, params = [], []
+            if q:
+                where.append("COALESCE(name, 'null') LIKE ? ESCAPE '\\'")
+                params.append(_like(q))
+            if type_:
+                where.append("COALESCE(type, 'null') LIKE ? ESCAPE '\\'")
+                params.append(_like(type_))
+            sql = "SELECT * FROM inventory" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY No_"
+            df = _typed(self.db.query(sql, params, source="sqlite_inventory"))
+        else:
+            df = self._table()
+            if q:
+                df = df[df["name"].astype("string").fillna("null").str.contains(q, case=False, na=False)]
+            if type_:
+                df = df[df["type"].astype("string").fillna("null").str.contains(type_, case=False, na=False)]
+        return csv_schema.fill_null(df) if fill_null else df
+
+    # =========================================================
+    # mutations (one transaction each)
+    # =========================================================
+    def _rows(self, c, nos) -> pd.DataFrame:
+        nos = [int(n) for n in nos]
+        marks = ", ".join("?" for _ in nos)
+        df = self.db.query(f"SELECT * FROM inventory WHERE No_ IN ({marks})", nos, source="sqlite_inventory", conn=c)
+        return _typed(df).set_index("No_")
+
+    def _set(self, c, product_no: int, fields: dict) -> None:
+        fields = {k: _value(v) for k, v in fields.items()}
+        if not fields:
+            return
+        self.db.ensure_inventory_columns(c, fields)
+        assign = ", ".join(f"{quote(k)} = ?" for k in fields)
+        c.execute(f"UPDATE inventory SET {assign} WHERE No_ = ?", [*fields.values(), int(product_no)])
+
+    def _insert(self, c, row: dict) -> None:
+        row = {k: _value(v) for k, v in row.items()}
+        self.db.ensure_inventory_columns(c, row)
+        cols = ", ".join(quote(k) for k in row)
+        marks = ", ".join("?" for _ in row)
+        c.execute(f"INSERT OR REPLACE INTO inventory ({cols}) VALUES ({marks})", list(row.values()))
+
+    def _stock(self, c, product_no: int) -> Optional[int]:
+        """Current stock (missing counts as 0), or None if there is no such product."""
+        row = c.execute("SELECT COALESCE(number, 0) FROM inventory WHERE No_ = ?", (int(product_no),)).fetchone()
+        return None if row is None else int(row[0])
+
+    def _stock_map(self, c, nos) -> dict[int, int]:
+        """{No_: stock} of the products among `nos` that exist."""
+        nos = [int(n) for n in nos]
+        out = {}
+        # in slices: SQLite caps the number of bound parameters
+        for i in range(0, len(nos), 500):
+            part = nos[i:i + 500]
+            marks = ", ".join("?" for _ in part)
+            out.update(c.execute(f"SELECT No_, CAST(COALESCE(number, 0) AS INTEGER) FROM inventory WHERE No_ IN ({marks})", part))
+        return out
+
+    def _next_no(self, c) -> int:
+        return c.execute("SELECT COALESCE(MAX(No_), 0) + 1 FROM inventory").fetchone()[0]
+
+    def update_product_fields(self, product_no: int, updates: dict) -> None:
+        with self.db.write() as c:
+            current = self._stock(c, product_no)
+            if current is None:
+                raise KeyError(f"Product No_={product_no} not found")
+            self._set(c, product_no, {k: v for k, v in updates.items() if v is not None})
+            self.ledger.record(c, {product_no: current}, {product_no: self._stock(c, product_no)}, "update")
+            self.db.bump(c, "inventory")
+
+    def decrement_many(self, lines: list[tuple[int, int]]) -> pd.DataFrame:
+        """
+        Take stock for a whole cart in one transaction. Quantities for a
+        repeated product_no are summed; nothing is written if any line fails.
+        Returns the affected rows indexed by No_ (typed, missing values NA).
+        """
+        wanted = pd.DataFrame(lines, columns=["No_", "qty"]).groupby("No_", sort=False)["qty"].sum()
+        with self.db.write() as c:
+            rows = self._rows(c, wanted.index)
+            missing = wanted.index.difference(rows.index)
+            if len(missing):
+                first = next(pno for pno in wanted.index if pno in missing)
+                raise KeyError(f"Product No_={first} not found")
+
+            stock = pd.to_numeric(rows["number"]).fillna(0).astype(int).reindex(wanted.index)
+            short = stock < wanted
+            if short.any():
+                pno = short.idxmax()
+                raise ValueError(f"Not enough stock for No_={pno} (have {stock[pno]}, need {wanted[pno]})")
+
+            left = stock - wanted
+            c.executemany("UPDATE inventory SET number = ? WHERE No_ = ?", [(int(n), int(pno)) for pno, n in left.items()])
+            self.ledger.record(c, stock.to_dict(), left.to_dict(), "checkout")
+            self.db.bump(c, "inventory")
+        return rows
+
+    def adjust_many(self, deltas: list[tuple[int, int]], reason: str = "adjust") -> dict[int, tuple[int, int]]:
+        """
+        Add signed deltas to stock in one transaction (summed per
+        product). Nothing is written if any product is missing or would
+        go below zero. `reason` is what the stock ledger records.
+        Returns {No_: (before, after)}.
+        """
+        delta = pd.DataFrame(deltas, columns=["No_", "delta"]).groupby("No_", sort=False)["delta"].sum()
+        with self.db.write() as c:
+            rows = self._rows(c, delta.index)
+            missing = delta.index.difference(rows.index)
+            if len(missing):
+                first = next(pno for pno in delta.index if pno in missing)
+                raise KeyError(f"Product No_={first} not found")
+
+            before = pd.to_numeric(rows["number"]).fillna(0).astype(int).reindex(delta.index)
+            after = before + delta
+            negative = after < 0
+            if negative.any():
+                pno = negative.idxmax()
+                raise ValueError(f"Not enough stock for No_={pno} (have {before[pno]}, delta {delta[pno]})")
+
+            c.executemany("UPDATE inventory SET number = ? WHERE No_ = ?", [(int(n), int(pno)) for pno, n in after.items()])
+            self.ledger.record(c, before.to_dict(), after.to_dict(), reason)
+            self.db.bump(c, "inventory")
+        return {int(pno): (int(before[pno]), int(after[pno])) for pno in delta.index}
+
+    def upsert_products(self, rows: list[tuple[Optional[int], dict, Optional[dict]]], strict: bool = False) -> dict:
+        """
+        Create or update many products in one transaction; same rules and
+        result as CsvInventoryRepo.upsert_products.
+        """
+        created, updated, rejected = [], [], []
+        try:
+            with self.db.write() as c:
+                existing = {r[0] for r in c.execute("SELECT No_ FROM inventory")}
+                next_no = max(existing, default=0) + 1
+                before = self._stock_map(c, {no for no, _, _ in rows if no is not None and no in existing})
+
+                for pos, (no, fields, new_row) in enumerate(rows):
+                    if no is not None and no in existing:
+                        self._set(c, no, fields)
+                        updated.append(int(no))
+                        continue
+                    if new_row is None:
+                        rejected.append(pos)
+                        continue
+                    no = next_no if no is None else int(no)
+                    next_no = max(next_no, no + 1)
+                    existing.add(no)
+                    self._insert(c, {**new_row, "No_": no})
+                    created.append(no)
+
+                if strict and rejected:
+                    raise _Rollback()
+                if created or updated:
+                    self.ledger.record(c, before, self._stock_map(c, created + updated), "import")
+                    self.db.bump(c, "inventory")
+        except _Rollback:
+            return {"created": [], "updated": [], "rejected": rejected}
+        return {"created": created, "updated": updated, "rejected": rejected}
+
+    def create_product(self, data: dict):
+        with self.db.write() as c:
+            data["No_"] = int(self._next_no(c))
+            self._insert(c, data)
+            self.ledger.record(c, {}, self._stock_map(c, [data["No_"]]), "create")
+            self.db.bump(c, "inventory")
+        log.debug("product created", extra={"product_no": data["No_"]})
+        return data
+
+    def increment_stock(self, product_no: int, qty: int):
+        with self.db.write() as c:
+            current = self._stock(c, product_no)
+            if current is None:
+                raise KeyError("Product not found")
+            new_stock = current + int(qty)
+            self._set(c, product_no, {"number": new_stock})
+            self.ledger.record(c, {product_no: current}, {product_no: new_stock}, "add_stock")
+            self.db.bump(c, "inventory")
+        log.debug("stock incremented", extra={"product_no": product_no, "new_stock": new_stock})
+        return {"ok": True, "new_stock": new_stock}
+
+    def delete_products(self, ids: list[int]):
+        ids = [int(i) for i in ids]
+        if not ids:
+            return 0
+        with self.db.write() as c:
+            before = self._stock_map(c, ids)
+            marks = ", ".join("?" for _ in ids)
+            deleted = c.execute(f"DELETE FROM inventory WHERE No_ IN ({marks})", ids).rowcount
+            if deleted:
+                self.ledger.record(c, before, {}, "delete")
+                self.db.bump(c, "inventory")
+        return deleted
+
+    def decrement_stock(self, product_no: int, qty: int):
+        with self.db.write() as c:
+            current = self._stock(c, product_no)
+            if current is None:
+                raise KeyError("Product not found")
+            new_stock = max(0, current - qty)
+            self._set(c, product_no, {"number": new_stock})
+            self.ledger.record(c, {product_no: current}, {product_no: new_stock}, "return_broken")
+            self.db.bump(c, "inventory")
+        return {"before": current, "after": new_stock}
+
+    def compact(self) -> None:
+        """Fold the WAL back into the database file."""
+        self.db.conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+class _Rollback(Exception):
+    """Raised inside a write block to undo it."""
@@ -0,0 +1,176 @@
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from src.core import metrics
+from src.core.config import settings
+from src.repos.csv_sales_repo import _PendingSale, _committer
+from src.repos.csv_schema import SALES, SALES_COLUMNS
+from src.repos.sales_rollups import LINE_KEYS
+from src.repos.sqlite_db import SALES_SELECT, database
+
+# =========================================================
+# sales in SQLite
+# ---------------------------------------------------------
+# Same methods as CsvSalesRepo. Checkouts go through the same group
+# committer; a batch is one write transaction that inserts the lines
+# and adds them to the rollup tables. Reads run on their own WAL
+# snapshot, so dashboards never hold up a checkout.
+# =========================================================
+
+_INSERT_LINE = f"INSERT INTO sales ({', '.join(SALES_COLUMNS)}) VALUES ({', '.join('?' for _ in SALES_COLUMNS)})"
+_ADD_DAY = """
+    INSERT INTO sales_days (date, orders, units, amount) VALUES (?, ?, ?, ?)
+    ON CONFLICT (date) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        amount = amount + excluded.amount
+"""
+_ADD_DAY_PRODUCT = """
+    INSERT INTO sales_day_products (date, product_no, product_name, product_type, units, amount)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (date, product_no, product_name, product_type) DO UPDATE SET
+        units = units + excluded.units,
+        amount = amount + excluded.amount
+"""
+
+
+def _day_after(d: date) -> str:
+    return (d + timedelta(days=1)).isoformat()
+
+
+class SqliteRollups:
+    """The rollup tables with the SalesRollups views."""
+    def __init__(self, db):
+        self.db = db
+
+    def daily_frame(self) -> pd.DataFrame:
+        return self.db.query(
+            "SELECT date, orders, units, amount FROM sales_days ORDER BY date",
+            source="sqlite_rollups",
+        )
+
+    def lines_frame(self, since: Optional[str] = None) -> pd.DataFrame:
+        """One row per (date, product): qty and total_line summed (dates >= since)."""
+        return self.db.query(
+            f"SELECT {', '.join(LINE_KEYS)}, units AS qty, amount AS total_line FROM sales_day_products"
+            + (" WHERE date >= ?" if since is not None else ""),
+            (since,) if since is not None else (), source="sqlite_rollups",
+        )
+
+
+class SqliteSalesRepo:
+    def __init__(self, path: str = settings.SQLITE_PATH):
+        self.path = path
+        self.db = database(path)
+
+    # =========================================================
+    # reads
+    # =========================================================
+    def _frame(self, sql: str, params=(), source: str = "sqlite_sales") -> pd.DataFrame:
+        df = SALES.conform(self.db.query(sql, params, source=source))
+        return SALES.finish(df)
+
+    def read_df(self) -> pd.DataFrame:
+        """Every sale line, typed by the SALES schema (missing values NA)."""
+        return self._frame(f"{SALES_SELECT} ORDER BY id")
+
+    @property
+    def version(self) -> tuple:
+        return ("sqlite", self.db.version("sales"))
+
+    def rollups(self) -> SqliteRollups:
+        """Daily / per-product aggregates (kept current by every checkout)."""
+        return SqliteRollups(self.db)
+
+    def read_range(self, start: date, end: date) -> pd.DataFrame:
+        """Sale lines dated start..end (UTC, inclusive), through the ts index."""
+        return self._frame(
+            f"{SALES_SELECT} WHERE ts >= ? AND ts < ? ORDER BY id",
+            (start.isoformat(), _day_after(end)), source="sqlite_sales_range",
+        )
+
+    def iter_range(self, start: date, end: date, chunksize: int = settings.EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Sale lines dated start..end (UTC, inclusive) in time order, as
+        typed chunks of at most `chunksize` lines. Covers the lines
+        committed when called; each chunk is its own short query (keyed on
+        the last (ts, id) sent), so no read transaction stays open.
+        """
+        last_id = self.db.conn().execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0]
+        return self._chunks(start.isoformat(), _day_after(end), last_id, chunksize)
+
+    def _chunks(self, lo: str, hi: str, last_id: int, chunksize: int) -> Iterator[pd.DataFrame]:
+        after = (lo, 0)
+        while True:
+            df = self.db.query(
+                f"SELECT id, {', '.join(SALES_COLUMNS)} FROM sales"
+                " WHERE (ts, id) > (?, ?) AND ts < ? AND id <= ? ORDER BY ts, id LIMIT ?",
+                (*after, hi, last_id, chunksize), source="sqlite_sales_chunk",
+            )
+            if df.empty:
+                return
+            # the stored text, before it is parsed
+            after = (df["ts"].iloc[-1], int(df["id"].iloc[-1]))
+            yield SALES.finish(SALES.conform(df.drop(columns="id")))
+            if len(df) < chunksize:
+                return
+
+    def product_totals(self, start: date, end: date) -> pd.DataFrame:
+        """product_no, units_sold, revenue_total (qty * unit_price) for start..end."""
+        return self.db.query(
+            """
+            SELECT product_no, SUM(qty) AS units_sold, SUM(qty * unit_price) AS revenue_total
+            FROM sales WHERE ts >= ? AND ts < ? AND product_no IS NOT NULL
+            GROUP BY product_no ORDER BY product_no
+            """,
+            (start.isoformat(), _day_after(end)), source="sqlite_product_totals",
+        )
+
+    def latest_date(self) -> Optional[str]:
+        """Most recent sale date (UTC, YYYY-MM-DD) or None if there are no sales."""
+        return self.db.conn().execute("SELECT substr(MAX(ts), 1, 10) FROM sales").fetchone()[0]
+
+    # =========================================================
+    # checkouts
+    # =========================================================
+    def submit_lines(self, customer_id: str, lines: list[dict]) -> Future:
+        """
+        Queue one checkout for the next group commit. The future resolves
+        to (sale_id, ts) once its transaction has committed.
+        """
+        return _committer(self).submit(_PendingSale(customer_id, lines))
+
+    def append_lines(self, customer_id: str, lines: list[dict]) -> tuple[str, datetime]:
+        return self.submit_lines(customer_id, lines).result()
+
+    def _write_batch(self, batch: list[_PendingSale]) -> None:
+        """Insert every sale of `batch` and its rollups in one transaction."""
+        rows, days, products = [], {}, {}
+        with self.db.write() as c:
+            for sale in batch:
+                sale.ts = datetime.now(timezone.utc)
+                ts = sale.ts.isoformat()
+                day = sale.ts.date().isoformat()
+                totals = days.setdefault(day, [0, 0, 0.0])
+                totals[0] += 1
+                for ln in sale.lines:
+                    qty, amount = int(ln["qty"]), float(ln["total_line"])
+                    rows.append((
+                        sale.sale_id, ts, sale.customer_id, ln["product_no"], ln["product_name"],
+                        ln["product_type"], ln["qty"], ln["unit_price"], ln["total_line"],
+                    ))
+                    totals[1] += qty
+                    totals[2] += amount
+                    key = (day, int(ln["product_no"]), str(ln["product_name"]), str(ln.get("product_type", "")))
+                    agg = products.setdefault(key, [0, 0.0])
+                    agg[0] += qty
+                    agg[1] += amount
+
+            c.executemany(_INSERT_LINE, rows)
+            c.executemany(_ADD_DAY, [(d, *v) for d, v in days.items()])
+            c.executemany(_ADD_DAY_PRODUCT, [(*k, *v) for k, v in products.items()])
+            self.db.bump(c, "sales")
+        metrics.SALES_COMMIT_BATCH.observe(len(batch))
@@ -0,0 +1,89 @@
+import sqlite3
+from typing import Optional
+
+import pandas as pd
+
+from src.core.config import settings
+from src.repos.stock_ledger import Checkpoint, StockLedger, moves, now_text
+
+# =========================================================
+# stock ledger in SQLite
+# ---------------------------------------------------------
+# stock_movements / stock_checkpoints / stock_checkpoint_rows (see
+# sqlite_db.py). Movements and checkpoints are written in the write
+# transaction of the mutation they belong to; a checkpoint copies the
+# inventory's stock column in one INSERT .. SELECT. A replay is an id
+# range (the movements between two checkpoints), through the primary
+# key, or through (product_no, id) for one product.
+# =========================================================
+
+_STOCK = "CAST(COALESCE(number, 0) AS INTEGER)"
+
+
+class SqliteStockLedger(StockLedger):
+    def __init__(self, db, checkpoint_every: int = settings.STOCK_CHECKPOINT_EVERY):
+        self.db = db
+        self.checkpoint_every = checkpoint_every
+
+    # =========================================================
+    # reads
+    # =========================================================
+    def checkpoints(self) -> list[Checkpoint]:
+        rows = self.db.conn().execute("SELECT seq, ts FROM stock_checkpoints ORDER BY seq").fetchall()
+        return [Checkpoint(seq, ts, seq) for seq, ts in rows]
+
+    def checkpoint_stock(self, cp: Checkpoint) -> pd.Series:
+        df = self.db.query(
+            "SELECT product_no, stock FROM stock_checkpoint_rows WHERE seq = ? ORDER BY product_no",
+            (cp.seq,), source="sqlite_stock_checkpoint",
+        )
+        return df.set_index("product_no")["stock"].astype("int64")
+
+    def read(self, cp: Checkpoint, until: Optional[Checkpoint], product_no: Optional[int] = None) -> pd.DataFrame:
+        where, params = ["id > ?"], [cp.pos]
+        if until is not None:
+            where.append("id <= ?")
+            params.append(until.pos)
+        if product_no is not None:
+            where.append("product_no = ?")
+            params.append(int(product_no))
+        return self.db.query(
+            "SELECT id AS seq, ts, product_no, delta, stock, reason FROM stock_movements"
+            f" WHERE {' AND '.join(where)} ORDER BY id",
+            params, source="sqlite_stock_ledger",
+        )
+
+    # =========================================================
+    # writes (inside the mutation's write transaction)
+    # =========================================================
+    def _checkpoint(self, c: sqlite3.Connection, seq: int) -> None:
+        c.execute("INSERT INTO stock_checkpoints (seq, ts) VALUES (?, ?)", (seq, now_text()))
+        c.execute(f"INSERT INTO stock_checkpoint_rows SELECT ?, No_, {_STOCK} FROM inventory", (seq,))
+
+    def record(self, c: sqlite3.Connection, before: dict[int, int], after: dict[int, int], reason: str) -> int:
+        """
+        Add the movements from `before` to `after` ({No_: stock} of the
+        products the transaction touched, `after` as it now stands).
+        Returns the number of movements written.
+        """
+        mv = moves(before, after)
+        if not mv:
+            return 0
+
+        last = c.execute("SELECT MAX(seq) FROM stock_checkpoints").fetchone()[0]
+        if last is None:
+            # history starts here: the stock just before this transaction
+            last = c.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements").fetchone()[0]
+            self._checkpoint(c, last)
+            c.executemany("DELETE FROM stock_checkpoint_rows WHERE seq = ? AND product_no = ?", [(last, int(no)) for no in after])
+            c.executemany("INSERT INTO stock_checkpoint_rows VALUES (?, ?, ?)", [(last, int(no), int(n)) for no, n in before.items()])
+
+        ts = now_text()
+        c.executemany(
+            "INSERT INTO stock_movements (ts, product_no, delta, stock, reason) VALUES (?, ?, ?, ?, ?)",
+            [(ts, no, delta, n, reason) for no, delta, n in mv],
+        )
+        seq = c.execute("SELECT MAX(id) FROM stock_movements").fetchone()[0]
+        if seq - last >= self.checkpoint_every:
+            self._checkpoint(c, seq)
+        return len(mv)
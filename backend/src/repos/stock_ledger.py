@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+from src.repos.csv_schema import TS_TEXT
+
+# =========================================================
+# stock movement ledger
+# ---------------------------------------------------------
+# Every change to a product's stock (`number`) is appended to a ledger,
+# in the same transaction as the change itself:
+#
+#   seq, ts, product_no, delta, stock, reason
+#
+# `stock` is the absolute value after the movement, so the latest
+# movement of a product gives its stock whatever came before it. A
+# product created with no stock is recorded with delta 0; a deleted
+# one with stock 0 and reason "delete".
+#
+# Every STOCK_CHECKPOINT_EVERY movements the full stock of every
+# product is saved as a checkpoint ("stock after movement seq, at ts").
+# The first checkpoint is the stock when recording began, so nothing
+# before it is known. A point-in-time question loads the last
+# checkpoint before that time and replays the movements up to the next
+# one; it never reads the ledger from the start.
+#
+# CsvStockLedger (data.csv.ledger + checkpoint files) and
+# SqliteStockLedger (tables) store it; the queries are shared here.
+# =========================================================
+
+MOVEMENT_COLUMNS = ["seq", "ts", "product_no", "delta", "stock", "reason"]
+
+REASONS = (
+    "create", "update", "add_stock", "return_broken", "checkout", "checkout_failed",
+    "adjust", "import", "delete",
+)
+
+
+class Checkpoint(NamedTuple):
+    seq: int        # last movement included
+    ts: str         # TS_TEXT; every movement up to seq is at or before it
+    pos: int        # where the movements after it start (backend-specific)
+
+
+def now_text() -> str:
+    return datetime.now(timezone.utc).strftime(TS_TEXT)
+
+
+def moves(before: dict[int, int], after: dict[int, int]) -> list[tuple[int, int, int]]:
+    """
+    (product_no, delta, stock) for every product whose stock differs
+    between two {product_no: stock} maps, or that only one of them has
+    (created: delta = its stock; deleted: stock 0).
+    """
+    out = []
+    for no in list(before) + [n for n in after if n not in before]:
+        b, a = before.get(no), after.get(no)
+        if b != a:
+            out.append((int(no), int((a or 0) - (b or 0)), int(a or 0)))
+    return out
+
+
+def _day_after(day: str) -> str:
+    return (datetime.fromisoformat(day).date() + timedelta(days=1)).isoformat()
+
+
+def _check_day(day: str) -> str:
+    try:
+        return datetime.fromisoformat(day).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date: {day} (expected YYYY-MM-DD)")
+
+
+class StockLedger(ABC):
+    """
+    Point-in-time queries over a ledger. Backends implement:
+      checkpoints()          -> [Checkpoint], oldest first
+      checkpoint_stock(cp)   -> product_no -> stock (int Series)
+      read(cp, until, product_no=None)
+                             -> MOVEMENT_COLUMNS frame: the movements
+                                after `cp`, up to checkpoint `until`
+                                (None: to the end), in seq order
+    """
+
+    @abstractmethod
+    def checkpoints(self) -> list[Checkpoint]:
+        ...
+
+    @abstractmethod
+    def checkpoint_stock(self, cp: Checkpoint) -> pd.Series:
+        ...
+
+    @abstractmethod
+    def read(self, cp: Checkpoint, until: Optional[Checkpoint], product_no: Optional[int] = None) -> pd.DataFrame:
+        ...
+
+    def _around(self, lo: str, hi: str) -> tuple[list[Checkpoint], int, Optional[Checkpoint]]:
+        """
+        (checkpoints, i, until): checkpoint i is the last taken before
+        `lo` (-1 if none is), and every movement at or after `hi` comes
+        after `until`.
+        """
+        cps = self.checkpoints()
+        if not cps:
+            raise ValueError("No stock history recorded yet")
+        i = sum(1 for cp in cps if cp.ts < lo) - 1
+        until = next((cp for cp in cps[max(i, 0):] if cp.ts >= hi), None)
+        return cps, i, until
+
+    def stock_as_of(self, day: str) -> dict:
+        """Every product's stock at the end of `day` (UTC)."""
+        hi = _day_after(_check_day(day))
+        cps, i, until = self._around(hi, hi)
+        if i < 0:
+            raise ValueError(f"No stock history before {cps[0].ts[:10]}")
+        cp = cps[i]
+
+        stock = self.checkpoint_stock(cp)
+        df = self.read(cp, until)
+        df = df[df["ts"] < hi].drop_duplicates("product_no", keep="last").set_index("product_no")
+        stock = pd.concat([stock[~stock.index.isin(df.index)], df["stock"]])
+        stock = stock.drop(df.index[df["reason"] == "delete"]).sort_index()
+        return {
+            "as_of": day,
+            "checkpoint": {"seq": cp.seq, "ts": cp.ts},
+            "replayed": len(df),
+            "total": len(stock),
+            "items": [{"product_no": int(no), "stock": int(n)} for no, n in stock.items()],
+        }
+
+    def movements(self, product_no: int, start: str, end: str) -> dict:
+        """
+        Movements of one product dated start..end (UTC, inclusive), with
+        its stock before and after them. `opening` is None when `start`
+        is before the ledger's first checkpoint.
+        """
+        lo, hi = _check_day(start), _day_after(_check_day(end))
+        if hi <= lo:
+            raise ValueError("end is before start")
+        cps, i, until = self._around(lo, hi)
+        cp = cps[max(i, 0)]
+
+        df = self.read(cp, until, product_no)
+        df = df[df["ts"] < hi]
+        # stock at the checkpoint, if it is inside what was asked for
+        base = int(self.checkpoint_stock(cp).get(product_no, 0)) if cp.ts < hi else None
+        earlier, inside = df[df["ts"] < lo], df[df["ts"] >= lo]
+        opening = None
+        if i >= 0:
+            opening = int(earlier["stock"].iloc[-1]) if len(earlier) else base
+        closing = int(df["stock"].iloc[-1]) if len(df) else base
+        return {
+            "product_no": product_no,
+            "start": start,
+            "end": end,
+            "opening": opening,
+            "closing": closing,
+            "movements": inside.drop(columns="product_no").astype(object).to_dict("records"),
+        }
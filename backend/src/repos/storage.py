@@ -0,0 +1,39 @@
+from src.core.config import settings
+
+# =========================================================
+# storage selection
+# ---------------------------------------------------------
+# Services get their repos here, so STORAGE ("csv" / "sqlite") is
+# decided in one place. Both backends have the same methods.
+# =========================================================
+
+STORAGES = ("csv", "sqlite")
+
+
+def _storage() -> str:
+    if settings.STORAGE not in STORAGES:
+        raise ValueError(f"Unknown STORAGE: {settings.STORAGE} (expected one of {', '.join(STORAGES)})")
+    return settings.STORAGE
+
+
+def inventory_repo():
+    if _storage() == "sqlite":
+        from src.repos.sqlite_inventory_repo import SqliteInventoryRepo
+        return SqliteInventoryRepo()
+    from src.repos.csv_inventory_repo import CsvInventoryRepo
+    return CsvInventoryRepo()
+
+
+def sales_repo(reads: bool = False):
+    """
+    The sales repo. `reads=True` is for read-mostly callers (analytics):
+    with CSV storage and SALES_STORE=columnar they read the columnar copy.
+    """
+    if _storage() == "sqlite":
+        from src.repos.sqlite_sales_repo import SqliteSalesRepo
+        return SqliteSalesRepo()
+    if reads and settings.SALES_STORE == "columnar":
+        from src.repos.columnar_sales_repo import ColumnarSalesRepo
+        return ColumnarSalesRepo()
+    from src.repos.csv_sales_repo import CsvSalesRepo
+    return CsvSalesRepo()
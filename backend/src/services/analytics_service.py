@@ -1,35 +1,88 @@
+import os
+import threading
 import pandas as pd
 import numpy as np
-from src.core.config import settings
-from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional
 
+from src.core import metrics
 from src.core.config import settings
-from src.repos.csv_inventory_repo import CsvInventoryRepo
-from src.repos.csv_sales_repo import CsvSalesRepo
+from src.repos.csv_schema import SALES_COLUMNS, fill_null
+from src.repos.storage import inventory_repo, sales_repo
+from src.services import sales_export
+from src.services.sales_velocity import UNITS_COLUMNS, WINDOWS, SalesVelocity
+# most urgent first
+REORDER_RISKS = ["out", "high", "medium", "low", "none"]
+
+SALES_DETAIL_FIELDS = [
+    "product_no", "name", "piece_per_cost", "units_sold",
+    "cost", "sell_price_lower", "sell_price_avg", "profit",
+    "cost_total", "sell_lower_total", "sell_avg_total",
+    "actual_sold_total", "actual_profit_total",
+    "description", "remark", "localtion", "type",
+]
+
+
+def _dates(start: str, end: str) -> tuple[date, date]:
+    return datetime.fromisoformat(start).date(), datetime.fromisoformat(end).date()
+
+
 class AnalyticsService:
     def __init__(self):
-        self.inv = CsvInventoryRepo()
-        self.sales = CsvSalesRepo()    
+        self.inv = inventory_repo()
+        self.sales = sales_repo(reads=True)
+        self.velocity = SalesVelocity(self.sales)
+        # (inventory version, sales version) -> (inventory frame, sales-with-cost frame)
+        self._memo = None
+        self._memo_lock = threading.Lock()
+
     def _clean(self, df: pd.DataFrame) -> list[dict]:
         return (
             df
+            # object first: categorical / nullable-int columns take any fill value
+            .astype(object)
             .replace([np.inf, -np.inf], 0)
             .fillna(0)
             .to_dict("records")
         )
 
+    # =========================================================
+    # shared frames, memoized on both sources' versions
+    # =========================================================
+    def versions(self) -> tuple:
+        """(inventory version, sales version): every result here depends on these only."""
+        return (self.inv.version, self.sales.version)
+
+    def _frames(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        (inventory, sales-with-cost) for the current data. Rebuilt only when
+        data.csv (+ journal) or sales.csv changed; treat both as read-only.
+        """
+        key = self.versions()
+        memo = self._memo
+        metrics.cache_lookup("analytics_frames", memo is not None and memo[0] == key)
+        if memo is not None and memo[0] == key:
+            return memo[1], memo[2]
+
+        with self._memo_lock:
+            memo = self._memo
+            if memo is None or memo[0] != key:
+                # through the repo so journaled changes are included
+                inv = self.inv.read_df(fill_null=False)
+                memo = self._memo = (key, inv, self._load_sales_with_cost(inv))
+            return memo[1], memo[2]
+
     def inventory_summary(self):
-        df = pd.read_csv(settings.INVENTORY_CSV)
+        df, _ = self._frames()
 
-        df["stock_value_at_cost"] = (
+        stock_value_at_cost = (
             df["number"].fillna(0) * df["cost"].fillna(0)
         )
 
         return {
             "total_skus": int(df.shape[0]),
             "total_units": int(df["number"].fillna(0).sum()),
-            "total_cost_value": float(df["stock_value_at_cost"].sum()),
+            "total_cost_value": float(stock_value_at_cost.sum()),
             "by_type": self._clean(
                 df.groupby("type", dropna=False)["number"]
                   .sum()
@@ -38,42 +91,32 @@ class AnalyticsService:
         }
 
     def sales_daily(self):
-        try:
-            s = pd.read_csv(settings.SALES_CSV)
-        except FileNotFoundError:
+        if not os.path.exists(self.sales.path):
             return {"daily": [], "monthly": [], "top_products": []}
 
-        if s.empty:
-            return {"daily": [], "monthly": [], "top_products": []}
-
-        s["ts"] = pd.to_datetime(s["ts"], errors="coerce")
-        s = s.dropna(subset=["ts"])
-
-        s["date"] = s["ts"].dt.date.astype(str)
-        s["month"] = s["ts"].dt.to_period("M").astype(str)
+        rollups = self.sales.rollups()
+        daily = rollups.daily_frame()
 
-        daily = (
-            s.groupby("date")
-             .agg(
-                orders=("sale_id", "nunique"),
-                units=("qty", "sum"),
-                amount=("total_line", "sum"),
-             )
-             .reset_index()
-        )
+        if daily.empty:
+            return {"daily": [], "monthly": [], "top_products": []}
 
+        # orders are distinct sale_ids and a sale falls on exactly one day,
+        # so monthly orders are the sum of daily orders
+        daily["month"] = daily["date"].str[:7]
         monthly = (
-            s.groupby("month")
+            daily.groupby("month")
              .agg(
-                orders=("sale_id", "nunique"),
-                units=("qty", "sum"),
-                amount=("total_line", "sum"),
+                orders=("orders", "sum"),
+                units=("units", "sum"),
+                amount=("amount", "sum"),
              )
              .reset_index()
         )
+        daily = daily.drop(columns="month")
 
         top_products = (
-            s.groupby(["product_no", "product_name"])
+            rollups.lines_frame()
+             .groupby(["product_no", "product_name"])
              .agg(
                 units=("qty", "sum"),
                 amount=("total_line", "sum"),
@@ -89,11 +132,18 @@ class AnalyticsService:
             "top_products": self._clean(top_products),
         }
     
-    def _load_sales_with_cost(self):
-        sales = pd.read_csv(settings.SALES_CSV)
-        inv = pd.read_csv(settings.INVENTORY_CSV)
-
-        sales["ts"] = pd.to_datetime(sales["ts"], utc=True)
+    def _load_sales_with_cost(self, inv: pd.DataFrame):
+        """
+        Per (day, product) sales from the rollups joined with inventory cost.
+        qty / total_line / cost_total / profit are additive, so any coarser
+        grouping of this frame equals grouping the raw sale lines.
+        """
+        sales = self.sales.rollups().lines_frame()
+
+        sales["ts"] = pd.to_datetime(sales["date"])
+        # period keys used by the dashboard, computed once per data version
+        sales["month"] = sales["ts"].dt.to_period("M").astype(str)
+        sales["week"] = sales["ts"].dt.to_period("W").astype(str)
 
         # ⬅️ include product type + misc metadata
         inv_cols = [
@@ -117,33 +167,31 @@ class AnalyticsService:
 
     
     def sales_timeseries(self, period: str = "day"):
-        s = self._load_sales_with_cost()
+        _, s = self._frames()
+        return self._timeseries(s, period)
 
-        if period == "month":
-            s["period"] = s["ts"].dt.to_period("M").astype(str)
-        else:
-            s["period"] = s["ts"].dt.date.astype(str)
+    def _timeseries(self, s: pd.DataFrame, period: str):
+        key = "month" if period == "month" else "date"
 
-        g = s.groupby("period").agg(
+        g = s.groupby(key).agg(
             revenue=("total_line", "sum"),
             cost=("cost_total", "sum"),
             profit=("profit", "sum")
-        ).reset_index().sort_values("period")
+        ).reset_index().rename(columns={key: "period"}).sort_values("period")
 
         return g.to_dict("records")
     
     def top_products(self, period: str = "month", month: str | None = None):
-        s = self._load_sales_with_cost()
+        _, s = self._frames()
+        return self._top_products(s, period, month)
 
+    def _top_products(self, s: pd.DataFrame, period: str, month: str | None = None):
         # ---------- period bucketing ----------
-        if period == "week":
-            s["period"] = s["ts"].dt.to_period("W").astype(str)
-        else:
-            s["period"] = s["ts"].dt.to_period("M").astype(str)
+        key = "week" if period == "week" else "month"
 
         # ---------- filter specific month if provided ----------
         if month:
-            s = s[s["period"] == month]
+            s = s[s[key] == month]
 
         # ---------- aggregate ----------
         g = (
@@ -164,59 +212,52 @@ class AnalyticsService:
 
         return self._clean(top)
 
+    # =========================================================
+    # everything the dashboard shows, from one set of shared frames
+    # =========================================================
+    def dashboard(self, period: str = "day", top_period: str = "month"):
+        _, s = self._frames()
+        return {
+            "inventory_summary": self.inventory_summary(),
+            "sales_summary": self.sales_daily(),
+            "timeseries": self._timeseries(s, period),
+            "top_products": self._top_products(s, top_period),
+        }
+
     # =========================================================
     # latest sale date (for default dashboard filter)
     # =========================================================
     def get_latest_sales_date(self):
-        df = self.sales.read_df()
-        if df.empty:
-            return {"latest_date": None}
-
-        # assume ts = ISO string
-        df["date"] = pd.to_datetime(df["ts"]).dt.date
-        latest = df["date"].max()
-
-        return {"latest_date": latest.isoformat()}
+        # last entry of the sales date index, no scan of sales.csv
+        return {"latest_date": self.sales.latest_date()}
 
 
     # =========================================================
     # sales detail for a date range (group by product)
     # =========================================================
-    def get_sales_detail(self, start: str, end: str):
-        sales_df = self.sales.read_df()
-        inv_df = self.inv.read_df()
-
-        if sales_df.empty:
-            return []
-
-        sales_df["date"] = pd.to_datetime(sales_df["ts"]).dt.date
-
-        start_d = datetime.fromisoformat(start).date()
-        end_d = datetime.fromisoformat(end).date()
-
-        sales_df = sales_df[
-            (sales_df["date"] >= start_d) &
-            (sales_df["date"] <= end_d)
-        ]
-
-        if sales_df.empty:
-            return []
-
-        # values from POS cart
-        sales_df["qty"] = sales_df["qty"].astype(int)
-        sales_df["unit_price"] = sales_df["unit_price"].astype(float)
-
-        # 👇 THIS IS ACTUAL SOLD PRICE (from POS)
-        sales_df["line_total"] = sales_df["qty"] * sales_df["unit_price"]
-
-        grouped = (
-            sales_df
-            .groupby("product_no", as_index=False)
-            .agg(
-                units_sold=("qty", "sum"),
-                revenue_total=("line_total", "sum")  # <-- ACTUAL SOLD PRICE
-            )
-        )
+    def get_sales_detail(self, start: str, end: str, columns: bool = False):
+        """
+        Per-product sales for start..end. `columns=True` returns one array
+        per field ({"product_no": [...], ...}) instead of a list of rows.
+        """
+        empty = {k: [] for k in SALES_DETAIL_FIELDS} if columns else []
+        detail = self._detail_frame(*_dates(start, end))
+        if detail is None:
+            return empty
+
+        detail = fill_null(detail)
+        if columns:
+            return detail.to_dict("list")
+        return detail.to_dict("records")
+
+    def _detail_frame(self, start_d: date, end_d: date) -> Optional[pd.DataFrame]:
+        """SALES_DETAIL_FIELDS per product sold in start_d..end_d (None if nothing was)."""
+        # summed by the sales store (chunks of the sales.csv byte range, or SQL)
+        grouped = self.sales.product_totals(start_d, end_d)
+        inv_df = self.inv.read_df(fill_null=False)
+
+        if grouped.empty:
+            return None
 
         merged = grouped.merge(
             inv_df,
@@ -248,38 +289,151 @@ class AnalyticsService:
             merged["revenue_total"] - merged["cost_total"]
         )
 
-        return [
-            {
-                "product_no": int(r["product_no"]),
+        # built column-wise; one cast per column instead of one per cell
+        detail = pd.DataFrame({
+            "product_no": merged["product_no"].astype(int),
 
-                "name": r.get("name", ""),
-                "piece_per_cost": r.get("piece_per_cost", 0),
+            "name": merged["name"],
+            "piece_per_cost": merged["piece_per_cost"],
 
-                "units_sold": int(r["units_sold"]),
+            "units_sold": merged["units_sold"].astype(int),
 
-                # reference inventory prices
-                "cost": float(r.get("cost", 0)),
-                "sell_price_lower": float(r.get("sell_price_lower", 0)),
-                "sell_price_avg": float(r.get("sell_price_avg", 0)),
+            # reference inventory prices
+            "cost": merged["cost"].astype(float),
+            "sell_price_lower": merged["sell_price_lower"].astype(float),
+            "sell_price_avg": merged["sell_price_avg"].astype(float),
 
-                # expected profit (inventory avg price)
-                "profit": float(r.get("profit_total", 0)),
+            # expected profit (inventory avg price)
+            "profit": merged["profit_total"].astype(float),
 
-                # totals from inventory price levels
-                "cost_total": float(r.get("cost_total", 0)),
-                "sell_lower_total": float(r.get("sell_lower_total", 0)),
-                "sell_avg_total": float(r.get("sell_avg_total", 0)),
+            # totals from inventory price levels
+            "cost_total": merged["cost_total"].astype(float),
+            "sell_lower_total": merged["sell_lower_total"].astype(float),
+            "sell_avg_total": merged["sell_avg_total"].astype(float),
 
-                # 👇 NEW — TRUE ACTUAL PRICE
-                "actual_sold_total": float(r.get("revenue_total", 0)),
+            # 👇 NEW — TRUE ACTUAL PRICE
+            "actual_sold_total": merged["revenue_total"].astype(float),
 
-                # 👇 NEW — TRUE PROFIT FROM POS SOLD PRICE
-                "actual_profit_total": float(r.get("actual_profit_total", 0)),
+            # 👇 NEW — TRUE PROFIT FROM POS SOLD PRICE
+            "actual_profit_total": merged["actual_profit_total"].astype(float),
 
-                "description": r.get("description", ""),
-                "remark": r.get("remark", ""),
-                "localtion": r.get("localtion", ""),
-                "type": r.get("type", "")
-            }
-            for _, r in merged.iterrows()
-        ]
+            "description": merged["description"],
+            "remark": merged["remark"],
+            "localtion": merged["localtion"],
+            "type": merged["type"],
+        })
+        return detail
+
+    # =========================================================
+    # reorder report: sales velocity vs stock
+    # =========================================================
+    def reorder(
+        self,
+        type_: Optional[str] = None,
+        location: Optional[str] = None,
+        lead_days: int = settings.REORDER_LEAD_DAYS,
+        cover_days: int = settings.REORDER_COVER_DAYS,
+        as_of: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        """
+        Every product (matching type / location, case-insensitive
+        substrings) with its 7/30/90-day sales velocity, days of cover
+        and stockout risk, most urgent first.
+
+        velocity      units/day: the faster of the last 7 and 30 days (a
+                      recent surge shortens cover), or the 90-day rate
+                      for products not sold in the last 30 days
+        days_of_cover stock / velocity (None without sales)
+        risk          out     no stock left, sold in the last 90 days
+                      high    runs out within lead_days
+                      medium  runs out within 2 * lead_days
+                      low     covered for longer
+                      none    not sold in the last 90 days
+        reorder_qty   units to order now to cover lead_days + cover_days
+        """
+        as_of_d = datetime.fromisoformat(as_of).date() if as_of else datetime.now(timezone.utc).date()
+        inv = self.inv.read_df(fill_null=False)
+        if type_:
+            inv = inv[inv["type"].astype("string").fillna("null").str.contains(type_, case=False, regex=False)]
+        if location:
+            inv = inv[inv["localtion"].astype("string").fillna("null").str.contains(location, case=False, regex=False)]
+
+        units = self.velocity.units(as_of_d).reindex(inv["No_"].to_numpy(), fill_value=0)
+        stock = inv["number"].fillna(0).to_numpy(dtype=float)
+        rates = {w: units[f"units_{w}d"].to_numpy() / w for w in WINDOWS}
+        recent = np.maximum(rates[7], rates[30])
+        velocity = np.where(recent > 0, recent, rates[90])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cover = np.where(velocity > 0, np.maximum(stock, 0) / velocity, np.nan)
+        sold = units["units_90d"].to_numpy() > 0
+        risk = np.select(
+            [~sold, stock <= 0, cover < lead_days, cover < 2 * lead_days],
+            ["none", "out", "high", "medium"],
+            "low",
+        )
+        reorder_qty = np.maximum(0, np.ceil(velocity * (lead_days + cover_days) - stock)).astype(int)
+
+        df = pd.DataFrame({
+            "product_no": inv["No_"].to_numpy(),
+            "name": inv["name"].to_numpy(),
+            "type": inv["type"].to_numpy(),
+            "localtion": inv["localtion"].to_numpy(),
+            "number": stock.astype(int),
+            **{col: units[col].to_numpy() for col in UNITS_COLUMNS},
+            **{f"velocity_{w}d": rates[w].round(3) for w in WINDOWS},
+            "velocity": velocity.round(3),
+            "days_of_cover": cover.round(1),
+            "risk": risk,
+            "reorder_qty": reorder_qty,
+        })
+        df["rank"] = df["risk"].map({r: i for i, r in enumerate(REORDER_RISKS)})
+        df = (
+            df.sort_values(["rank", "days_of_cover", "velocity", "product_no"],
+                           ascending=[True, True, False, True], na_position="last")
+              .drop(columns="rank")
+        )
+        total = len(df)
+        if limit is not None:
+            df = df.head(limit)
+
+        items = fill_null(df)
+        # no sales, no cover: null rather than the 'null' placeholder
+        items["days_of_cover"] = df["days_of_cover"].astype(object).where(df["days_of_cover"].notna(), None)
+        return {
+            "as_of": as_of_d.isoformat(),
+            "lead_days": lead_days,
+            "cover_days": cover_days,
+            "total": total,
+            "items": items.to_dict("records"),
+        }
+
+    # =========================================================
+    # streaming exports (CSV / NDJSON, chunk by chunk)
+    # =========================================================
+    def export_sales(self, start: str, end: str, fmt: str) -> Iterator[bytes]:
+        """Raw sale lines dated start..end, read and encoded one chunk at a time."""
+        start_d, end_d = _dates(start, end)
+        sales_export.check_format(fmt)
+        frames = self.sales.iter_range(start_d, end_d) if os.path.exists(self.sales.path) else iter(())
+        return sales_export.encode(frames, SALES_COLUMNS, fmt)
+
+    def export_sales_detail(self, start: str, end: str, fmt: str) -> Iterator[bytes]:
+        """
+        The sales-detail rows for start..end. The header goes out first;
+        the lines are then summed chunk by chunk (memory bounded by the
+        catalog, not the range) and the rows sent in chunks.
+        """
+        start_d, end_d = _dates(start, end)
+        sales_export.check_format(fmt)
+        return sales_export.encode(self._detail_chunks(start_d, end_d), SALES_DETAIL_FIELDS, fmt)
+
+    def _detail_chunks(self, start_d: date, end_d: date) -> Iterator[pd.DataFrame]:
+        if not os.path.exists(self.sales.path):
+            return
+        detail = self._detail_frame(start_d, end_d)
+        if detail is None:
+            return
+        n = settings.EXPORT_CHUNK_ROWS
+        for i in range(0, len(detail), n):
+            yield detail.iloc[i:i + n]
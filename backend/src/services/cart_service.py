@@ -1,38 +1,42 @@
-from src.repos.csv_inventory_repo import CsvInventoryRepo
-from src.repos.csv_sales_repo import CsvSalesRepo
+import logging
+from concurrent.futures import Future
+
+from src.core.concurrency import submit_write
+from src.repos.csv_schema import fill_null
+from src.repos.storage import inventory_repo, sales_repo
+
+log = logging.getLogger(__name__)
 
 class CartService:
     def __init__(self):
-        self.inv = CsvInventoryRepo()
-        self.sales = CsvSalesRepo()
+        self.inv = inventory_repo()
+        self.sales = sales_repo()
 
     def checkout(self, customer_id: str, items: list[dict]):
-        # Read inventory once for names
-        inv_df = self.inv.read_df()
-
-        sale_lines = []
-        total = 0.0
+        return self.submit_checkout(customer_id, items).result()
 
-        # First pass validate
-        for it in items:
-            pno = int(it["product_no"])
-            qty = int(it["qty"])
-            unit_price = float(it["unit_price"])
+    def submit_checkout(self, customer_id: str, items: list[dict]) -> Future:
+        """
+        Take the stock now and queue the sale for the next group commit.
+        The future resolves to {sale_id, ts, total} once the sale is durable,
+        so the caller (the single writer) can move on without waiting.
+        If the sale can't be written, the stock is given back before the
+        future fails.
+        """
+        lines = [
+            (int(it["product_no"]), int(it["qty"]), float(it["unit_price"]))
+            for it in items
+        ]
 
-            row = inv_df[inv_df["No_"] == pno]
-            if row.empty:
-                raise KeyError(f"Product No_={pno} not found")
-            stock = int(row.iloc[0]["number"])
-            if stock < qty:
-                raise ValueError(f"Not enough stock for No_={pno} (have {stock}, need {qty})")
+        # validate + take stock for every line in one inventory transaction
+        # missing name / type go into sales.csv as 'null', as they always have
+        rows = fill_null(self.inv.decrement_many([(pno, qty) for pno, qty, _ in lines]))
 
-        # Second pass mutate + log
-        for it in items:
-            pno = int(it["product_no"])
-            qty = int(it["qty"])
-            unit_price = float(it["unit_price"])
+        sale_lines = []
+        total = 0.0
 
-            row = inv_df[inv_df["No_"] == pno].iloc[0]
+        for pno, qty, unit_price in lines:
+            row = rows.loc[pno]
 
             name = str(row["name"])
             product_type = str(row.get("type", ""))
@@ -41,7 +45,6 @@ class CartService:
 
             total += line_total
 
-            self.inv.decrement_stock(pno, qty)
             sale_lines.append({
                 "product_no": pno,
                 "product_name": name,
@@ -51,5 +54,25 @@ class CartService:
                 "total_line": line_total
             })
 
-        sale_id, ts = self.sales.append_lines(customer_id, sale_lines)
-        return {"sale_id": sale_id, "ts": ts, "total": total}
+        pending = self.sales.submit_lines(customer_id, sale_lines)
+        done: Future = Future()
+
+        def _finish(f: Future):
+            if f.exception() is None:
+                sale_id, ts = f.result()
+                done.set_result({"sale_id": sale_id, "ts": ts, "total": total})
+                return
+            # the sale isn't on disk: undo the stock taken above, on the
+            # writer like every other mutation
+            restored = submit_write(self.inv.adjust_many, [(pno, qty) for pno, qty, _ in lines], "checkout_failed")
+            restored.add_done_callback(lambda r: _failed(f.exception(), r))
+
+        def _failed(error: BaseException, restored: Future):
+            if restored.exception() is not None:
+                log.error("stock not given back after a failed sale", extra={
+                    "customer_id": customer_id, "error": str(restored.exception()),
+                })
+            done.set_exception(error)
+
+        pending.add_done_callback(_finish)
+        return done
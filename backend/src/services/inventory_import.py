@@ -0,0 +1,131 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Union
+
+# =========================================================
+# inventory import parsing
+# ---------------------------------------------------------
+# POST /inventory/import bodies are parsed as the bytes arrive, so a
+# large supplier file is never held as one string:
+#
+#   csv    : header row + one product per record (quoted fields may
+#            span lines); empty cells count as "not given"
+#   ndjson : one JSON object per line
+#   json   : one JSON array of objects (parsed once fully received)
+#
+# Each yields (row number, raw dict), or (row number, error message)
+# for a row that can't be parsed. Row numbers start at 1 for the first
+# product, whatever the format.
+#
+# The route validates rows in batches of VALIDATE_BATCH as they are
+# parsed, so only validated rows (written in one transaction at the
+# end) are kept, not the raw body.
+# =========================================================
+
+FORMATS = ("csv", "ndjson", "json")
+
+VALIDATE_BATCH = 1000
+
+Row = tuple[int, Union[dict, str]]
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decoded text lines (newline kept), a BOM dropped."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        start = 0
+        while True:
+            end = pending.find("\n", start)
+            if end < 0:
+                break
+            yield pending[start:end + 1]
+            start = end + 1
+        pending = pending[start:]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    header = None
+    record, quotes = "", 0
+    n = 0
+    async for line in _lines(chunks):
+        record += line
+        quotes += line.count('"')
+        if quotes % 2:
+            continue            # inside a quoted field: the record goes on
+        text, record, quotes = record, "", 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        n += 1
+        if len(values) > len(header):
+            yield n, f"expected {len(header)} fields, got {len(values)}"
+            continue
+        yield n, {k: v for k, v in zip(header, values) if v != ""}
+    if record.strip():
+        yield n + 1, "unterminated quoted field"
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    n = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        n += 1
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield n, f"invalid JSON: {e.msg}"
+            continue
+        yield n, obj if isinstance(obj, dict) else "expected a JSON object"
+
+
+async def json_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    body = b"".join([chunk async for chunk in chunks])
+    try:
+        data = json.loads(body or b"[]")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e.msg}")
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON array of products")
+    for n, obj in enumerate(data, start=1):
+        yield n, obj if isinstance(obj, dict) else "expected a JSON object"
+
+
+async def batches(rows: AsyncIterator[Row], size: int) -> AsyncIterator[list[Row]]:
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Row]:
+    if fmt == "csv":
+        return csv_rows(chunks)
+    if fmt == "ndjson":
+        return ndjson_rows(chunks)
+    if fmt == "json":
+        return json_rows(chunks)
+    raise ValueError(f"Unknown import format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+
+def format_of(content_type: str) -> str:
+    """Import format for a Content-Type header (csv if unrecognised)."""
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    if content_type == "application/json":
+        return "json"
+    return "csv"
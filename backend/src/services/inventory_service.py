@@ -1,8 +1,23 @@
-from src.repos.csv_inventory_repo import CsvInventoryRepo
+import hashlib
+
+from pydantic import ValidationError
+
+from src.domain.schemas import ProductCreate, ProductUpsert
+from src.repos.csv_schema import to_records
+from src.repos.storage import inventory_repo
+
+
+def _split(csv: str | None) -> list[str]:
+    return [f.strip() for f in (csv or "").split(",") if f.strip()]
+
+
+def _errors(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
 
 class InventoryService:
     def __init__(self):
-        self.repo = CsvInventoryRepo()
+        self.repo = inventory_repo()
 
     def search(self, q: str | None, type_: str | None):
         df = self.repo.search(q, type_)
@@ -11,6 +26,51 @@ class InventoryService:
         # print('------------')
         return df.to_dict(orient="records")
 
+    def search_etag(self, q, type_, fields, sort, offset, limit) -> str:
+        """Strong ETag for one search page: inventory version + request params."""
+        key = repr((self.repo.version, q, type_, fields, sort, offset, limit))
+        return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+    def search_page(
+        self,
+        q: str | None,
+        type_: str | None,
+        fields: str | None = None,
+        sort: str | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict], int]:
+        """
+        One page of search results and the total match count.
+        fields: comma-separated columns to return (default all).
+        sort:   comma-separated columns, "-" prefix for descending.
+        """
+        df = self.repo.search(q, type_, fill_null=False)
+        total = len(df)
+
+        if sort:
+            by, ascending = [], []
+            for key in _split(sort):
+                col = key.lstrip("-")
+                if col not in df.columns:
+                    raise ValueError(f"Unknown sort field: {col}")
+                by.append(col)
+                ascending.append(not key.startswith("-"))
+            try:
+                df = df.sort_values(by, ascending=ascending, kind="stable", na_position="last")
+            except TypeError:
+                raise ValueError(f"Cannot sort by {sort}: mixed value types")
+
+        df = df.iloc[offset:] if limit is None else df.iloc[offset:offset + limit]
+
+        if fields:
+            cols = _split(fields)
+            unknown = [c for c in cols if c not in df.columns]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            df = df[cols]
+        return to_records(df), total
+
     def update(self, product_no: int, updates: dict):
         self.repo.update_product_fields(product_no, updates)
         return {"ok": True}
@@ -25,3 +85,62 @@ class InventoryService:
     
     def decrement_stock(self, product_no: int, qty: int):
         return self.repo.decrement_stock(product_no, qty)
+
+    def bulk_adjust(self, adjustments: list[dict]) -> list[dict]:
+        result = self.repo.adjust_many([(a["product_no"], a["delta"]) for a in adjustments])
+        return [
+            {"product_no": no, "before": before, "after": after}
+            for no, (before, after) in result.items()
+        ]
+
+    def stock_as_of(self, as_of: str) -> dict:
+        return self.repo.ledger.stock_as_of(as_of)
+
+    def stock_movements(self, product_no: int, start: str, end: str) -> dict:
+        return self.repo.ledger.movements(product_no, start, end)
+
+    def validate_import(self, rows: list[tuple]) -> tuple[list[tuple], list[dict]]:
+        """
+        Check parsed import rows against the product schemas.
+        Returns (entries for apply_import, per-row errors).
+        """
+        entries, errors = [], []
+        for n, raw in rows:
+            if isinstance(raw, str):
+                errors.append({"row": n, "error": raw})
+                continue
+            try:
+                row = ProductUpsert.model_validate(raw)
+            except ValidationError as e:
+                errors.append({"row": n, "error": _errors(e)})
+                continue
+            fields = row.model_dump(exclude_unset=True, exclude={"No_"})
+            try:
+                new_row = {**ProductCreate(**fields).model_dump(), **fields}
+                create_error = None
+            except ValidationError as e:
+                new_row, create_error = None, _errors(e)
+            if row.No_ is None and new_row is None:
+                errors.append({"row": n, "error": create_error})
+                continue
+            entries.append((n, row.No_, fields, new_row, create_error))
+        return entries, errors
+
+    def apply_import(self, entries: list[tuple], errors: list[dict], all_or_nothing: bool = False) -> dict:
+        """
+        Write every valid import row in one transaction. With
+        all_or_nothing, any row error means nothing is written.
+        """
+        errors = list(errors)
+        if all_or_nothing and errors:
+            return {"created": [], "updated": [], "errors": errors}
+
+        result = self.repo.upsert_products(
+            [(no, fields, new_row) for _, no, fields, new_row, _ in entries],
+            strict=all_or_nothing,
+        )
+        for pos in result["rejected"]:
+            n, no, _, _, create_error = entries[pos]
+            errors.append({"row": n, "error": f"Product No_={no} not found and row is not a full product ({create_error})"})
+        errors.sort(key=lambda e: e["row"])
+        return {"created": result["created"], "updated": result["updated"], "errors": errors}
@@ -0,0 +1,70 @@
+from typing import Iterable, Iterator
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.repos.csv_schema import NULL, fill_null
+
+# =========================================================
+# streaming export encoding
+# ---------------------------------------------------------
+# The /analytics/*/export bodies are encoded one frame (chunk) at a
+# time, as the frames are read:
+#
+#   csv    : header row (sent before anything is read), then the rows
+#            of each chunk; missing values are 'null', so a sales
+#            export is byte for byte the lines of sales.csv
+#   ndjson : one JSON object per line, written with json.dumps (no
+#            '\/' escapes, non-ASCII text as is)
+#
+# Both write missing values as 'null', as sales.csv and the
+# /analytics/sales-detail JSON do, and timestamps as in sales.csv
+# (isoformat, UTC): a field reads the same in every output.
+# =========================================================
+
+FORMATS = ("csv", "ndjson")
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    return fmt
+
+
+def _iso(ts: pd.Series) -> pd.Series:
+    # numpy formats a whole column ~10x faster than .dt.strftime
+    text = np.char.add(np.datetime_as_string(ts.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(), unit="us"), "+00:00")
+    return pd.Series(text, index=ts.index).where(ts.notna())
+
+
+def _as_text(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+            df = df.assign(**{col: _iso(df[col])})
+    return df
+
+
+def _csv(frames: Iterable[pd.DataFrame], columns: list[str]) -> Iterator[bytes]:
+    yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8")
+    for df in frames:
+        yield _as_text(df[columns]).to_csv(index=False, header=False, na_rep=NULL).encode("utf-8")
+
+
+def _ndjson(frames: Iterable[pd.DataFrame], columns: list[str]) -> Iterator[bytes]:
+    for df in frames:
+        records = fill_null(_as_text(df[columns])).to_dict("records")
+        yield "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in records).encode("utf-8")
+
+
+def encode(frames: Iterable[pd.DataFrame], columns: list[str], fmt: str) -> Iterator[bytes]:
+    """Body chunks for `frames` (each holding at least `columns`)."""
+    if check_format(fmt) == "csv":
+        return _csv(frames, columns)
+    return _ndjson(frames, columns)
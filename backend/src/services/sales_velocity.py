@@ -0,0 +1,101 @@
+import threading
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.core import metrics
+
+# =========================================================
+# sales velocity
+# ---------------------------------------------------------
+# Units sold per product over the last 7 / 30 / 90 days, from the
+# (date, product) sales rollups.
+#
+# The rollup rows of the last max(WINDOWS) days are held in memory.
+# When the sales version moves, only the days from the newest one held
+# onward are read again (a checkout only ever adds to today), so keeping
+# the velocities current costs a day or two of rollups, not the history.
+# If an older day changed (sales.csv replaced, back-dated lines) the
+# whole window is reloaded.
+# =========================================================
+
+WINDOWS = (7, 30, 90)
+UNITS_COLUMNS = [f"units_{w}d" for w in WINDOWS]
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    return (pd.to_datetime(dates).to_numpy().astype("datetime64[D]") - _EPOCH).astype(np.int64)
+
+
+def _day_units(daily: pd.DataFrame, since: str) -> pd.Series:
+    daily = daily[daily["date"] >= since]
+    return daily.set_index("date")["units"].astype("int64")
+
+
+class _Window:
+    def __init__(self, version, since: str, lines: pd.DataFrame, days: pd.Series):
+        self.version = version
+        self.since = since          # first date held (YYYY-MM-DD)
+        self.lines = lines          # date, day (number), product_no, qty
+        self.days = days            # date -> units, to notice a changed history
+        self.last = lines["date"].max() if len(lines) else since
+
+
+class SalesVelocity:
+    def __init__(self, sales):
+        self.sales = sales
+        self.state: Optional[_Window] = None
+        self.lock = threading.Lock()
+
+    def _lines(self, rollups, since: str) -> pd.DataFrame:
+        df = rollups.lines_frame(since=since)[["date", "product_no", "qty"]]
+        return df.assign(day=_day_numbers(df["date"]))
+
+    def _load(self, version, since: str) -> _Window:
+        rollups = self.sales.rollups()
+        return _Window(version, since, self._lines(rollups, since), _day_units(rollups.daily_frame(), since))
+
+    def _advance(self, state: _Window, version, since: str) -> _Window:
+        rollups = self.sales.rollups()
+        days = _day_units(rollups.daily_frame(), since)
+        held = state.days[(state.days.index >= since) & (state.days.index < state.last)]
+        if not days[days.index < state.last].equals(held):
+            return self._load(version, since)
+        old = state.lines
+        old = old[(old["date"] >= since) & (old["date"] < state.last)]
+        lines = pd.concat([old, self._lines(rollups, state.last)], ignore_index=True)
+        return _Window(version, since, lines, days)
+
+    def _window(self, since: str) -> pd.DataFrame:
+        """Rollup rows dated since.. (current with the sales version)."""
+        version = self.sales.version
+        state = self.state
+        hit = state is not None and state.version == version and state.since <= since
+        metrics.cache_lookup("sales_velocity", hit)
+        if not hit:
+            with self.lock:
+                state = self.state
+                if state is None or state.since > since:
+                    state = self._load(version, since)
+                elif state.version != version:
+                    state = self._advance(state, version, since)
+                self.state = state
+        return state.lines
+
+    def units(self, as_of: date) -> pd.DataFrame:
+        """UNITS_COLUMNS per product_no for the windows ending on `as_of`, in one pass."""
+        since = (as_of - timedelta(days=max(WINDOWS) - 1)).isoformat()
+        lines = self._window(since)
+        age = (np.datetime64(as_of, "D") - _EPOCH).astype(np.int64) - lines["day"].to_numpy()
+        age = age[:, None]
+        inside = (age >= 0) & (age < np.array(WINDOWS))
+        units = lines["qty"].to_numpy(dtype=np.int64)[:, None] * inside
+        return (
+            pd.DataFrame(units, columns=UNITS_COLUMNS)
+              .groupby(lines["product_no"].to_numpy())
+              .sum()
+        )
@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+# settings (and the repos' default paths) are read when src is first
+# imported: point them at a scratch directory before any test does
+_DATA_DIR = tempfile.mkdtemp(prefix="stock-shop-tests-")
+os.environ.update({
+    "DATA_DIR": _DATA_DIR,
+    "INVENTORY_CSV": os.path.join(_DATA_DIR, "data.csv"),
+    "SALES_CSV": os.path.join(_DATA_DIR, "sales.csv"),
+    "SQLITE_PATH": os.path.join(_DATA_DIR, "shop.db"),
+    "STORAGE": "csv",
+    "SALES_STORE": "csv",
+    "STOCK_CHECKPOINT_EVERY": "4",
+    "WARMUP": "false",
+    "LOG_LEVEL": "warning",
+})
+
+import pytest  # noqa: E402
+
+from src.repos.csv_schema import SALES_COLUMNS  # noqa: E402
+
+INVENTORY_HEADER = (
+    "No_,name,piece_per_cost,number,cost,sell_price_lower,sell_price_avg,profit,"
+    "description,remark,localtion,type,Brand\n"
+)
+INVENTORY_ROWS = (
+    "1,AMP MBA AV-268,1.0,10,950.0,1500.0,1800.0,850.0,null,null,\"F, A4\",AMP,null\n"
+    "2,AMP SOUNDMILAN AV-3346,1.0,5,2800.0,3500.0,3800.0,1000.0,null,null,A4,AMP,null\n"
+    "3,MIC MBA 888A,1.0,0,1200.0,1700.0,1900.0,500.0,wireless,null,B1,MICROPHONE,MBA\n"
+)
+
+
+def write_inventory(path, rows: str = INVENTORY_ROWS) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(INVENTORY_HEADER + rows)
+    return str(path)
+
+
+def write_sales(path, lines: list[tuple] = ()) -> str:
+    """sales.csv with `lines`, each a tuple in SALES_COLUMNS order."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(SALES_COLUMNS) + "\n")
+        for line in lines:
+            f.write(",".join(str(v) for v in line) + "\n")
+    return str(path)
+
+
+# what the app (its services use the default paths) starts from
+write_inventory(os.environ["INVENTORY_CSV"])
+write_sales(os.environ["SALES_CSV"])
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from src.app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def inventory_csv(tmp_path) -> str:
+    return write_inventory(tmp_path / "data.csv")
+
+
+@pytest.fixture
+def sales_csv(tmp_path) -> str:
+    return write_sales(tmp_path / "sales.csv")
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def inventory(request, tmp_path, inventory_csv, sales_csv):
+    """The inventory repo of each storage backend, holding INVENTORY_ROWS."""
+    if request.param == "csv":
+        from src.repos.csv_inventory_repo import CsvInventoryRepo
+        return CsvInventoryRepo(inventory_csv)
+    from src.repos.sqlite_db import migrate
+    from src.repos.sqlite_inventory_repo import SqliteInventoryRepo
+    db_path = str(tmp_path / "shop.db")
+    migrate(db_path, inventory_csv, sales_csv)
+    return SqliteInventoryRepo(db_path)
+
+
+def stock(repo) -> dict[int, int]:
+    """{No_: number} of every product."""
+    df = repo.read_df(fill_null=False)
+    return {int(no): int(n) for no, n in zip(df["No_"], df["number"].fillna(0))}
@@ -0,0 +1,113 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from conftest import write_sales
+from src.repos.columnar_sales_repo import ColumnarSalesRepo, ColumnarSalesStore, convert
+from src.repos.csv_sales_repo import CsvSalesRepo, _in_days
+from src.repos.csv_schema import SALES_COLUMNS
+from src.services import sales_export
+
+RANGES = [
+    (date(2026, 2, 1), date(2026, 2, 28)),      # before any sale
+    (date(2026, 3, 1), date(2026, 3, 1)),
+    (date(2026, 3, 2), date(2026, 3, 4)),
+    (date(2026, 3, 1), date(2026, 3, 31)),
+    (date(2026, 3, 9), date(2026, 3, 10)),      # after the last sale
+]
+
+
+def _lines(ordered: bool) -> list[tuple]:
+    out = []
+    days = [1, 1, 2, 3, 3, 3, 5, 8]
+    if not ordered:
+        days = [3, 1, 8, 2, 1, 5, 3, 3]
+    for n, day in enumerate(days):
+        ts = f"2026-03-{day:02d}T{n:02d}:15:30.250000+00:00"
+        for k in range(1 + n % 3):
+            out.append((f"sale-{n}", ts, f"walkin-{n % 2}", 1 + k, f"item/{k}", "AMP", 1 + n, 9.5 + k, (1 + n) * (9.5 + k)))
+    return out
+
+
+def _repos(tmp_path, ordered: bool) -> tuple[CsvSalesRepo, ColumnarSalesRepo]:
+    path = write_sales(tmp_path / "sales.csv", _lines(ordered))
+    return CsvSalesRepo(path), ColumnarSalesRepo(path)
+
+
+def _export(repo, start: date, end: date) -> bytes:
+    return b"".join(sales_export.encode(repo.iter_range(start, end, chunksize=4), SALES_COLUMNS, "csv"))
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_ranges_match_the_csv_repo(tmp_path, ordered):
+    csv_repo, columnar = _repos(tmp_path, ordered)
+    for start, end in RANGES:
+        assert _export(columnar, start, end) == _export(csv_repo, start, end)
+
+        expected = _in_days(csv_repo.read_range(start, end), start, end)
+        got = columnar.read_range(start, end)
+        assert list(got["sale_id"]) == list(expected["sale_id"])
+        assert list(got["ts"]) == list(expected["ts"])
+
+        want = csv_repo.product_totals(start, end).sort_values("product_no").reset_index(drop=True)
+        have = columnar.product_totals(start, end).sort_values("product_no").reset_index(drop=True)
+        assert have.astype(float).equals(want.astype(float))
+    assert columnar.latest_date() == csv_repo.latest_date() == "2026-03-08"
+    # sorted: binary search; otherwise a scan
+    assert columnar._sorted[1] is ordered
+
+
+def test_new_checkouts_are_read(tmp_path):
+    csv_repo, columnar = _repos(tmp_path, ordered=True)
+    assert columnar.latest_date() == "2026-03-08"
+    line = {"product_no": 7, "product_name": "new", "product_type": "MIC", "qty": 2, "unit_price": 5.0, "total_line": 10.0}
+    _, ts = csv_repo.append_lines("walkin", [line])
+    today = ts.date()
+
+    assert columnar.latest_date() == today.isoformat()
+    totals = columnar.product_totals(today, today)
+    assert totals.to_dict("records") == [{"product_no": 7, "units_sold": 2, "revenue_total": 10.0}]
+    assert _export(columnar, date(2026, 1, 1), today) == _export(csv_repo, date(2026, 1, 1), today)
+
+
+def test_missing_values_are_na(tmp_path):
+    path = write_sales(tmp_path / "sales.csv", [
+        ("sale-0", "2026-03-01T10:00:00+00:00", "walkin", 1, "a", "AMP", 2, 5.0, 10.0),
+        ("sale-1", "", "walkin", "", "b", "AMP", "", 5.0, 10.0),
+        ("sale-2", "2026-03-02T10:00:00+00:00", "walkin", 3, "c", "AMP", 1, 5.0, 5.0),
+    ])
+    df = ColumnarSalesRepo(path).read_df()
+    assert df["ts"].isna().tolist() == [False, True, False]
+    assert df["product_no"].isna().tolist() == [False, True, False]
+    assert str(df["qty"].dtype) == "Int64"
+    # the line without a timestamp is in no range
+    got = ColumnarSalesRepo(path).read_range(date(1970, 1, 1), date(2026, 12, 31))
+    assert list(got["sale_id"]) == ["sale-0", "sale-2"]
+    assert pd.Timestamp(got["ts"].iloc[-1]).date() == date(2026, 3, 2)
+
+
+def test_convert_crashing_part_way_leaves_no_stale_store(tmp_path, monkeypatch):
+    path = write_sales(tmp_path / "sales.csv", _lines(ordered=True))
+    root = path + ".columns"
+    append = ColumnarSalesStore.append_frame
+    calls = []
+
+    def crash_on_second_chunk(self, df, source_size):
+        calls.append(len(df))
+        if len(calls) == 2:
+            raise OSError("killed")
+        append(self, df, source_size)
+
+    with monkeypatch.context() as m:
+        m.setattr(ColumnarSalesStore, "append_frame", crash_on_second_chunk)
+        with pytest.raises(OSError):
+            convert(path, root, chunksize=4)
+
+    # nothing claims the lines the crash never wrote: they are all read
+    expected = CsvSalesRepo(path).read_df()
+    got = ColumnarSalesRepo(path).read_df()
+    assert list(got["sale_id"]) == list(expected["sale_id"])
+
+    assert convert(path, root, chunksize=4) == len(expected)
+    assert list(ColumnarSalesRepo(path).read_df()["sale_id"]) == list(expected["sale_id"])
@@ -0,0 +1,145 @@
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from conftest import stock
+from src.repos.csv_inventory_repo import CsvInventoryRepo
+from src.repos.csv_sales_repo import CsvSalesRepo, _GroupCommitter, _PendingSale
+from src.repos.sales_rollups import SalesRollupStore
+from src.services.cart_service import CartService
+
+
+class _FakeRepo:
+    """Records the batches it is given; `gate` holds each write until set."""
+    def __init__(self, error: Exception = None):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.error = error
+
+    def _write_batch(self, batch):
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        for sale in batch:
+            sale.ts = datetime.now(timezone.utc)
+        self.batches.append(list(batch))
+
+
+def _sale(n: int) -> _PendingSale:
+    return _PendingSale(f"customer-{n}", [{"product_no": n, "qty": 1}])
+
+
+def test_concurrent_submits_share_one_batch():
+    repo = _FakeRepo()
+    committer = _GroupCommitter(repo, window_sec=1.0, max_batch=64)
+    sales = [_sale(n) for n in range(8)]
+    threads = [threading.Thread(target=committer.submit, args=(s,)) for s in sales]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    results = [s.future.result(5) for s in sales]
+    assert len(repo.batches) == 1
+    assert {s.sale_id for s in repo.batches[0]} == {s.sale_id for s in sales}
+    assert results == [(s.sale_id, s.ts) for s in sales]
+    assert len({sale_id for sale_id, _ in results}) == len(sales)
+
+
+def test_futures_resolve_only_after_the_write():
+    repo = _FakeRepo()
+    repo.gate.clear()
+    committer = _GroupCommitter(repo, window_sec=0.0, max_batch=64)
+    sale = _sale(1)
+    future = committer.submit(sale)
+
+    with pytest.raises(TimeoutError):
+        future.result(0.2)
+    assert repo.batches == []
+
+    repo.gate.set()
+    assert future.result(5) == (sale.sale_id, sale.ts)
+    assert sale.ts is not None
+
+
+def test_max_batch_closes_a_batch():
+    repo = _FakeRepo()
+    repo.gate.clear()
+    committer = _GroupCommitter(repo, window_sec=0.5, max_batch=3)
+    sales = [_sale(n) for n in range(7)]
+    for s in sales:
+        committer.submit(s)
+    repo.gate.set()
+    for s in sales:
+        s.future.result(5)
+    assert all(len(b) <= 3 for b in repo.batches)
+    assert [s.sale_id for b in repo.batches for s in b] == [s.sale_id for s in sales]
+
+
+def test_failed_write_fails_every_future_of_the_batch():
+    error = OSError("disk full")
+    repo = _FakeRepo(error)
+    repo.gate.clear()
+    committer = _GroupCommitter(repo, window_sec=0.5, max_batch=64)
+    sales = [_sale(n) for n in range(5)]
+    for s in sales:
+        committer.submit(s)
+    repo.gate.set()
+
+    for s in sales:
+        assert s.future.exception(5) is error
+
+
+def test_csv_batch_is_written_in_submit_order(sales_csv):
+    repo = CsvSalesRepo(sales_csv)
+    line = {"product_no": 1, "product_name": "AMP", "product_type": "AMP", "qty": 2, "unit_price": 10.0, "total_line": 20.0}
+    futures = [repo.submit_lines(f"customer-{n}", [line]) for n in range(20)]
+    results = [f.result(5) for f in futures]
+
+    df = repo.read_df()
+    assert list(df["sale_id"]) == [sale_id for sale_id, _ in results]
+    assert list(df["customer_id"]) == [f"customer-{n}" for n in range(20)]
+    assert df["ts"].is_monotonic_increasing
+
+
+def test_failed_sale_gives_the_stock_back(inventory_csv, sales_csv, monkeypatch):
+    svc = CartService()
+    svc.inv = CsvInventoryRepo(inventory_csv)
+    svc.sales = CsvSalesRepo(sales_csv)
+
+    def fail(self, batch):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(CsvSalesRepo, "_write_batch", fail)
+    done = svc.submit_checkout("walkin", [{"product_no": 1, "qty": 3, "unit_price": 1800.0}])
+    with pytest.raises(OSError, match="disk full"):
+        done.result(5)
+
+    df = svc.inv.read_df()
+    assert int(pd.to_numeric(df.loc[df["No_"] == 1, "number"]).iloc[0]) == 10
+    moves = svc.inv.ledger.movements(1, "2000-01-01", "2100-01-01")["movements"]
+    assert [(m["delta"], m["reason"]) for m in moves] == [(-3, "checkout"), (3, "checkout_failed")]
+    assert CsvSalesRepo(sales_csv).read_df().empty
+
+
+def test_sale_on_disk_succeeds_when_the_rollups_fail(inventory_csv, sales_csv, monkeypatch):
+    svc = CartService()
+    svc.inv = CsvInventoryRepo(inventory_csv)
+    svc.sales = CsvSalesRepo(sales_csv)
+
+    def fail(self, r, ts, lines, source_size):
+        raise RuntimeError("rollups broken")
+
+    with monkeypatch.context() as m:
+        m.setattr(SalesRollupStore, "add_sale", fail)
+        result = svc.submit_checkout("walkin", [{"product_no": 1, "qty": 3, "unit_price": 1800.0}]).result(5)
+
+    # acknowledged, stock taken once, and the rollups catch up from sales.csv
+    df = CsvSalesRepo(sales_csv).read_df()
+    assert list(df["sale_id"]) == [result["sale_id"]]
+    assert stock(svc.inv)[1] == 7
+    day = result["ts"].date().isoformat()
+    assert CsvSalesRepo(sales_csv).rollups().days == {day: [1, 3, 5400.0]}
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from conftest import stock
+from src.services.inventory_import import read_rows
+from src.services.inventory_service import InventoryService
+
+
+def _service(repo) -> InventoryService:
+    svc = InventoryService()
+    svc.repo = repo
+    return svc
+
+
+def _rows(body: str, fmt: str, chunk: int = 7) -> list[tuple]:
+    """Parse `body` as it would arrive: in small byte chunks."""
+    data = body.encode("utf-8")
+
+    async def chunks():
+        for i in range(0, len(data), chunk):
+            yield data[i:i + chunk]
+
+    async def collect():
+        return [row async for row in read_rows(chunks(), fmt)]
+
+    return asyncio.run(collect())
+
+
+def _import(svc: InventoryService, body: str, fmt: str, all_or_nothing: bool = False) -> dict:
+    entries, errors = svc.validate_import(_rows(body, fmt))
+    return svc.apply_import(entries, errors, all_or_nothing)
+
+
+CSV_BODY = (
+    "No_,name,number,cost,type,description\n"
+    "2,,7,,,\n"                                             # 1: update stock of 2
+    ",ลำโพง SPEAKER X,4,900,SPEAKER,\"two\nlines\"\n"       # 2: new product
+    "1,too,many,fields,here,x,y\n"                          # 3: parse error
+    ",NO COST,1,,AMP,\n"                                    # 4: new, not full
+    "3,,abc,,,\n"                                           # 5: number isn't an int
+    "99,,5,,,\n"                                            # 6: unknown No_, not full
+    "98,FULL NEW,2,100,AMP,\n"                              # 7: unknown No_, full: created as 98
+)
+
+NDJSON_BODY = "\n".join([
+    '{"No_": 2, "number": 7}',
+    '{"name": "ลำโพง SPEAKER X", "number": 4, "cost": 900, "type": "SPEAKER", "description": "two\\nlines"}',
+    '{"No_": 1, "name": ',
+    '{"name": "NO COST", "number": 1, "type": "AMP"}',
+    '{"No_": 3, "number": "abc"}',
+    '{"No_": 99, "number": 5}',
+    '{"No_": 98, "name": "FULL NEW", "number": 2, "cost": 100, "type": "AMP"}',
+]) + "\n"
+
+JSON_BODY = (
+    '[{"No_": 2, "number": 7},'
+    ' {"name": "ลำโพง SPEAKER X", "number": 4, "cost": 900, "type": "SPEAKER", "description": "two\\nlines"},'
+    ' ["not", "an", "object"],'
+    ' {"name": "NO COST", "number": 1, "type": "AMP"},'
+    ' {"No_": 3, "number": "abc"},'
+    ' {"No_": 99, "number": 5},'
+    ' {"No_": 98, "name": "FULL NEW", "number": 2, "cost": 100, "type": "AMP"}]'
+)
+
+BODIES = [(CSV_BODY, "csv"), (NDJSON_BODY, "ndjson"), (JSON_BODY, "json")]
+
+
+@pytest.mark.parametrize("body, fmt", BODIES, ids=[fmt for _, fmt in BODIES])
+def test_mixed_rows_write_the_valid_ones(inventory, body, fmt):
+    svc = _service(inventory)
+    result = _import(svc, body, fmt)
+
+    assert result["updated"] == [2]
+    assert result["created"] == [4, 98]
+    assert [e["row"] for e in result["errors"]] == [3, 4, 5, 6]
+
+    df = inventory.read_df(fill_null=False).set_index("No_")
+    assert stock(inventory) == {1: 10, 2: 7, 3: 0, 4: 4, 98: 2}
+    assert df.loc[4, "name"] == "ลำโพง SPEAKER X"
+    assert df.loc[4, "description"] == "two\nlines"
+    # an update leaves the fields it doesn't give alone
+    assert df.loc[2, "name"] == "AMP SOUNDMILAN AV-3346"
+    assert float(df.loc[2, "cost"]) == 2800.0
+    assert [m["reason"] for m in inventory.ledger.movements(2, "2000-01-01", "2100-01-01")["movements"]] == ["import"]
+
+
+@pytest.mark.parametrize("body, fmt", BODIES, ids=[fmt for _, fmt in BODIES])
+def test_all_or_nothing_writes_nothing_on_any_error(inventory, body, fmt):
+    before = stock(inventory)
+    result = _import(_service(inventory), body, fmt, all_or_nothing=True)
+    assert result["created"] == [] and result["updated"] == []
+    # rows failing validation stop it before anything reaches the repo
+    assert [e["row"] for e in result["errors"]] == [3, 4, 5]
+    assert stock(inventory) == before
+
+    # so does a row only the repo rejects (there is no No_ 99)
+    body = '{"No_": 2, "number": 7}\n{"No_": 99, "number": 5}\n'
+    result = _import(_service(inventory), body, "ndjson", all_or_nothing=True)
+    assert (result["updated"], [e["row"] for e in result["errors"]]) == ([], [2])
+    assert stock(inventory) == before
+
+
+def test_upsert_of_an_existing_product(inventory):
+    svc = _service(inventory)
+    result = _import(svc, '{"No_": 3, "name": "MIC RENAMED", "number": 6, "Brand": "SM"}\n', "ndjson")
+    assert result == {"created": [], "updated": [3], "errors": []}
+
+    row = inventory.read_df(fill_null=False).set_index("No_").loc[3]
+    assert (row["name"], int(row["number"]), row["Brand"], row["type"]) == ("MIC RENAMED", 6, "SM", "MICROPHONE")
+    assert len(inventory.read_df(fill_null=False)) == 3
+    assert [r["No_"] for r in inventory.search("renamed", None).to_dict("records")] == [3]
+
+
+def test_negative_adjustment_rolls_back_the_batch(inventory):
+    svc = _service(inventory)
+    with pytest.raises(ValueError, match="No_=2"):
+        svc.bulk_adjust([{"product_no": 1, "delta": 5}, {"product_no": 2, "delta": -6}])
+    with pytest.raises(KeyError):
+        svc.bulk_adjust([{"product_no": 1, "delta": 5}, {"product_no": 42, "delta": 1}])
+    assert stock(inventory) == {1: 10, 2: 5, 3: 0}
+    assert inventory.ledger.checkpoints() == []
+
+    result = svc.bulk_adjust([{"product_no": 1, "delta": 5}, {"product_no": 2, "delta": -5}, {"product_no": 1, "delta": -1}])
+    assert result == [{"product_no": 1, "before": 10, "after": 14}, {"product_no": 2, "before": 5, "after": 0}]
+    assert stock(inventory) == {1: 14, 2: 0, 3: 0}
+
+
+def test_import_and_adjust_routes(client):
+    r = client.post(
+        "/inventory/import?all_or_nothing=true",
+        content=b'{"No_": 1, "number": 3}\nnot json\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    assert r.json()["errors"][0]["row"] == 2
+    assert client.post("/inventory/import?format=xml", content=b"").status_code == 400
+    assert client.post("/inventory/bulk-adjust", json=[{"product_no": 1, "delta": -1000}]).status_code == 409
+    assert client.post("/inventory/bulk-adjust", json=[{"product_no": 4242, "delta": 1}]).status_code == 404
+
+
+def test_import_route_validates_in_batches(client, monkeypatch):
+    from src.api import routes_inventory
+
+    seen = []
+    validate = InventoryService.validate_import
+
+    def spy(self, rows):
+        seen.append([n for n, _ in rows])
+        return validate(self, rows)
+
+    monkeypatch.setattr(routes_inventory, "VALIDATE_BATCH", 3)
+    monkeypatch.setattr(InventoryService, "validate_import", spy)
+    r = client.post("/inventory/import?format=ndjson", content=NDJSON_BODY.encode("utf-8"))
+    assert r.status_code == 200
+    assert seen == [[1, 2, 3], [4, 5, 6], [7]]
+    # the same rows come out as from one pass
+    assert [e["row"] for e in r.json()["errors"]] == [3, 4, 5, 6]
+    assert r.json()["updated"] == [2]
@@ -0,0 +1,102 @@
+import random
+import threading
+
+from src.repos.csv_inventory_repo import CsvInventoryRepo, _resident_table, _text
+
+QUERIES = [("amp", None), ("mba", None), ("a", None), ("888", None), (None, "amp"), ("mic", "micro"), ("zz", None), ("x+", None)]
+
+
+def _found(repo: CsvInventoryRepo, q, type_) -> list[int]:
+    return sorted(int(no) for no in repo.search(q, type_)["No_"])
+
+
+def _scanned(repo: CsvInventoryRepo, q, type_) -> list[int]:
+    df = repo.read_df(fill_null=False)
+    if q:
+        df = df[_text(df["name"]).str.contains(q, case=False, na=False)]
+    if type_:
+        df = df[_text(df["type"]).str.contains(type_, case=False, na=False)]
+    return sorted(int(no) for no in df["No_"])
+
+
+def test_indexed_search_matches_a_scan_through_writes(inventory_csv):
+    repo = CsvInventoryRepo(inventory_csv)
+    rng = random.Random(7)
+    words = ["amp", "mba", "mic", "speaker", "888a", "ไมค์"]
+
+    for step in range(60):
+        nos = [int(n) for n in repo.read_df(fill_null=False)["No_"]]
+        op = rng.choice(["name", "type", "create", "delete", "stock"])
+        if op == "name" and nos:
+            repo.update_product_fields(rng.choice(nos), {"name": " ".join(rng.sample(words, 2))})
+        elif op == "type" and nos:
+            repo.update_product_fields(rng.choice(nos), {"type": rng.choice(["AMP", "MICROPHONE", "SPEAKER"])})
+        elif op == "create":
+            repo.create_product({"name": rng.choice(words) + f" {step}", "type": "AMP", "number": 3})
+        elif op == "delete" and len(nos) > 2:
+            repo.delete_products([rng.choice(nos)])
+        elif nos:
+            repo.increment_stock(rng.choice(nos), 1)
+
+        for q, type_ in QUERIES:
+            assert _found(repo, q, type_) == _scanned(repo, q, type_), (step, op, q, type_)
+
+
+def test_published_search_is_never_changed(inventory_csv):
+    repo = CsvInventoryRepo(inventory_csv)
+    assert _found(repo, "soundmilan", None) == [2]
+    table = _resident_table(inventory_csv)
+    before = table.search
+    name_before = before.df.loc[before.df["No_"] == 2, "name"].iloc[0]
+    stock_before = int(before.df.loc[before.df["No_"] == 1, "number"].iloc[0])
+
+    repo.update_product_fields(2, {"name": "PREAMP NEWNAME"})
+    repo.increment_stock(1, 5)
+    repo.create_product({"name": "SOUNDMILAN 2", "type": "AMP", "number": 1})
+
+    # what a reader already holds answers as before
+    assert before.index.match_name("soundmilan") == {2}
+    assert before.index.match_name("newname") == set()
+    assert before.df.loc[before.df["No_"] == 2, "name"].iloc[0] == name_before
+    assert int(before.df.loc[before.df["No_"] == 1, "number"].iloc[0]) == stock_before
+    # and the table moved on
+    assert _found(repo, "soundmilan", None) == [4]
+    assert _found(repo, "newname", None) == [2]
+    assert table.search is not before and table.search.df is table.df
+
+
+def test_stock_writes_keep_the_index(inventory_csv):
+    repo = CsvInventoryRepo(inventory_csv)
+    repo.search("amp", None)
+    table = _resident_table(inventory_csv)
+    index, positions = table.search.index, table.search.positions
+    repo.decrement_many([(1, 2), (2, 1)])
+    assert table.search.index is index and table.search.positions is positions
+    assert table.search.df is table.df
+
+
+def test_searches_during_writes(inventory_csv):
+    repo = CsvInventoryRepo(inventory_csv)
+    stop = threading.Event()
+    errors = []
+
+    def search():
+        while not stop.is_set():
+            try:
+                df = repo.search("amp", None, fill_null=False)
+                # every row returned really matches, whatever was written meanwhile
+                assert df["name"].str.lower().str.contains("amp").all()
+            except Exception as e:          # noqa: BLE001 - reported below
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for n in range(40):
+        repo.update_product_fields(1 + n % 3, {"name": "AMP %d" % n if n % 2 else "MIC %d" % n})
+        repo.increment_stock(1, 1)
+    stop.set()
+    for t in readers:
+        t.join()
+    assert errors == []
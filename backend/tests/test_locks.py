@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.repos.locks import file_lock
+
+# another process: hold an exclusive flock on argv[1] until stdin closes
+HOLDER = """
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_CREAT | os.O_RDWR, 0o644)
+fcntl.flock(fd, fcntl.LOCK_EX)
+print("held", flush=True)
+sys.stdin.read()
+"""
+
+
+@pytest.fixture
+def held_elsewhere(tmp_path):
+    path = str(tmp_path / "locks" / "x.lock")
+    (tmp_path / "locks").mkdir()
+    holder = subprocess.Popen([sys.executable, "-c", HOLDER, path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    assert holder.stdout.readline().strip() == "held"
+    yield path, holder
+    if holder.poll() is None:
+        holder.stdin.close()
+        holder.wait(10)
+
+
+def test_waiting_on_another_process_times_out(held_elsewhere):
+    path, _ = held_elsewhere
+    for shared in (False, True):
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            with file_lock(path, timeout_sec=0.3, shared=shared):
+                pass
+        assert 0.25 < time.monotonic() - start < 2
+
+
+def test_threads_keep_their_timeouts_while_one_waits_on_another_process(held_elsewhere):
+    path, holder = held_elsewhere
+    got = threading.Event()
+
+    def writer():
+        with file_lock(path, timeout_sec=10):
+            got.set()
+
+    t = threading.Thread(target=writer)
+    t.start()
+    time.sleep(0.1)             # the writer is now trying the flock
+
+    # a reader of this process isn't stuck behind it
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        with file_lock(path, timeout_sec=0.2, shared=True):
+            pass
+    assert time.monotonic() - start < 1
+
+    # the writer gets the lock once the other process lets go
+    assert not got.is_set()
+    holder.stdin.close()
+    holder.wait(10)
+    t.join(10)
+    assert got.is_set()
+    with file_lock(path, timeout_sec=1, shared=True):
+        pass
@@ -0,0 +1,94 @@
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+from conftest import write_sales
+from src.repos.csv_inventory_repo import CsvInventoryRepo
+from src.repos.csv_sales_repo import CsvSalesRepo, _in_days
+from src.repos.csv_schema import SALES
+from src.repos.sales_date_index import SalesDateIndexStore
+from src.services.analytics_service import AnalyticsService
+from src.services.sales_velocity import SalesVelocity
+
+RANGES = [
+    ("2026-03-01", "2026-03-01"),
+    ("2026-03-02", "2026-03-05"),
+    ("2026-03-01", "2026-03-31"),
+    ("2026-03-04", "2026-03-04"),       # between two sale days
+    ("2026-02-01", "2026-02-28"),       # before the first sale
+    ("2026-04-01", "2026-04-30"),       # after the last
+]
+
+
+def _lines(days: list[int]) -> list[tuple]:
+    out = []
+    for n, day in enumerate(days):
+        # +07:00: the UTC date is the day before for early hours
+        ts = f"2026-03-{day:02d}T{(n * 5) % 24:02d}:00:00+07:00"
+        for product in (1, 2, 3)[: 1 + n % 3]:
+            out.append((f"sale-{n}", ts, "walkin", product, f"p{product}", "AMP", 1 + n, 100.0 + n, (1 + n) * (100.0 + n)))
+    return out
+
+
+ORDERED = [1, 1, 2, 3, 3, 6, 7, 7, 9]
+UNORDERED = [3, 1, 7, 2, 9, 3, 6, 1, 7]
+
+
+def _service(tmp_path, inventory_csv: str, days: list[int]) -> AnalyticsService:
+    path = write_sales(tmp_path / "sales.csv", _lines(days))
+    # the date index as the CLI builds it
+    subprocess.run([sys.executable, "-m", "src.repos.sales_date_index", "rebuild", "--sales", path], check=True)
+    svc = AnalyticsService()
+    svc.inv = CsvInventoryRepo(inventory_csv)
+    svc.sales = CsvSalesRepo(path)
+    svc.velocity = SalesVelocity(svc.sales)
+    return svc
+
+
+def _full_scan(path: str, start: str, end: str) -> dict:
+    """{product_no: (units, revenue)} from every line of sales.csv."""
+    df = _in_days(SALES.read_csv(path), date.fromisoformat(start), date.fromisoformat(end))
+    df = df.assign(revenue=df["qty"] * df["unit_price"])
+    g = df.groupby("product_no").agg(units=("qty", "sum"), revenue=("revenue", "sum"))
+    return {int(no): (int(r["units"]), float(r["revenue"])) for no, r in g.iterrows()}
+
+
+@pytest.mark.parametrize("days, ordered", [(ORDERED, True), (UNORDERED, False)])
+def test_sales_detail_matches_a_full_scan(tmp_path, inventory_csv, days, ordered):
+    svc = _service(tmp_path, inventory_csv, days)
+    assert SalesDateIndexStore(svc.sales.path).get().ordered is ordered
+
+    for start, end in RANGES:
+        expected = _full_scan(svc.sales.path, start, end)
+        rows = svc.get_sales_detail(start, end)
+        assert {r["product_no"]: (r["units_sold"], r["actual_sold_total"]) for r in rows} == expected
+        columns = svc.get_sales_detail(start, end, columns=True)
+        assert columns["product_no"] == [r["product_no"] for r in rows]
+
+        # the byte range read holds every line of the range
+        start_d, end_d = date.fromisoformat(start), date.fromisoformat(end)
+        got = _in_days(svc.sales.read_range(start_d, end_d), start_d, end_d)
+        want = _in_days(SALES.read_csv(svc.sales.path), start_d, end_d)
+        assert sorted(got["sale_id"]) == sorted(want["sale_id"])
+
+
+@pytest.mark.parametrize("days", [ORDERED, UNORDERED])
+def test_latest_date_matches_a_full_scan(tmp_path, inventory_csv, days):
+    svc = _service(tmp_path, inventory_csv, days)
+    latest = SALES.read_csv(svc.sales.path)["ts"].max().date().isoformat()
+    assert svc.get_latest_sales_date() == {"latest_date": latest}
+
+
+def test_empty_range_and_empty_file(tmp_path, inventory_csv):
+    svc = _service(tmp_path, inventory_csv, [])
+    assert svc.get_sales_detail("2026-03-01", "2026-03-31") == []
+    assert svc.get_sales_detail("2026-03-01", "2026-03-31", columns=True)["product_no"] == []
+    assert svc.get_latest_sales_date() == {"latest_date": None}
+
+
+def test_sales_detail_rejects_bad_dates(client):
+    r = client.get("/analytics/sales-detail", params={"start": "2026-13-01", "end": "2026-03-31"})
+    assert r.status_code == 400
+    assert client.get("/analytics/sales-detail", params={"start": "2026-03-01", "end": "2026-03-31"}).status_code == 200
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+from conftest import write_sales
+from src.repos.csv_inventory_repo import CsvInventoryRepo
+from src.repos.csv_sales_repo import CsvSalesRepo
+from src.repos.csv_schema import SALES_COLUMNS
+from src.services.analytics_service import SALES_DETAIL_FIELDS, AnalyticsService
+from src.services.sales_velocity import SalesVelocity
+
+START, END = "2026-03-01", "2026-03-31"
+
+LINES = [
+    ("sale-0", "2026-03-01T10:00:00.250000+00:00", "walkin", 1, "AMP A/B", "AMP", 2, 1800.0, 3600.0),
+    ("sale-1", "2026-03-02T10:00:00+00:00", "walkin", 3, "ไมค์ 888A", "MICROPHONE", 1, 1900.1, 1900.1),
+    ("sale-2", "2026-03-03T10:00:00+00:00", "", 2, "", "AMP", 3, 3333.3333333333, 9999.9999999999),
+    ("sale-3", "2026-04-01T10:00:00+00:00", "walkin", 1, "later", "AMP", 1, 1.0, 1.0),
+]
+
+
+def _service(tmp_path, inventory_csv: str) -> AnalyticsService:
+    svc = AnalyticsService()
+    svc.inv = CsvInventoryRepo(inventory_csv)
+    svc.sales = CsvSalesRepo(write_sales(tmp_path / "sales.csv", LINES))
+    svc.velocity = SalesVelocity(svc.sales)
+    return svc
+
+
+def _csv_rows(body: bytes, columns: list[str]) -> list[dict]:
+    reader = csv.reader(io.StringIO(body.decode("utf-8")))
+    assert next(reader) == columns
+    return [dict(zip(columns, row)) for row in reader]
+
+
+def _ndjson_rows(body: bytes) -> list[dict]:
+    text = body.decode("utf-8")
+    assert text.endswith("\n") and "\n\n" not in text
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def _as_csv_text(rows: list[dict]) -> list[dict]:
+    # what each value reads as in a CSV field
+    return [{k: str(v) for k, v in row.items()} for row in rows]
+
+
+def test_sales_export_csv_and_ndjson_agree(tmp_path, inventory_csv):
+    svc = _service(tmp_path, inventory_csv)
+    csv_rows = _csv_rows(b"".join(svc.export_sales(START, END, "csv")), SALES_COLUMNS)
+    body = b"".join(svc.export_sales(START, END, "ndjson"))
+    ndjson_rows = _ndjson_rows(body)
+
+    assert [r["sale_id"] for r in csv_rows] == ["sale-0", "sale-1", "sale-2"]
+    assert _as_csv_text(ndjson_rows) == csv_rows
+    # missing values are 'null' in both; no '\/' escapes, non-ASCII as is
+    assert (ndjson_rows[2]["customer_id"], ndjson_rows[2]["product_name"]) == ("null", "null")
+    assert "AMP A/B" in body.decode("utf-8") and "ไมค์" in body.decode("utf-8")
+    assert ndjson_rows[2]["unit_price"] == 3333.3333333333
+
+
+def test_sales_detail_export_csv_ndjson_and_json_agree(tmp_path, inventory_csv):
+    svc = _service(tmp_path, inventory_csv)
+    csv_rows = _csv_rows(b"".join(svc.export_sales_detail(START, END, "csv")), SALES_DETAIL_FIELDS)
+    ndjson_rows = _ndjson_rows(b"".join(svc.export_sales_detail(START, END, "ndjson")))
+    json_rows = svc.get_sales_detail(START, END)
+
+    assert sorted(r["product_no"] for r in ndjson_rows) == [1, 2, 3]
+    assert _as_csv_text(ndjson_rows) == csv_rows
+    assert ndjson_rows == json_rows
+    by_no = {r["product_no"]: r for r in ndjson_rows}
+    assert (by_no[1]["description"], by_no[1]["localtion"]) == ("null", "F, A4")
+    assert by_no[3]["description"] == "wireless"
+
+
+def test_empty_range_exports_no_rows(tmp_path, inventory_csv):
+    svc = _service(tmp_path, inventory_csv)
+    assert b"".join(svc.export_sales("2026-05-01", "2026-05-31", "ndjson")) == b""
+    assert _csv_rows(b"".join(svc.export_sales("2026-05-01", "2026-05-31", "csv")), SALES_COLUMNS) == []
@@ -0,0 +1,122 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import stock
+from src.repos import csv_stock_ledger, sqlite_stock_ledger
+from src.repos.csv_schema import TS_TEXT
+
+DAYS = ["2026-03-01", "2026-03-02", "2026-03-03", "2026-03-04", "2026-03-05"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Movements are stamped on clock["day"], a second apart."""
+    state = {"day": DAYS[0]}
+    ticks = itertools.count()
+
+    def now_text() -> str:
+        start = datetime.fromisoformat(state["day"]).replace(tzinfo=timezone.utc)
+        return (start + timedelta(seconds=next(ticks))).strftime(TS_TEXT)
+
+    monkeypatch.setattr(csv_stock_ledger, "now_text", now_text)
+    monkeypatch.setattr(sqlite_stock_ledger, "now_text", now_text)
+    return state
+
+
+def _write(repo, day: str) -> None:
+    """
+    A day's worth of stock changes: more movements than a checkpoint
+    holds, and a product moving twice after the day's last checkpoint.
+    """
+    if day == DAYS[0]:
+        repo.increment_stock(1, 5)
+        repo.decrement_many([(1, 2), (2, 1)])
+        repo.adjust_many([(3, 4), (2, 2)])
+        repo.increment_stock(3, 1)
+        repo.increment_stock(3, 2)
+    elif day == DAYS[1]:
+        repo.create_product({"name": "NEW SPEAKER", "type": "SPEAKER", "number": 6})
+        repo.adjust_many([(1, -3), (4, -1)])
+        repo.increment_stock(1, 1)
+        repo.increment_stock(1, 1)
+    elif day == DAYS[2]:
+        repo.delete_products([2])
+        repo.decrement_many([(4, 5), (3, 2)])
+        repo.increment_stock(1, 7)
+        repo.increment_stock(4, 3)
+        repo.decrement_many([(4, 1)])
+    # DAYS[3]: nothing moves
+    elif day == DAYS[4]:
+        repo.update_product_fields(1, {"number": 1})
+        repo.create_product({"name": "EMPTY", "type": "AMP", "number": 0})
+
+
+def _replay(clock, repo) -> dict[str, dict[int, int]]:
+    """{day: stock at the end of it}, writing DAYS one after the other."""
+    closing = {}
+    for day in DAYS:
+        clock["day"] = day
+        _write(repo, day)
+        closing[day] = stock(repo)
+    return closing
+
+
+def test_stock_as_of_replays_across_checkpoints(clock, inventory):
+    closing = _replay(clock, inventory)
+    ledger = inventory.ledger
+
+    assert len(ledger.checkpoints()) >= 4
+
+    for day in DAYS:
+        result = ledger.stock_as_of(day)
+        assert {i["product_no"]: i["stock"] for i in result["items"]} == closing[day], day
+        assert result["checkpoint"]["ts"] < (datetime.fromisoformat(day) + timedelta(days=1)).isoformat()
+        # the day ends past a checkpoint: movements are replayed
+        assert result["replayed"] > 0, day
+    assert 2 not in {i["product_no"] for i in ledger.stock_as_of(DAYS[2])["items"]}
+
+    with pytest.raises(ValueError):
+        ledger.stock_as_of("2026-02-28")
+
+
+def test_movements_across_checkpoints(clock, inventory):
+    closing = _replay(clock, inventory)
+    ledger = inventory.ledger
+
+    for no in (1, 3, 4):
+        for start, end in itertools.combinations_with_replacement(range(len(DAYS)), 2):
+            result = ledger.movements(no, DAYS[start], DAYS[end])
+            closed = closing[DAYS[end]].get(no, 0)
+            assert result["closing"] == closed, (no, start, end)
+            if start > 0:
+                opened = closing[DAYS[start - 1]].get(no, 0)
+                assert result["opening"] == opened, (no, start, end)
+                assert sum(m["delta"] for m in result["movements"]) == closed - opened
+            assert all(DAYS[start] <= m["ts"][:10] <= DAYS[end] for m in result["movements"])
+
+    # product 1 on the first day: +5, -2
+    assert [m["delta"] for m in ledger.movements(1, DAYS[0], DAYS[0])["movements"]] == [5, -2]
+    assert [m["reason"] for m in ledger.movements(1, DAYS[0], DAYS[0])["movements"]] == ["add_stock", "checkout"]
+
+
+def test_stock_history_route(client):
+    # writes through the app, enough of them to take checkpoints
+    for n in range(6):
+        assert client.post("/inventory/1/add-stock", params={"qty": 1 + n}).status_code == 200
+        assert client.post("/inventory/bulk-adjust", json=[{"product_no": 2, "delta": 1}, {"product_no": 3, "delta": 2}]).status_code == 200
+    assert client.post("/inventory/2/add-stock", params={"qty": 3}).status_code == 200
+
+    rows = client.get("/inventory/search", params={"fields": "No_,number"}).json()
+    current = {int(r["No_"]): int(float(r["number"])) for r in rows}
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    r = client.get("/inventory/stock-history", params={"as_of": today})
+    assert r.status_code == 200
+    body = r.json()
+    assert {i["product_no"]: i["stock"] for i in body["items"]} == current
+    assert body["checkpoint"]["seq"] > 0
+
+    assert client.get("/inventory/stock-history", params={"as_of": "2000-01-01"}).status_code == 400
+    assert client.get("/inventory/stock-history", params={"as_of": "2026-13-01"}).status_code == 400
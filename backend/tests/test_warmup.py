@@ -0,0 +1,48 @@
+from src.app import warmup
+
+
+def test_ready_stays_503_until_a_failed_step_succeeds(client, monkeypatch):
+    broken = {"sales": True}
+    ran = []
+
+    def sales():
+        ran.append("sales")
+        if broken["sales"]:
+            raise OSError("sales.csv unreadable")
+
+    monkeypatch.setattr(warmup, "READINESS", warmup.Readiness())
+    monkeypatch.setattr(warmup, "RETRY_SEC", 0.0)
+    monkeypatch.setattr(warmup, "_steps", lambda: [("inventory", lambda: None), ("sales", sales)])
+
+    status = warmup.warm_up()
+    assert status["ready"] is False
+    assert status["failed"] == {"sales": "OSError: sales.csv unreadable"}
+
+    # each probe retries the failed step, and only that one
+    r = client.get("/ready")
+    assert r.status_code == 503 and "sales" in r.json()["failed"]
+    assert ran == ["sales", "sales"]
+
+    broken["sales"] = False
+    r = client.get("/ready")
+    assert r.status_code == 200
+    assert r.json()["ready"] is True and "failed" not in r.json()
+    assert ran == ["sales", "sales", "sales"]
+
+
+def test_retries_are_spaced(monkeypatch):
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(warmup, "READINESS", warmup.Readiness())
+    monkeypatch.setattr(warmup, "RETRY_SEC", 3600.0)
+    monkeypatch.setattr(warmup, "_steps", lambda: [("dashboard", fail)])
+
+    warmup.warm_up()
+    warmup.retry_failed()       # the first retry is due at once
+    warmup.retry_failed()
+    assert len(calls) == 2
+    assert warmup.retry_failed()["ready"] is False
@@ -0,0 +1,98 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from conftest import stock, write_inventory, write_sales
+from src.repos.csv_inventory_repo import CsvInventoryRepo, _resident_table
+from src.repos.csv_sales_repo import CsvSalesRepo
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# another process: take 3 of product 1 and record the sale
+WRITER = """
+import sys
+from src.repos.csv_inventory_repo import CsvInventoryRepo
+from src.repos.csv_sales_repo import CsvSalesRepo
+CsvInventoryRepo(sys.argv[1]).decrement_many([(1, 3)])
+CsvSalesRepo(sys.argv[2]).append_lines("walkin", [{
+    "product_no": 1, "product_name": "AMP", "product_type": "AMP",
+    "qty": 3, "unit_price": 10.0, "total_line": 30.0,
+}])
+"""
+
+
+def test_a_write_in_another_process_is_seen_at_once(inventory_csv, sales_csv):
+    inv, sales = CsvInventoryRepo(inventory_csv), CsvSalesRepo(sales_csv)
+    assert stock(inv)[1] == 10
+    assert sales.rollups().days == {}
+    # only the generation counters may tell these caches to look again
+    _resident_table(inventory_csv).check.recheck_sec = 3600
+    sales.stamp.check.recheck_sec = 3600
+
+    subprocess.run([sys.executable, "-c", WRITER, inventory_csv, sales_csv], cwd=BACKEND, check=True)
+
+    assert stock(inv)[1] == 7
+    today = datetime.now(timezone.utc).date().isoformat()
+    assert sales.rollups().days == {today: [1, 3, 30.0]}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_two_workers_share_one_data_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    env = {
+        **os.environ,
+        "DATA_DIR": str(data),
+        "INVENTORY_CSV": write_inventory(data / "data.csv"),
+        "SALES_CSV": write_sales(data / "sales.csv"),
+        "COHERENCE_RECHECK_SEC": "3600",
+    }
+    port = _free_port()
+    # launched as in the Docker image
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app.main:app", "--port", str(port), "--workers", "2"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # a new connection per request, so both workers get some
+        headers = {"Connection": "close"}
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30, headers=headers) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                assert time.monotonic() < deadline, "server didn't start"
+                time.sleep(0.2)
+
+            expected = 10
+            for n in range(40):
+                # each request goes to whichever worker accepts it; a stale
+                # cache in the other one would show an older stock
+                if n % 4 == 3:
+                    r = client.post("/cart/checkout", json={
+                        "customer_id": "walkin", "items": [{"product_no": 1, "qty": 1, "unit_price": 1800.0}],
+                    })
+                    expected -= 1
+                else:
+                    r = client.post("/inventory/1/add-stock", params={"qty": 2})
+                    expected += 2
+                assert r.status_code == 200, r.text
+                for _ in range(3):
+                    rows = client.get("/inventory/search", params={"q": "mba av-268", "fields": "No_,number"}).json()
+                    assert [int(float(row["number"])) for row in rows] == [expected], n
+    finally:
+        server.terminate()
+        server.wait(30)
@@ -1,91 +1,251 @@
-import csv
-import uuid
-import random
-from datetime import datetime, timedelta, timezone
+import argparse
+import io
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
 
 # ================= CONFIG =================
+# Defaults reproduce the old script: ~6 months, 5-15 single-line sales a
+# day, four customers. Every knob is a command line flag:
+#
+#   python generate_mock_sales.py --days 1095 --sales-per-day 3000 \
+#       --max-lines-per-sale 4 --weekday-weights 1,1,1,1,1.2,1.6,1.4 \
+#       --yearly-amplitude 0.3 --growth 0.15 --workers 8 --index --columnar
+#
+# Output is a pure function of the flags (including --seed and --end):
+# each block of days draws from its own seed, so the worker count does
+# not change a single byte.
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
 OUTPUT_FILE = "sales.csv"
+INVENTORY_FILE = os.path.join(BACKEND_DIR, "data", "data.csv")
 
 DAYS_BACK = 180  # ~6 months
-SALES_PER_DAY_MIN = 5
-SALES_PER_DAY_MAX = 15
-
-CUSTOMERS = [
-    "walkin-1",
-    "walkin-2",
-    "walkin-3",
-    "VIP-01",
+SALES_PER_DAY = 10
+CUSTOMERS = "walkin-1=1,walkin-2=1,walkin-3=1,VIP-01=1"
+
+COLUMNS = [
+    "sale_id",
+    "ts",
+    "customer_id",
+    "product_no",
+    "product_name",
+    "product_type",
+    "qty",
+    "unit_price",
+    "total_line",
 ]
+ROWS_PER_BLOCK = 250_000   # rough size of one generated block
+
+
+# ================= PRODUCTS =================
+def load_products(path: str, seed: int, popularity: float) -> pd.DataFrame:
+    """
+    Sellable products from the real inventory: No_, name, type, a unit
+    price and a sampling weight (a few best sellers, a long tail).
+    """
+    inv = pd.read_csv(path)
+    inv = inv.dropna(subset=["No_", "name"])
+    price = inv["sell_price_avg"]
+    for fallback in [inv.get("sell_price_lower"), inv.get("cost") * 1.3 if "cost" in inv else None]:
+        if fallback is not None:
+            price = price.where(price > 0, fallback)
+    inv = inv.assign(unit_price=price.fillna(0).round(2))
+    inv = inv[inv["unit_price"] > 0].reset_index(drop=True)
+    if inv.empty:
+        raise SystemExit(f"no products with a price in {path}")
+
+    rng = np.random.default_rng([seed, 0xC0FFEE])
+    weight = rng.pareto(popularity, len(inv)) + 1 if popularity > 0 else np.ones(len(inv))
+    return pd.DataFrame({
+        "product_no": inv["No_"].astype("int64"),
+        "product_name": inv["name"].astype(str),
+        "product_type": inv["type"] if "type" in inv else None,
+        "unit_price": inv["unit_price"].astype(float),
+        "weight": weight / weight.sum(),
+    })
+
+
+def parse_customers(spec: str) -> tuple[np.ndarray, np.ndarray]:
+    """"name=weight,..." -> (names, probabilities)."""
+    names, weights = [], []
+    for part in spec.split(","):
+        name, _, w = part.strip().partition("=")
+        names.append(name)
+        weights.append(float(w or 1))
+    weights = np.array(weights)
+    return np.array(names, dtype=object), weights / weights.sum()
 
-# product_no, product_name, product_type, unit_price
-PRODUCTS = [
-    (13, "USB MP3 player รถ DZ-529", "USB MP3", 550.0),
-    (14, "USB MP3 player รถ DZ-599", "USB MP3", 600.0),
-    (15, "USB MP3 player รถ KEVLAR K-2200B", "USB MP3", 850.0),
-    (16, "USB MP3 player รถ XL-9", "USB MP3", 1100.0),
-    (17, "USB MP3 player ROADSTAR (RS101-MP3)", "USB MP3", 950.0),
-
-    (1, "ไมค์ลอย mba 888a (U3)", "MICROPHONE", 1800.0),
-    (2, "ไมค์ลอย mba 888a (U1)", "MICROPHONE", 1900.0),
-    (3, "ไมค์ลอย sound milan ml-6675", "MICROPHONE", 1800.0),
-    (6, "ไมค์ลอย npe", "MICROPHONE", 380.0),
-
-    (18, "AMP MBA MB7000 AV-191A", "AMP", 3500.0),
-    (19, "AMP FANNY AV-168A", "AMP", 2900.0),
-    (24, "AMP SOUNDMILAN AV-302", "AMP", 3500.0),
-]
 
 # ================= GENERATE =================
-start_date = datetime.now(timezone.utc) - timedelta(days=DAYS_BACK)
-end_date = datetime.now(timezone.utc)
-
-rows = []
-
-current_date = start_date
-while current_date.date() <= end_date.date():
-    sales_today = random.randint(SALES_PER_DAY_MIN, SALES_PER_DAY_MAX)
-
-    for _ in range(sales_today):
-        product_no, product_name, product_type, unit_price = random.choice(PRODUCTS)
-        qty = random.randint(1, 3)
-
-        ts = current_date.replace(
-            hour=random.randint(9, 21),
-            minute=random.randint(0, 59),
-            second=random.randint(0, 59),
-            microsecond=random.randint(0, 999999),
-        )
-
-        total_line = qty * unit_price
-
-        rows.append([
-            str(uuid.uuid4()),
-            ts.isoformat(),
-            random.choice(CUSTOMERS),
-            product_no,
-            product_name,
-            product_type,
-            qty,
-            float(unit_price),
-            float(total_line),
-        ])
-
-    current_date += timedelta(days=1)
-
-# ================= WRITE CSV =================
-with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow([
-        "sale_id",
-        "ts",
-        "customer_id",
-        "product_no",
-        "product_name",
-        "product_type",
-        "qty",
-        "unit_price",
-        "total_line",
-    ])
-    writer.writerows(rows)
-
-print(f"✅ Generated {len(rows)} rows → {OUTPUT_FILE}")
+# the worker processes get these once, through the pool initializer
+_products: pd.DataFrame = None
+_opts: argparse.Namespace = None
+
+
+def _init(products: pd.DataFrame, opts: argparse.Namespace) -> None:
+    global _products, _opts
+    _products, _opts = products, opts
+
+
+def daily_rate(days: pd.DatetimeIndex, start: pd.Timestamp, opts) -> np.ndarray:
+    """Expected sales per day: base x weekday x yearly season x growth."""
+    weekday = np.array([float(w) for w in opts.weekday_weights.split(",")])
+    rate = opts.sales_per_day * weekday[days.dayofweek]
+    phase = 2 * np.pi * (days.dayofyear.to_numpy() - opts.peak_day) / 365.25
+    rate = rate * (1 + opts.yearly_amplitude * np.cos(phase))
+    years = (days - start).days.to_numpy() / 365.25
+    rate = rate * (1 + opts.growth) ** years
+    return np.clip(rate, 0, None)
+
+
+def _uuid4s(rng: np.random.Generator, n: int) -> list[str]:
+    raw = rng.integers(0, 256, (n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40      # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80      # RFC 4122 variant
+    h = raw.tobytes().hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, 32 * n, 32)
+    ]
+
+
+def generate_block(block: int) -> bytes:
+    """CSV bytes (no header) for days [block * block_days, ...), in time order."""
+    opts, products = _opts, _products
+    rng = np.random.default_rng([opts.seed, block])
+
+    start = pd.Timestamp(opts.start, tz="UTC")
+    first = block * opts.block_days
+    days = pd.date_range(start + pd.Timedelta(days=first), periods=min(opts.block_days, opts.days - first), freq="D")
+
+    sales_per_day = rng.poisson(daily_rate(days, start, opts))
+    n_sales = int(sales_per_day.sum())
+    if n_sales == 0:
+        return b""
+
+    # sale timestamps: a uniform moment within opening hours, sorted per day
+    day_ns = np.repeat(days.as_unit("ns").asi8, sales_per_day)
+    open_ns = opts.open_hour * 3_600_000_000_000
+    span_ns = (opts.close_hour - opts.open_hour) * 3_600_000_000_000
+    offset = rng.integers(open_ns, open_ns + span_ns, n_sales)
+    ts = np.sort(day_ns + offset)          # days are consecutive, so a global sort keeps them grouped
+
+    names, probs = parse_customers(opts.customers)
+    customer = names[rng.choice(len(names), n_sales, p=probs)]
+    sale_id = np.array(_uuid4s(rng, n_sales), dtype=object)
+
+    # lines of each sale
+    lines = rng.integers(1, opts.max_lines_per_sale + 1, n_sales)
+    n_lines = int(lines.sum())
+    prod = rng.choice(len(products), n_lines, p=products["weight"].to_numpy())
+    qty = rng.integers(1, opts.max_qty + 1, n_lines)
+    unit_price = products["unit_price"].to_numpy()[prod]
+
+    ts_text = pd.Series(np.datetime_as_string(np.repeat(ts, lines).astype("M8[ns]"), unit="us")) + "+00:00"
+    df = pd.DataFrame({
+        "sale_id": np.repeat(sale_id, lines),
+        "ts": ts_text,
+        "customer_id": np.repeat(customer, lines),
+        "product_no": products["product_no"].to_numpy()[prod],
+        "product_name": products["product_name"].to_numpy()[prod],
+        "product_type": products["product_type"].to_numpy()[prod],
+        "qty": qty,
+        "unit_price": unit_price,
+        "total_line": unit_price * qty,
+    }, columns=COLUMNS)
+
+    buf = io.StringIO()
+    df.to_csv(buf, header=False, index=False)
+    return buf.getvalue().encode("utf-8")
+
+
+def generate(opts, products: pd.DataFrame) -> int:
+    """Stream every block to opts.output in order. Returns lines written."""
+    blocks = -(-opts.days // opts.block_days)
+    rows = 0
+    tmp = opts.output + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write((",".join(COLUMNS) + "\n").encode("utf-8"))
+        if opts.workers > 1:
+            with Pool(opts.workers, initializer=_init, initargs=(products, opts)) as pool:
+                for chunk in pool.imap(generate_block, range(blocks)):
+                    f.write(chunk)
+                    rows += chunk.count(b"\n")
+        else:
+            _init(products, opts)
+            for block in range(blocks):
+                chunk = generate_block(block)
+                f.write(chunk)
+                rows += chunk.count(b"\n")
+    os.replace(tmp, opts.output)
+    return rows
+
+
+# ================= DERIVED FORMATS =================
+def emit_derived(opts) -> None:
+    """Build the backend's sidecar files next to the generated CSV."""
+    out_dir = os.path.dirname(os.path.abspath(opts.output))
+    # settings are read at import: keep lock files next to the output
+    os.environ.setdefault("DATA_DIR", out_dir)
+    sys.path.insert(0, BACKEND_DIR)
+    from src.repos.sales_rollups import SalesRollupStore
+    from src.repos.sales_date_index import SalesDateIndexStore
+    from src.repos.columnar_sales_repo import convert
+
+    if opts.index:
+        r = SalesRollupStore(opts.output).rebuild()
+        idx = SalesDateIndexStore(opts.output).rebuild()
+        print(f"   rollups: {len(r.days)} days, date index: {len(idx.dates)} dates")
+    if opts.columnar:
+        rows = convert(opts.output, opts.output + ".columns")
+        print(f"   columnar: {rows} rows -> {opts.output}.columns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a mock sales.csv from the real inventory")
+    parser.add_argument("--output", "-o", default=OUTPUT_FILE)
+    parser.add_argument("--inventory", default=INVENTORY_FILE, help="data.csv to sample products from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=DAYS_BACK, help="days of history")
+    parser.add_argument("--end", default=None, help="last day, YYYY-MM-DD (default: today, UTC)")
+    parser.add_argument("--sales-per-day", type=float, default=SALES_PER_DAY, help="mean sales (receipts) per day")
+    parser.add_argument("--max-lines-per-sale", type=int, default=1)
+    parser.add_argument("--max-qty", type=int, default=3)
+    parser.add_argument("--open-hour", type=int, default=9)
+    parser.add_argument("--close-hour", type=int, default=22)
+    parser.add_argument("--popularity", type=float, default=1.2,
+                        help="pareto shape of product popularity (lower = more skewed, 0 = uniform)")
+    parser.add_argument("--customers", default=CUSTOMERS, help='customer mix, "id=weight,..."')
+    parser.add_argument("--weekday-weights", default="1,1,1,1,1,1,1", help="Mon..Sun traffic multipliers")
+    parser.add_argument("--yearly-amplitude", type=float, default=0.0, help="0.3 = +/-30%% over the year")
+    parser.add_argument("--peak-day", type=int, default=355, help="day of year with the most traffic")
+    parser.add_argument("--growth", type=float, default=0.0, help="yearly traffic growth (0.1 = +10%%/yr)")
+    parser.add_argument("--workers", type=int, default=1, help="processes generating blocks in parallel")
+    parser.add_argument("--index", action="store_true", help="also build the rollups and date index")
+    parser.add_argument("--columnar", action="store_true", help="also build the columnar store")
+    opts = parser.parse_args()
+
+    if len(opts.weekday_weights.split(",")) != 7:
+        parser.error("--weekday-weights needs 7 values (Mon..Sun)")
+    if not 0 <= opts.open_hour < opts.close_hour <= 24:
+        parser.error("need 0 <= --open-hour < --close-hour <= 24")
+
+    end = date.fromisoformat(opts.end) if opts.end else datetime.now(timezone.utc).date()
+    opts.start = (end - timedelta(days=opts.days - 1)).isoformat()
+    rows_per_day = max(1.0, opts.sales_per_day * (1 + opts.max_lines_per_sale) / 2)
+    opts.block_days = max(1, int(ROWS_PER_BLOCK / rows_per_day))
+
+    products = load_products(opts.inventory, opts.seed, opts.popularity)
+    rows = generate(opts, products)
+    print(f"✅ Generated {rows} rows → {opts.output}")
+    if opts.index or opts.columnar:
+        emit_derived(opts)
+
+
+if __name__ == "__main__":
+    main()